@@ -35,8 +35,27 @@ def main():
                         help="Billing year (default: 2025)")
     parser.add_argument("--status", type=str, default="F", 
                         help="Billing status (default: F)")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Export K clients per SAP query using S_KUNNR multiple selection (default: batch.enabled/batch.size)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only export months after each client's watermark and merge into its consolidated dataset")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip clients already exported with the same filters (see journal.path)")
+    parser.add_argument("--sessions", type=int, default=None,
+                        help="Parallel SAP sessions for export_multi_client (max 6, default: sap.parallel_sessions)")
+    parser.add_argument("--trace", action="store_true",
+                        help="Write per-step timings to tracing.path (report: python -m src.utils.tracing)")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Run against the fake SAP scripting engine instead of SAP GUI (see 'simulation' in config)")
     args = parser.parse_args()
 
+    # The session pool only serves the per-client run; batch and incremental modes use one session
+    if args.sessions and args.sessions > 1 and (args.incremental or args.batch_size):
+        parser.error("--sessions cannot be combined with --batch-size or --incremental")
+    # Incremental mode resumes from its watermarks, not from the journal
+    if args.resume and args.incremental:
+        parser.error("--resume cannot be combined with --incremental (watermarks already skip exported months)")
+
     # Load Config
     try:
         config = load_config()
@@ -46,11 +65,30 @@ def main():
 
     # Get connection mode from config
     connection_mode = config['sap'].get('connection_mode', 'existing_session')
+    if args.simulate:
+        connection_mode = "simulation"
     logger.info(f"Connection mode: {connection_mode}")
 
     # Connect to SAP based on mode
     try:
-        if connection_mode == "existing_session":
+        if connection_mode == "simulation":
+            # Fake scripting engine (src/utils/fake_sap.py): no SAP GUI needed
+            from src.utils.fake_sap import FakeSapGui, FakeScriptingEngine
+            sap_conn = SAPConnection(connection_mode="existing_session",
+                                     gui=FakeSapGui(FakeScriptingEngine.from_config(config)))
+            session = sap_conn.connect()
+            # Exports, journal and watermarks go to a separate folder; the cache is never used
+            sim_dir = config.get('simulation', {}).get('export_directory', 'exports/simulated')
+            os.makedirs(sim_dir, exist_ok=True)
+            config['export']['default_directory'] = sim_dir
+            config['cache'] = {'enabled': False}
+            config['journal'] = {'path': os.path.join(sim_dir, 'journal.jsonl')}
+            config.setdefault('incremental', {}).update({
+                'watermarks_path': os.path.join(sim_dir, 'watermarks.json'),
+                'consolidated_directory': os.path.join(sim_dir, 'consolidated'),
+            })
+
+        elif connection_mode == "existing_session":
             # Connect to existing open session (default behavior)
             sap_conn = SAPConnection(
                 connection_index=config['sap']['connection_index'],
@@ -98,13 +136,21 @@ def main():
         logger.critical(f"Could not connect to SAP: {e}")
         sys.exit(1)
 
+    # Per-step latency tracing (tracing.enabled or --trace)
+    from src.utils.tracing import Tracer
+    tracer = Tracer.from_config(config, enabled=args.trace or None)
+    if tracer.enabled:
+        logger.info(f"Tracing run {tracer.run_id} to {tracer.path} "
+                    f"(report: python -m src.utils.tracing {tracer.path} --run-id {tracer.run_id})")
+
     # Dispatch Task
     if args.task == "export_invoice":
         if not args.invoice:
             logger.error("Invoice number is required for export_invoice task.")
             sys.exit(1)
         
-        exporter = InvoiceExporter(session, config)
+        from src.utils.export_cache import ExportCache
+        exporter = InvoiceExporter(session, config, cache=ExportCache.from_config(config), tracer=tracer)
         success = exporter.run(args.invoice)
         if success:
             logger.info("Task finished successfully.")
@@ -130,15 +176,57 @@ def main():
         
         logger.info(f"Processing {len(client_list)} clients from {args.clients_file}")
         
-        # Create exporter and run
-        exporter = MultiClientExporter(session, config)
-        results = exporter.run(
-            client_list=client_list,
-            month_from=args.month_from,
-            month_to=args.month_to,
-            year=args.year,
-            status=args.status
-        )
+        # Journal of finished clients (enables --resume after a crash)
+        from src.utils.run_journal import RunJournal
+        journal = RunJournal(config.get('journal', {}).get('path', 'logs/export_journal.jsonl'))
+        
+        batch_cfg = config.get('batch', {})
+        pool_size = args.sessions or config['sap'].get('parallel_sessions', 1)
+        if pool_size > 1 and (args.incremental or args.batch_size or batch_cfg.get('enabled', False)):
+            logger.warning(f"Parallel sessions ({pool_size}) are not used in batch or incremental mode; "
+                           f"running with one session")
+        if args.incremental:
+            # Incremental mode: per-client watermarks, only new months are queried
+            exporter = MultiClientExporter(session, config, journal=journal, tracer=tracer)
+            results = exporter.run_incremental(
+                client_list=client_list,
+                month_from=args.month_from,
+                month_to=args.month_to,
+                year=args.year,
+                status=args.status
+            )
+        elif args.batch_size or batch_cfg.get('enabled', False):
+            # Batched mode: one SAP query per K clients, split locally
+            exporter = MultiClientExporter(session, config, journal=journal, tracer=tracer)
+            results = exporter.run_batched(
+                client_list=client_list,
+                month_from=args.month_from,
+                month_to=args.month_to,
+                year=args.year,
+                status=args.status,
+                batch_size=args.batch_size,
+                resume=args.resume
+            )
+        else:
+            # Open session pool if parallel export is requested
+            session_ids = []
+            if pool_size > 1:
+                try:
+                    session_ids = sap_conn.open_session_pool(pool_size)
+                except Exception as e:
+                    logger.warning(f"Could not open session pool, continuing with one session: {e}")
+            
+            # Create exporter and run
+            exporter = MultiClientExporter(session, config, sessions=session_ids,
+                                           attach=sap_conn.attach_session, journal=journal, tracer=tracer)
+            results = exporter.run(
+                client_list=client_list,
+                month_from=args.month_from,
+                month_to=args.month_to,
+                year=args.year,
+                status=args.status,
+                resume=args.resume
+            )
         
         # Check overall success
         failed_clients = [k for k, v in results.items() if not v["success"]]
@@ -148,8 +236,9 @@ def main():
             logger.warning(f"Some clients failed: {failed_clients}")
             sys.exit(1)
 
-    # Cleanup (disconnect if using credentials mode)
+    # Cleanup (pool sessions, then disconnect if using credentials mode)
     try:
+        sap_conn.close_session_pool()
         if connection_mode == "credentials":
             sap_conn.disconnect()
     except Exception as e:
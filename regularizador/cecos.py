@@ -0,0 +1,158 @@
+"""
+Índice de centros de coste (CECOS) por prefijo más largo.
+
+`dim_cecos.csv` es jerárquico: cada nivel añade dos caracteres al código del
+padre (`10` -> `1000` -> `100000` -> `10000000` -> `1000000000`). El índice
+guarda los códigos de cada longitud en un array ordenado y resuelve un código
+buscando primero la coincidencia exacta y, si no existe, el prefijo más largo
+presente (el padre más cercano) en lugar de dejar el nombre vacío.
+
+La resolución se hace una vez por código distinto (`pd.factorize`) y por
+nivel con `np.searchsorted`, no fila a fila.
+
+El índice compilado se guarda junto al CSV (`dim_cecos.npz`) y se reutiliza
+mientras el CSV no cambie (tamaño y fecha de modificación).
+
+Uso:
+    from cecos import IndiceCecos
+
+    indice = IndiceCecos.desde_csv("dim_cecos.csv")
+    df["codigo_ceco"], df["nombre_ceco"] = indice.resolver_ut(df["UT Fact."])
+"""
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Cambiar si cambia el contenido del .npz
+VERSION_CACHE = 2
+
+# Cambiar si cambia cómo se normalizan los códigos de 'UT Fact.' (forma parte de las reglas del manifiesto)
+VERSION_CRUCE = 2
+
+
+def normalizar_codigo(serie):
+    """Código como texto sin espacios ni '.0' final (los códigos numéricos pueden leerse como float)."""
+    return serie.astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+
+
+def normalizar_ut(serie):
+    """
+    Código de 'UT Fact.' como lo dejaba la lectura como entero: los códigos
+    solo numéricos pierden los ceros a la izquierda ("0100" -> "100").
+    """
+    codigos = normalizar_codigo(serie)
+    numericos = codigos.str.fullmatch(r"\d+")
+    return codigos.where(~numericos, codigos.str.lstrip("0").replace("", "0"))
+
+
+class IndiceCecos:
+    """Códigos CECO agrupados por longitud en arrays ordenados, con su nombre."""
+
+    def __init__(self, codigos, nombres):
+        """
+        Args:
+            codigos: Códigos CECO (texto)
+            nombres: Nombre del centro de coste de cada código
+        """
+        codigos = np.asarray(codigos, dtype=str)
+        nombres = np.asarray(nombres, dtype=object)
+        orden = np.lexsort((codigos, np.char.str_len(codigos)))
+        self.codigos = codigos[orden]
+        self.nombres = nombres[orden]
+        longitudes = np.char.str_len(self.codigos)
+        # Por longitud (de mayor a menor): (inicio, fin) del tramo ordenado en self.codigos
+        self.niveles = {}
+        for longitud in sorted(set(longitudes.tolist()), reverse=True):
+            posiciones = np.flatnonzero(longitudes == longitud)
+            self.niveles[longitud] = (posiciones[0], posiciones[-1] + 1)
+        # Huella del contenido de la tabla (ver manifiesto.py)
+        contenido = "\n".join(f"{c}\t{n}" for c, n in zip(self.codigos.tolist(), self.nombres.tolist()))
+        self.huella = hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def desde_csv(cls, ruta="dim_cecos.csv", cache=True):
+        """
+        Carga el índice desde dim_cecos.csv (columnas Codi y Centre de cost).
+
+        Con `cache`, usa `<ruta>.npz` si corresponde a la versión actual del CSV
+        y, si no, lo vuelve a generar.
+        """
+        ruta = Path(ruta)
+        ruta_cache = ruta.with_suffix(".npz")
+        estado = ruta.stat()
+        firma = np.array([VERSION_CACHE, estado.st_size, estado.st_mtime_ns], dtype=np.int64)
+
+        if cache and ruta_cache.exists():
+            try:
+                with np.load(ruta_cache, allow_pickle=False) as datos:
+                    if np.array_equal(datos["firma"], firma):
+                        # Los nombres se guardan como texto: los vacíos vuelven a ser NaN
+                        nombres = datos["nombres"].astype(object)
+                        nombres[datos["sin_nombre"]] = np.nan
+                        return cls(datos["codigos"], nombres)
+            except Exception:
+                pass
+
+        dim_cecos = pd.read_csv(ruta, dtype=str)
+        dim_cecos["Codi_str"] = normalizar_codigo(dim_cecos["Codi"])
+        dim_cecos = dim_cecos.drop_duplicates("Codi_str")
+        indice = cls(dim_cecos["Codi_str"].to_numpy(dtype=str), dim_cecos["Centre de cost"].to_numpy(dtype=object))
+
+        if cache:
+            try:
+                with open(ruta_cache, "wb") as f:
+                    np.savez(f, firma=firma, codigos=indice.codigos,
+                             nombres=np.asarray(indice.nombres, dtype=str),
+                             sin_nombre=pd.isna(indice.nombres))
+            except OSError:
+                pass
+        return indice
+
+    def resolver(self, codigos):
+        """
+        Nombre del CECO con el prefijo más largo de cada código.
+
+        Args:
+            codigos: Array de códigos (texto)
+
+        Returns:
+            np.ndarray: Nombres (NaN si ni el primer nivel existe)
+        """
+        codigos = np.asarray(codigos, dtype=str)
+        resultado = np.full(len(codigos), np.nan, dtype=object)
+        pendientes = np.ones(len(codigos), dtype=bool)
+        longitudes = np.char.str_len(codigos)
+
+        for longitud, (inicio, fin) in self.niveles.items():
+            candidatos = np.flatnonzero(pendientes & (longitudes >= longitud))
+            if not len(candidatos):
+                continue
+            prefijos = codigos[candidatos].astype(f"<U{longitud}")
+            tramo = self.codigos[inicio:fin]
+            pos = np.searchsorted(tramo, prefijos)
+            encontrados = tramo[np.minimum(pos, len(tramo) - 1)] == prefijos
+            resultado[candidatos[encontrados]] = self.nombres[inicio + pos[encontrados]]
+            pendientes[candidatos[encontrados]] = False
+        return resultado
+
+    def resolver_ut(self, ut_fact):
+        """
+        Código y nombre de CECO para la columna 'UT Fact.' (código + "00").
+
+        La columna se lee como texto (ver esquema.py); los códigos numéricos se
+        normalizan sin ceros a la izquierda para cruzar igual que al leerlos
+        como enteros (`normalizar_ut`).
+
+        Los valores distintos se resuelven una sola vez y se expanden a las filas.
+
+        Returns:
+            tuple: (Series codigo_ceco, Series nombre_ceco) con el índice de `ut_fact`
+        """
+        posiciones, unicos = pd.factorize(ut_fact, use_na_sentinel=False)
+        codigos = (normalizar_ut(pd.Series(unicos)) + "00").to_numpy(dtype=object)
+        nombres = self.resolver(codigos.astype(str))
+        return (pd.Series(codigos.take(posiciones), index=ut_fact.index),
+                pd.Series(nombres.take(posiciones), index=ut_fact.index))
@@ -0,0 +1,119 @@
+"""
+Resumen consolidado por CECO de todos los archivos de una carpeta.
+
+En lugar de juntar los DataFrames de detalle, cada archivo (o cada bloque en
+modo streaming) se reduce en cuanto se calcula a un agregado por
+(nombre_ceco, codigo_ceco, mes) con filas, importe base, descuento,
+incremento y DIFF. El consolidado guarda solo esos agregados, uno por archivo,
+y al final escribe `r_consolidado.xlsx` con:
+
+- Resumen_Consolidado: una fila por (archivo, CECO, mes) y fila TOTAL
+- Totales_CECO: totales por CECO sumando todos los archivos
+- Totales_Archivo: totales por archivo
+
+Las filas sin CECO se conservan (nombre vacío) para que los totales cuadren
+con el detalle.
+
+Uso:
+    consolidado = Consolidado()
+    consolidado.agregar("EXPORT_A.csv", df)   # tantas veces como bloques
+    consolidado.cerrar_archivo("EXPORT_A.csv")
+    consolidado.escribir(carpeta)
+"""
+
+import pandas as pd
+
+from esquema import BASE_COL, MES_COL
+
+NOMBRE = "r_consolidado.xlsx"
+
+CLAVES = ["nombre_ceco", "codigo_ceco", "mes"]
+MEDIDAS = ["filas", BASE_COL, "DESCUENTO_CALCULADO", "INCREMENTO_CALCULADO", "DIFF"]
+
+
+def agregar_bloque(df):
+    """Agregado de un bloque de filas ya calculadas por (nombre_ceco, codigo_ceco, mes)."""
+    bloque = pd.DataFrame({
+        "nombre_ceco": df["nombre_ceco"],
+        "codigo_ceco": df["codigo_ceco"],
+        "mes": pd.to_numeric(df[MES_COL], errors="coerce"),
+        "filas": 1,
+        BASE_COL: df[BASE_COL].astype(float),
+        "DESCUENTO_CALCULADO": df["DESCUENTO_CALCULADO"],
+        "INCREMENTO_CALCULADO": df["INCREMENTO_CALCULADO"],
+        "DIFF": df["DIFF"],
+    })
+    return bloque.groupby(CLAVES, dropna=False, as_index=False)[MEDIDAS].sum()
+
+
+def _compactar(partes):
+    if len(partes) == 1:
+        return partes[0]
+    return pd.concat(partes, ignore_index=True).groupby(CLAVES, dropna=False, as_index=False)[MEDIDAS].sum()
+
+
+class Consolidado:
+    """Agregados por archivo; cada archivo ocupa (CECOs x meses) filas, no su detalle."""
+
+    def __init__(self):
+        self.archivos = {}
+        self._abiertos = {}
+
+    def agregar(self, archivo, df):
+        """Suma un bloque de filas calculadas del archivo `archivo` (nombre)."""
+        self._abiertos.setdefault(archivo, []).append(agregar_bloque(df))
+        # Acota la lista de parciales de un archivo grande en modo streaming
+        if len(self._abiertos[archivo]) >= 16:
+            self._abiertos[archivo] = [_compactar(self._abiertos[archivo])]
+
+    def cerrar_archivo(self, archivo):
+        """Fija el agregado del archivo terminado y lo devuelve."""
+        partes = self._abiertos.pop(archivo, [])
+        if partes:
+            self.archivos[archivo] = _compactar(partes)
+        return self.archivos.get(archivo)
+
+    def descartar(self, archivo):
+        """Olvida un archivo que falló a mitad de proceso."""
+        self._abiertos.pop(archivo, None)
+        self.archivos.pop(archivo, None)
+
+    def unir(self, archivo, agregado):
+        """Incorpora el agregado ya calculado de un archivo (de un proceso del pool o del manifiesto)."""
+        if agregado is not None:
+            self.archivos[archivo] = agregado
+
+    def tabla(self):
+        """Resumen_Consolidado sin la fila TOTAL, ordenado por archivo, CECO y mes."""
+        if not self.archivos:
+            return pd.DataFrame(columns=["archivo"] + CLAVES + MEDIDAS)
+        tabla = pd.concat(
+            [a.assign(archivo=nombre) for nombre, a in sorted(self.archivos.items())], ignore_index=True)
+        tabla = tabla[["archivo"] + CLAVES + MEDIDAS]
+        return tabla.sort_values(["archivo", "nombre_ceco", "codigo_ceco", "mes"], na_position="last",
+                                 ignore_index=True)
+
+    def escribir(self, carpeta):
+        """
+        Escribe r_consolidado.xlsx en `carpeta`.
+
+        Returns:
+            Path: Ruta del libro
+        """
+        tabla = self.tabla()
+        total = tabla[MEDIDAS].sum()
+
+        resumen = pd.concat([tabla, pd.DataFrame([{"archivo": "TOTAL", **total}])], ignore_index=True)
+
+        por_ceco = tabla.groupby(["nombre_ceco", "codigo_ceco"], dropna=False, as_index=False)[MEDIDAS].sum()
+        por_ceco = pd.concat([por_ceco, pd.DataFrame([{"nombre_ceco": "TOTAL", **total}])], ignore_index=True)
+
+        por_archivo = tabla.groupby("archivo", as_index=False)[MEDIDAS].sum()
+        por_archivo = pd.concat([por_archivo, pd.DataFrame([{"archivo": "TOTAL", **total}])], ignore_index=True)
+
+        ruta = carpeta / NOMBRE
+        with pd.ExcelWriter(ruta, engine="openpyxl", mode="w") as writer:
+            resumen.to_excel(writer, sheet_name="Resumen_Consolidado", index=False)
+            por_ceco.to_excel(writer, sheet_name="Totales_CECO", index=False)
+            por_archivo.to_excel(writer, sheet_name="Totales_Archivo", index=False)
+        return ruta
@@ -0,0 +1,107 @@
+"""
+Esquema del export de ZTSD_FACTURACION para el regularizador.
+
+Tipos explícitos de las columnas conocidas (los mismos criterios que
+`src/utils/parquet_store.py`): códigos como `category`, mes como `Int8`
+(entero de 8 bits que admite vacíos), año como `Int16` e importes como
+`float64`. El resto de columnas se infiere como hasta ahora.
+
+Carga en dos niveles:
+- solo cálculo (`detalle=False`): se leen únicamente las columnas que usan el
+  cruce de CECOS y las tasas; el resto del archivo se salta al parsear
+- completa (`detalle=True`): todas las columnas, para la hoja de detalle
+
+Si un valor no encaja en su tipo (ej: texto en una columna de importe), la
+lectura se repite sin tipos y las columnas se convierten de forma tolerante
+(`tipar`).
+
+Uso:
+    from esquema import leer_export
+
+    df = leer_export(archivo, detalle=False)
+"""
+
+import pandas as pd
+
+from sap_csv import abrir_csv_sap
+
+BASE_COL = "Preu unitari: Calculat per les taules de"
+MES_COL = "Mes en que es factura"
+UT_COL = "UT Fact."
+
+# Columnas que necesita el cálculo (cruce de CECOS, tasas e importes)
+COLUMNAS_CALCULO = (UT_COL, BASE_COL, MES_COL)
+
+# Tipos por columna (títulos del export de ZTSD_FACTURACION)
+TIPOS = {
+    UT_COL: "category",
+    "Client": "category",
+    "Status": "category",
+    MES_COL: "Int8",
+    "Any": "Int16",
+    BASE_COL: "float64",
+    "Import": "float64",
+}
+
+# Columnas que añade el cálculo (CECO, tasas e importes) y su tipo en la salida
+TIPOS_CALCULO = {
+    "codigo_ceco": "string",
+    "nombre_ceco": "string",
+    "tasa_descuento": "float64",
+    "tasa_incremento": "float64",
+    "DESCUENTO_CALCULADO": "float64",
+    "INCREMENTO_CALCULADO": "float64",
+    "DIFF": "float64",
+}
+
+
+def opciones_lectura(detalle=True, tipado=True):
+    """Argumentos de `pd.read_csv` para el nivel de carga pedido."""
+    opciones = {}
+    if not detalle:
+        columnas = set(COLUMNAS_CALCULO)
+        opciones["usecols"] = lambda c: c in columnas
+    if tipado:
+        opciones["dtype"] = TIPOS
+    return opciones
+
+
+def tipar(df):
+    """Convierte las columnas conocidas a su tipo; los valores no convertibles quedan vacíos."""
+    for columna, tipo in TIPOS.items():
+        if columna not in df.columns:
+            continue
+        if tipo == "category":
+            df[columna] = df[columna].astype("category")
+        elif tipo.startswith("Int"):
+            valores = pd.to_numeric(df[columna], errors="coerce")
+            try:
+                df[columna] = valores.astype(tipo)
+            except (TypeError, ValueError, OverflowError):
+                # Decimales o fuera de rango: se queda como float
+                df[columna] = valores
+        else:
+            df[columna] = pd.to_numeric(df[columna], errors="coerce").astype(tipo)
+    return df
+
+
+def leer_export(archivo, detalle=True):
+    """
+    Lee un export SAP con tipos explícitos.
+
+    Args:
+        archivo: Ruta del CSV
+        detalle: Leer todas las columnas (si no, solo COLUMNAS_CALCULO)
+
+    Returns:
+        DataFrame
+    """
+    try:
+        with abrir_csv_sap(archivo) as fuente:
+            return pd.read_csv(fuente, sep=',', low_memory=False, **opciones_lectura(detalle))
+    except pd.errors.ParserError:
+        raise
+    except (ValueError, TypeError, OverflowError):
+        with abrir_csv_sap(archivo) as fuente:
+            df = pd.read_csv(fuente, sep=',', low_memory=False, **opciones_lectura(detalle, tipado=False))
+        return tipar(df)
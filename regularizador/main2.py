@@ -7,20 +7,22 @@ de centros de coste (CECOS) y genera un nuevo archivo Excel con los resultados
 detallados y un resumen por centro de coste.
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import shutil
 from tqdm import tqdm
-import numpy as np
+import csv
 
-# Configuración de Tasas
-# Periodo 1: Mes < 7
-DESCUENTO1 = 0.0560
-INCREMENTO1 = 0.0696
+from cecos import IndiceCecos
+from salida import crear_escritor
+from esquema import leer_export
+from tarifas import MotorTarifas
 
-# Periodo 2: Mes >= 7
-DESCUENTO2 = 0.0596 
-INCREMENTO2 = 0.0696
+# Configuración de Tasas: tarifa "main2" de tarifas.yaml
+# Periodo 1: Mes < 7  -> descuento 0.0560, incremento 0.0696
+# Periodo 2: Mes >= 7 -> descuento 0.0596, incremento 0.0696
+TARIFA = "main2"
 
 
 def procesar_xlsx(ruta_carpeta: str):
@@ -40,15 +42,9 @@ def procesar_xlsx(ruta_carpeta: str):
     """
     carpeta = Path(ruta_carpeta)
 
-    # ===== Cargar tabla CECOS =====
-    dim_cecos = pd.read_csv("dim_cecos.csv")
-    dim_cecos["Codi_str"] = (
-        dim_cecos["Codi"]
-        .astype(str)
-        .str.strip()
-        .str.replace(r"\.0$", "", regex=True)
-    )
-    mapa_cecos = dim_cecos.set_index("Codi_str")["Centre de cost"]
+    # ===== Cargar índice CECOS (se cachea en dim_cecos.npz) =====
+    indice_cecos = IndiceCecos.desde_csv("dim_cecos.csv")
+    motor_tarifas = MotorTarifas.desde_yaml(tarifa=TARIFA)
 
     archivos = [f for f in carpeta.iterdir() if f.suffix.lower() == ".csv"]
 
@@ -67,39 +63,9 @@ def procesar_xlsx(ruta_carpeta: str):
             # 1. Cargando CSV
             pbar.set_postfix(paso="Cargando CSV")
             
-            # 1. Cargando CSV
-            pbar.set_postfix(paso="Cargando CSV")
-            
-            # Pre-procesar CSV para manejar formato con filas completamente entrecomilladas
-            import tempfile
-            import csv
-            
-            temp_file = None
+            # BOM y comillas exteriores se quitan al vuelo; tipos de esquema.py
             try:
-                # Intentar leer el archivo y limpiar formato especial
-                with open(archivo, 'r', encoding='latin-1') as f_in:
-                    lines = f_in.readlines()
-                
-                # Detectar si la primera línea está completamente entrecomillada
-                if lines and lines[0].strip().startswith('ï»¿"') or lines[0].strip().startswith('"'):
-                    pbar.set_postfix(paso="Limpiando formato CSV")
-                    # Crear archivo temporal limpio
-                    temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8', suffix='.csv')
-                    
-                    for line in lines:
-                        # Quitar BOM si existe
-                        clean_line = line.replace('ï»¿', '')
-                        # Si la línea empieza y termina con comillas, quitarlas
-                        clean_line = clean_line.strip()
-                        if clean_line.startswith('"') and clean_line.endswith('"'):
-                            clean_line = clean_line[1:-1]
-                        temp_file.write(clean_line + '\n')
-                    
-                    temp_file.close()
-                    df = pd.read_csv(temp_file.name, sep=',', encoding='utf-8', low_memory=False)
-                else:
-                    # Formato estándar
-                    df = pd.read_csv(archivo, sep=',', encoding='latin-1', low_memory=False)
+                df = leer_export(archivo)
             except Exception as e:
                 try:
                     # Fallback: Ignorar comillas completamente
@@ -107,14 +73,6 @@ def procesar_xlsx(ruta_carpeta: str):
                 except Exception as e2:
                     print(f"Error al leer {archivo.name}: {e}")
                     continue
-            finally:
-                # Limpiar archivo temporal
-                if temp_file:
-                    import os
-                    try:
-                        os.unlink(temp_file.name)
-                    except:
-                        pass
             
             # Mostrar columnas disponibles para debug
             pbar.set_postfix(paso="Validando columnas")
@@ -130,65 +88,28 @@ def procesar_xlsx(ruta_carpeta: str):
                 print()
                 continue
 
-            # 2. Transform UT Fact
-            pbar.set_postfix(paso="Transformando UT Fact.")
-            df["codigo_ceco"] = (
-                df["UT Fact."].astype(str).str.strip().str.replace(r"\.0$", "", regex=True) + "00"
-            )
-
-            # 3. Cruce CECOS
+            # 2-3. Transform UT Fact y cruce CECOS por prefijo más largo
             pbar.set_postfix(paso="Cruzando con CECOS")
-            df["nombre_ceco"] = df["codigo_ceco"].map(mapa_cecos)
-
-            # 4. Calcular Tasas según el mes
-            pbar.set_postfix(paso="Calculando Tasas")
-            base_col = "Preu unitari: Calculat per les taules de"
-            
-            # Condiciones
-            cond_periodo1 = df['Mes en que es factura'] < 7
-            cond_periodo2 = df['Mes en que es factura'] >= 7
-            
-            # Asignar tasas
-            df['tasa_descuento'] = np.select(
-                [cond_periodo1, cond_periodo2], 
-                [DESCUENTO1, DESCUENTO2], 
-                default=0.0
-            )
-            
-            df['tasa_incremento'] = np.select(
-                [cond_periodo1, cond_periodo2], 
-                [INCREMENTO1, INCREMENTO2], 
-                default=0.0
-            )
+            df["codigo_ceco"], df["nombre_ceco"] = indice_cecos.resolver_ut(df["UT Fact."])
 
-            # 5. Calcular Importes
+            # 4-6. Tasas según el mes, importes y DIFF (ver tarifas.py)
             pbar.set_postfix(paso="Calculando Importes")
-            # Descuento: Precio / (1 + Tasa Descuento)
-            df["DESCUENTO_CALCULADO"] = df[base_col].astype(float) / (1 + df['tasa_descuento'])
-            
-            # Incremento: Descuento * (1 + Tasa Incremento)
-            df["INCREMENTO_CALCULADO"] = df["DESCUENTO_CALCULADO"] * (1 + df['tasa_incremento'])
-            
-            # 6. DIFF
-            pbar.set_postfix(paso="Calculando DIFF")
-            df["DIFF"] = df["INCREMENTO_CALCULADO"] - df[base_col]
+            base_col = "Preu unitari: Calculat per les taules de"
+            # Mes como número (no numérico = sin tasas); floor para que un mes decimal o fuera
+            # de rango caiga en el mismo periodo que con las comparaciones Mes < 7 / Mes >= 7
+            mes = np.floor(pd.to_numeric(df['Mes en que es factura'], errors='coerce').astype('float64'))
+            df = motor_tarifas.aplicar(df, base_col, mes)
 
             # 7. Resumen CECO
             pbar.set_postfix(paso="Generando resumen CECO")
             df_resumen = df.groupby(["nombre_ceco", "codigo_ceco"], as_index=False)["DIFF"].sum()
 
-            # 8. Guardar archivo (lento)
-            # Al ser CSV el origen, creamos un Excel nuevo desde cero
-            output_path = archivo.with_name("r_" + archivo.stem + ".xlsx")
-
+            # 8. Guardar archivo
+            # Libro write-only nuevo (ver salida.py); el detalle pasa a otra hoja si supera el límite de Excel
             pbar.set_postfix(paso="Escribiendo Excel...")
-            with pd.ExcelWriter(
-                output_path,
-                engine="openpyxl",
-                mode="w", # Write mode (crear nuevo)
-            ) as writer:
-                df_resumen.to_excel(writer, sheet_name="Resumen_CECO", index=False)
-                df.to_excel(writer, sheet_name="Detalle_Procesado", index=False)
+            with crear_escritor("xlsx", archivo) as escritor:
+                escritor.escribir_detalle(df)
+                escritor.escribir_resumen(df_resumen)
 
             # archivo terminado
             pbar.set_postfix(paso="OK")
@@ -1,164 +1,402 @@
 """
 Procesador de facturación (versión con 3 descuentos + 1 incremento)
 
-Reglas:
-- DESCUENTO1 = 0.0560 -> aplica si 'Mes en que es factura' < 7
-- DESCUENTO2 = 0.0596 -> aplica si 7 <= 'Mes en que es factura' < 11
-- DESCUENTO3 = 0.0696 -> aplica si 'Mes en que es factura' >= 11
+Reglas (tarifa `main3` de `tarifas.yaml`, ver `tarifas.py`):
+- Descuento 0.0560 -> aplica si 'Mes en que es factura' < 7
+- Descuento 0.0596 -> aplica si 7 <= 'Mes en que es factura' < 11
+- Descuento 0.0696 -> aplica si 'Mes en que es factura' >= 11
 
 Incremento único:
-- INCREMENTO = 0.0951 (aplica a todos)
+- 0.0951 (aplica a todos)
+
+Con `--tarifas`/`--tarifa` se usa otra tabla de tasas; `--fecha` fija la
+fecha de vigencia de las filas sin columna de año (por defecto hoy).
 
 Este script se basa en `main2.py` y mantiene la misma estrategia de lectura
-robusta de CSV y salida a Excel.
+robusta de CSV y salida a Excel. El BOM y las comillas exteriores de los
+exports SAP se quitan al vuelo durante la lectura (ver `sap_csv.py`), sin
+copia temporal del archivo.
+
+Modo streaming (`--streaming`): el CSV se lee por bloques de `--chunksize`
+filas, cada bloque se calcula y se escribe en la hoja de detalle en cuanto
+está listo, y el resumen por CECO se acumula bloque a bloque. La memoria
+máxima depende del tamaño de bloque, no del tamaño del archivo.
+
+Modo paralelo (`--workers N`, 0 = un proceso por núcleo): los archivos son
+independientes y se reparten entre N procesos; cada proceso recibe el índice
+de CECOS una sola vez al arrancar.
+
+Cruce con CECOS: el código de 'UT Fact.' + "00" se resuelve contra el
+índice de `dim_cecos.csv` por prefijo más largo; si el código exacto no
+existe se usa el nombre del padre más cercano (ver `cecos.py`).
+
+Reejecución: `r_manifiesto.json` (junto a los resultados) guarda tamaño,
+fecha y hash de cada CSV procesado con la versión de las reglas; los archivos
+sin cambios se omiten (`--forzar` los reprocesa, ver `manifiesto.py`).
+
+Modo consolidado (`--consolidado`): cada archivo se reduce a un agregado por
+CECO y mes mientras se procesa (sin juntar los detalles) y al final se
+escribe `r_consolidado.xlsx` con todos los archivos y sus totales (ver
+`consolidado.py`).
+
+Salida (`--salida`): xlsx con hojas de resumen y detalle (write-only, el
+detalle continúa en hojas nuevas si supera el límite de filas de Excel),
+csv, parquet o solo el resumen por CECO (ver `salida.py`).
 """
 
 import pandas as pd
 from pathlib import Path
 from tqdm import tqdm
-import numpy as np
-import tempfile
+import contextlib
 import csv
+import io
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cecos import IndiceCecos, VERSION_CRUCE
+from consolidado import Consolidado
+from esquema import BASE_COL, COLUMNAS_CALCULO, leer_export, opciones_lectura, tipar
+from manifiesto import NOMBRE as MANIFIESTO, Manifiesto
+from salida import FORMATOS, crear_escritor, rutas_salida
+from sap_csv import abrir_csv_sap
+from tarifas import RUTA_TARIFAS, MotorTarifas
+
+# Tarifa de tarifas.yaml que aplica este script
+TARIFA = "main3"
+
+# Filas por bloque en modo streaming
+CHUNKSIZE = 100_000
+
+REQUIRED_COLUMNS = list(COLUMNAS_CALCULO)
+
+
+def calcular(df, indice_cecos, motor_tarifas):
+    """
+    Añade a `df` el CECO, las tasas y los importes calculados.
+
+    Columnas nuevas: codigo_ceco, nombre_ceco, tasa_descuento, tasa_incremento,
+    DESCUENTO_CALCULADO, INCREMENTO_CALCULADO y DIFF.
+    """
+    # UT Fact -> código CECO y cruce por prefijo más largo (ver cecos.py)
+    df["codigo_ceco"], df["nombre_ceco"] = indice_cecos.resolver_ut(df["UT Fact."])
+
+    # Mes de facturación (los no numéricos cuentan como 0)
+    try:
+        mes_series = df['Mes en que es factura'].astype(int)
+    except Exception:
+        mes_series = pd.to_numeric(df['Mes en que es factura'], errors='coerce').fillna(0).astype(int)
+
+    # Tasas por tramo e importes (ver tarifas.py)
+    df[BASE_COL] = pd.to_numeric(df[BASE_COL], errors='coerce').fillna(0.0)
+    return motor_tarifas.aplicar(df, BASE_COL, mes_series)
+
+
+def resumen_ceco(df):
+    """DIFF total por CECO (hoja Resumen_CECO)."""
+    return df.groupby(["nombre_ceco", "codigo_ceco"], as_index=False)["DIFF"].sum()
+
+
+def procesar_archivo_streaming(archivo, indice_cecos, motor_tarifas, chunksize=CHUNKSIZE, pbar=None, salida="xlsx",
+                               consolidado=None, tipado=True):
+    """
+    Procesa un CSV por bloques y escribe los resultados sin cargarlo entero.
+
+    Las filas de detalle se pasan al escritor `salida` en cuanto se calcula
+    cada bloque y el DIFF por CECO se acumula por bloque. Los bloques se leen
+    con los tipos de esquema.py (solo las columnas de cálculo si la salida es
+    "resumen"); si un valor no encaja en su tipo, el archivo se vuelve a
+    procesar sin tipos explícitos.
+
+    Returns:
+        int: Filas procesadas (None si no se pudo leer o faltan columnas)
+    """
+    def paso(texto):
+        if pbar is not None:
+            pbar.set_postfix(paso=texto)
+
+    try:
+        fuente = abrir_csv_sap(archivo)
+    except Exception as e:
+        print(f"Error al procesar {archivo.name}: {e}")
+        return None
+    # Mientras no se cierre, un error descarta las salidas a medio escribir (ver salida.py)
+    escritor = None
+    try:
+        reader = pd.read_csv(fuente, sep=',', chunksize=chunksize,
+                             **opciones_lectura(detalle=salida != "resumen", tipado=tipado))
+
+        escritor = crear_escritor(salida, archivo)
+        acumulado = None
+
+        for n, chunk in enumerate(reader, 1):
+            if n == 1:
+                missing_cols = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+                if missing_cols:
+                    print(f"\n❌ Error en {archivo.name}: columnas requeridas NO encontradas: {missing_cols}\n")
+                    return None
+
+            paso(f"Bloque {n}: calculando")
+            if not tipado:
+                chunk = tipar(chunk)
+            chunk = calcular(chunk, indice_cecos, motor_tarifas)
+
+            parcial = chunk.groupby(["nombre_ceco", "codigo_ceco"])["DIFF"].sum()
+            acumulado = parcial if acumulado is None else acumulado.add(parcial, fill_value=0.0)
+            if consolidado is not None:
+                consolidado.agregar(archivo.name, chunk)
+
+            paso(f"Bloque {n}: escribiendo detalle")
+            escritor.escribir_detalle(chunk)
 
-# Tasas
-DESCUENTO1 = 0.0560
-DESCUENTO2 = 0.0596
-DESCUENTO3 = 0.0696
-INCREMENTO = 0.0951
+        if acumulado is None:
+            print(f"\n❌ Error en {archivo.name}: archivo vacío\n")
+            return None
 
+        paso("Generando resumen CECO")
+        escritor.escribir_resumen(acumulado.sort_index().reset_index())
 
-def procesar_xlsx(ruta_carpeta: str):
+        paso(f"Guardando {salida}...")
+        escritor.cerrar()
+        filas, escritor = escritor.filas, None
+        return filas
+    except (ValueError, TypeError, OverflowError) as e:
+        if not tipado or isinstance(e, pd.errors.ParserError):
+            print(f"Error al procesar {archivo.name}: {e}")
+            return None
+        fuente.close()
+        if escritor is not None:
+            escritor.abortar()
+            escritor = None
+        if consolidado is not None:
+            consolidado.descartar(archivo.name)
+        return procesar_archivo_streaming(archivo, indice_cecos, motor_tarifas, chunksize, pbar, salida,
+                                          consolidado, tipado=False)
+    except Exception as e:
+        print(f"Error al procesar {archivo.name}: {e}")
+        return None
+    finally:
+        fuente.close()
+        if escritor is not None:
+            escritor.abortar()
+
+
+def procesar_archivo(archivo, indice_cecos, motor_tarifas, streaming=False, chunksize=CHUNKSIZE, pbar=None, salida="xlsx",
+                     consolidado=None):
+    """
+    Procesa un CSV y escribe el detalle y el resumen por CECO con el escritor
+    `salida` (xlsx, csv, parquet o resumen; ver salida.py). Con `consolidado`,
+    además suma sus filas calculadas al agregado del archivo (ver consolidado.py).
+
+    Returns:
+        int: Filas procesadas (None si no se pudo leer o faltan columnas)
+    """
+    if streaming:
+        return procesar_archivo_streaming(archivo, indice_cecos, motor_tarifas, chunksize, pbar, salida, consolidado)
+
+    def paso(texto):
+        if pbar is not None:
+            pbar.set_postfix(paso=texto)
+
+    # Lectura robusta similar a main2.py, con tipos explícitos (ver esquema.py);
+    # si solo se pide el resumen, únicamente las columnas de cálculo
+    paso("Leyendo CSV")
+    detalle = salida != "resumen"
+    try:
+        df = leer_export(archivo, detalle=detalle)
+    except Exception as e:
+        try:
+            df = tipar(pd.read_csv(archivo, sep=",", encoding="latin-1", quoting=csv.QUOTE_NONE, low_memory=False,
+                                   **opciones_lectura(detalle, tipado=False)))
+        except Exception as e2:
+            print(f"Error al leer {archivo.name}: {e}")
+            return None
+
+    # Validar columnas
+    paso("Validando columnas")
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_cols:
+        print(f"\n❌ Error en {archivo.name}: columnas requeridas NO encontradas: {missing_cols}\n")
+        return None
+
+    # CECO, tasas e importes
+    paso("Calculando Importes")
+    df = calcular(df, indice_cecos, motor_tarifas)
+
+    # Resumen por CECO
+    paso("Generando resumen CECO")
+    df_resumen = resumen_ceco(df)
+    if consolidado is not None:
+        consolidado.agregar(archivo.name, df)
+
+    # Guardar resultados
+    paso(f"Escribiendo {salida}...")
+    with crear_escritor(salida, archivo) as escritor:
+        escritor.escribir_detalle(df)
+        escritor.escribir_resumen(df_resumen)
+    return len(df)
+
+
+# Índice de CECOS y tarifa de cada proceso trabajador (los fija _init_worker una sola vez)
+_INDICE_CECOS = None
+_MOTOR_TARIFAS = None
+
+
+def _init_worker(indice_cecos, motor_tarifas):
+    global _INDICE_CECOS, _MOTOR_TARIFAS
+    _INDICE_CECOS = indice_cecos
+    _MOTOR_TARIFAS = motor_tarifas
+
+
+def _procesar_en_worker(archivo, streaming, chunksize, salida, consolidar):
+    """
+    Procesa un archivo en un proceso del pool.
+
+    Returns:
+        tuple: (archivo, filas, mensajes impresos, agregado consolidado o None)
+    """
+    mensajes = io.StringIO()
+    consolidado = Consolidado() if consolidar else None
+    with contextlib.redirect_stdout(mensajes):
+        try:
+            filas = procesar_archivo(archivo, _INDICE_CECOS, _MOTOR_TARIFAS, streaming, chunksize, salida=salida,
+                                     consolidado=consolidado)
+        except Exception as e:
+            print(f"Error al procesar {archivo.name}: {e}")
+            filas = None
+    agregado = consolidado.cerrar_archivo(archivo.name) if consolidado is not None and filas is not None else None
+    return archivo, filas, mensajes.getvalue().strip(), agregado
+
+
+def _procesar_en_paralelo(archivos, indice_cecos, motor_tarifas, workers, streaming, chunksize, salida,
+                          al_terminar=None, consolidar=False):
+    """
+    Reparte los archivos entre `workers` procesos. El índice de CECOS y la tarifa se
+    envían una vez a cada proceso (initializer) y cada resultado o fallo se refleja
+    en la barra del proceso principal y en `al_terminar(archivo, filas, agregado)`;
+    con `consolidar` cada proceso devuelve solo el agregado de su archivo.
+    """
+    fallos = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(indice_cecos, motor_tarifas)) as pool, \
+            tqdm(total=len(archivos), desc=f"Procesando archivos CSV ({workers} procesos)", unit="archivo") as pbar:
+        futuros = [pool.submit(_procesar_en_worker, archivo, streaming, chunksize, salida, consolidar) for archivo in archivos]
+        for futuro in as_completed(futuros):
+            archivo, filas, mensajes, agregado = futuro.result()
+            if mensajes:
+                tqdm.write(mensajes)
+            if filas is None:
+                fallos.append(archivo.name)
+            if al_terminar:
+                al_terminar(archivo, filas, agregado)
+            pbar.update(1)
+            pbar.set_postfix(ultimo=archivo.name, filas="ERROR" if filas is None else str(filas), fallos=len(fallos))
+
+    if fallos:
+        print(f"❌ {len(fallos)} archivo(s) con error: {', '.join(sorted(fallos))}")
+
+
+def procesar_xlsx(ruta_carpeta: str, streaming: bool = False, chunksize: int = CHUNKSIZE, workers: int = 1,
+                  salida: str = "xlsx", tarifas=RUTA_TARIFAS, tarifa: str = TARIFA, fecha=None,
+                  forzar: bool = False, consolidar: bool = False):
+    """
+    Procesa todos los CSV de la carpeta.
+
+    Args:
+        ruta_carpeta: Carpeta con los CSV
+        streaming: Procesar cada archivo por bloques (ver `procesar_archivo_streaming`)
+        chunksize: Filas por bloque en modo streaming
+        workers: Procesos en paralelo (1 = secuencial; 0 = uno por núcleo)
+        salida: Formato de salida (xlsx, csv, parquet o resumen; ver salida.py)
+        tarifas: YAML con las tablas de tasas
+        tarifa: Tarifa del YAML a aplicar
+        fecha: Fecha de vigencia para las filas sin columna de año (por defecto hoy)
+        forzar: Procesar también los archivos sin cambios según el manifiesto
+        consolidar: Escribir además r_consolidado.xlsx con el resumen de todos los archivos
+            por (archivo, CECO, mes) y sus totales (ver consolidado.py)
+    """
     carpeta = Path(ruta_carpeta)
 
-    # Cargar tabla CECOS (espera dim_cecos.csv en cwd)
-    dim_cecos = pd.read_csv("dim_cecos.csv")
-    dim_cecos["Codi_str"] = (
-        dim_cecos["Codi"].astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
-    )
-    mapa_cecos = dim_cecos.set_index("Codi_str")["Centre de cost"]
+    # Cargar índice CECOS (espera dim_cecos.csv en cwd; se cachea en dim_cecos.npz)
+    indice_cecos = IndiceCecos.desde_csv("dim_cecos.csv")
+    motor_tarifas = MotorTarifas.desde_yaml(tarifas, tarifa, referencia=fecha)
 
-    archivos = [f for f in carpeta.iterdir() if f.suffix.lower() == ".csv"]
+    # Los r_*.csv son resultados de una ejecución anterior con salida csv
+    archivos = [f for f in carpeta.iterdir() if f.suffix.lower() == ".csv" and not f.name.startswith("r_")]
     if not archivos:
         print("No se encontraron archivos CSV.")
         return
 
-    required_columns = ['UT Fact.', 'Preu unitari: Calculat per les taules de', 'Mes en que es factura']
-
-    with tqdm(archivos, desc="Procesando archivos CSV", unit="archivo") as pbar:
-        for archivo in pbar:
-            pbar.set_description(f"Archivo: {archivo.name}")
-
-            # Lectura robusta similar a main2.py
-            temp_file = None
-            try:
-                with open(archivo, 'r', encoding='latin-1') as f_in:
-                    lines = f_in.readlines()
-
-                needs_clean = False
-                if lines:
-                    first = lines[0].strip()
-                    if first.startswith('ï»¿"') or first.startswith('"'):
-                        needs_clean = True
-
-                if needs_clean:
-                    pbar.set_postfix(paso="Limpiando formato CSV")
-                    temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8', suffix='.csv')
-                    for line in lines:
-                        clean_line = line.replace('ï»¿', '')
-                        clean_line = clean_line.strip()
-                        if clean_line.startswith('"') and clean_line.endswith('"'):
-                            clean_line = clean_line[1:-1]
-                        temp_file.write(clean_line + '\n')
-                    temp_file.close()
-                    df = pd.read_csv(temp_file.name, sep=',', encoding='utf-8', low_memory=False)
-                else:
-                    df = pd.read_csv(archivo, sep=',', encoding='latin-1', low_memory=False)
-            except Exception as e:
-                try:
-                    df = pd.read_csv(archivo, sep=",", encoding="latin-1", quoting=csv.QUOTE_NONE, low_memory=False)
-                except Exception as e2:
-                    print(f"Error al leer {archivo.name}: {e}")
-                    if temp_file:
-                        try:
-                            os.unlink(temp_file.name)
-                        except Exception:
-                            pass
-                    continue
-            finally:
-                if temp_file:
-                    try:
-                        os.unlink(temp_file.name)
-                    except Exception:
-                        pass
-
-            # Validar columnas
-            pbar.set_postfix(paso="Validando columnas")
-            missing_cols = [col for col in required_columns if col not in df.columns]
-            if missing_cols:
-                print(f"\n❌ Error en {archivo.name}: columnas requeridas NO encontradas: {missing_cols}\n")
-                continue
-
-            # Transform UT Fact
-            pbar.set_postfix(paso="Transformando UT Fact.")
-            df["codigo_ceco"] = (
-                df["UT Fact."].astype(str).str.strip().str.replace(r"\.0$", "", regex=True) + "00"
-            )
-
-            # Cruce CECOS
-            pbar.set_postfix(paso="Cruzando con CECOS")
-            df["nombre_ceco"] = df["codigo_ceco"].map(mapa_cecos)
-
-            # Calcular tasas según el mes con 3 tramos
-            pbar.set_postfix(paso="Calculando Tasas")
-            base_col = "Preu unitari: Calculat per les taules de"
-
-            # Convertir columna de mes si necesario
-            try:
-                mes_series = df['Mes en que es factura'].astype(int)
-            except Exception:
-                mes_series = pd.to_numeric(df['Mes en que es factura'], errors='coerce').fillna(0).astype(int)
-
-            cond1 = mes_series < 7
-            cond2 = (mes_series >= 7) & (mes_series < 11)
-            cond3 = mes_series >= 11
-
-            df['tasa_descuento'] = np.select([cond1, cond2, cond3], [DESCUENTO1, DESCUENTO2, DESCUENTO3], default=0.0)
-            df['tasa_incremento'] = INCREMENTO
-
-            # Calcular importes
-            pbar.set_postfix(paso="Calculando Importes")
-            df[base_col] = pd.to_numeric(df[base_col], errors='coerce').fillna(0.0)
-
-            # Descuento: Precio / (1 + tasa_descuento)
-            df["DESCUENTO_CALCULADO"] = df[base_col] / (1 + df['tasa_descuento'])
-
-            # Incremento: Descuento * (1 + INCREMENTO)
-            df["INCREMENTO_CALCULADO"] = df["DESCUENTO_CALCULADO"] * (1 + df['tasa_incremento'])
-
-            # DIFF
-            df["DIFF"] = df["INCREMENTO_CALCULADO"] - df[base_col]
-
-            # Resumen por CECO
-            pbar.set_postfix(paso="Generando resumen CECO")
-            df_resumen = df.groupby(["nombre_ceco", "codigo_ceco"], as_index=False)["DIFF"].sum()
-
-            # Guardar Excel
-            output_path = archivo.with_name("r_" + archivo.stem + ".xlsx")
-            pbar.set_postfix(paso="Escribiendo Excel...")
-            with pd.ExcelWriter(output_path, engine="openpyxl", mode="w") as writer:
-                df_resumen.to_excel(writer, sheet_name="Resumen_CECO", index=False)
-                df.to_excel(writer, sheet_name="Detalle_Procesado", index=False)
-
-            pbar.set_postfix(paso="OK")
+    # Omitir los archivos ya procesados con las mismas entradas y reglas (ver manifiesto.py)
+    manifiesto = Manifiesto(carpeta, reglas=f"{motor_tarifas.huella}|cecos:{indice_cecos.huella}:{VERSION_CRUCE}|{salida}")
+    pendientes = [f for f in archivos
+                  if forzar or manifiesto.pendiente(f, rutas_salida(salida, f), con_agregado=consolidar)]
+    if len(pendientes) < len(archivos):
+        print(f"{len(archivos) - len(pendientes)} archivo(s) sin cambios desde la última ejecución (ver {MANIFIESTO})")
+
+    # Agregado consolidado: los archivos omitidos aportan el guardado en el manifiesto
+    consolidado = Consolidado() if consolidar else None
+    if consolidado is not None:
+        for archivo in archivos:
+            if archivo not in pendientes:
+                consolidado.unir(archivo.name, manifiesto.agregado(archivo))
+
+    def al_terminar(archivo, filas, agregado=None):
+        if filas is None:
+            manifiesto.olvidar(archivo)
+            return
+        manifiesto.registrar(archivo, filas, rutas_salida(salida, archivo), agregado)
+        if consolidado is not None:
+            consolidado.unir(archivo.name, agregado)
+
+    workers = min(workers or os.cpu_count() or 1, max(len(pendientes), 1))
+    try:
+        if workers > 1:
+            _procesar_en_paralelo(pendientes, indice_cecos, motor_tarifas, workers, streaming, chunksize, salida,
+                                  al_terminar, consolidar)
+        elif pendientes:
+            # El consolidado local solo acumula el archivo en curso; al terminar se fija su agregado
+            en_curso = Consolidado() if consolidar else None
+            with tqdm(pendientes, desc="Procesando archivos CSV", unit="archivo") as pbar:
+                for archivo in pbar:
+                    pbar.set_description(f"Archivo: {archivo.name}")
+                    filas = procesar_archivo(archivo, indice_cecos, motor_tarifas, streaming, chunksize, pbar, salida,
+                                             en_curso)
+                    agregado = None
+                    if en_curso is not None:
+                        agregado = en_curso.cerrar_archivo(archivo.name) if filas is not None else None
+                        en_curso.descartar(archivo.name)
+                    al_terminar(archivo, filas, agregado)
+                    if filas is not None:
+                        pbar.set_postfix(paso="OK")
+    finally:
+        manifiesto.guardar()
+
+    if consolidado is not None:
+        ruta = consolidado.escribir(carpeta)
+        print(f"Resumen consolidado de {len(consolidado.archivos)} archivo(s): {ruta}")
 
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Error: Debes especificar la ruta de la carpeta a procesar.")
-        print("Uso: python main3.py <ruta_carpeta>")
-        sys.exit(1)
-    ruta_exports = sys.argv[1]
-    print(f"Procesando carpeta: {ruta_exports}")
-    procesar_xlsx(ruta_exports)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Regulariza los exports CSV de facturación de una carpeta")
+    parser.add_argument("ruta_carpeta", help="Carpeta con los CSV a procesar")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Leer y escribir por bloques (memoria acotada por --chunksize)")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help=f"Filas por bloque (default: {CHUNKSIZE})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Archivos en paralelo, un proceso por archivo (0 = uno por núcleo; default: 1)")
+    parser.add_argument("--salida", choices=FORMATOS, default="xlsx",
+                        help="xlsx (detalle + resumen), csv, parquet o resumen (solo Resumen_CECO); default: xlsx")
+    parser.add_argument("--tarifas", default=RUTA_TARIFAS, help="YAML con las tablas de tasas (default: tarifas.yaml)")
+    parser.add_argument("--tarifa", default=TARIFA, help=f"Tarifa del YAML a aplicar (default: {TARIFA})")
+    parser.add_argument("--fecha", help="Fecha de vigencia YYYY-MM-DD para filas sin columna de año (default: hoy)")
+    parser.add_argument("--forzar", action="store_true",
+                        help=f"Reprocesar todos los archivos aunque no hayan cambiado (ignora {MANIFIESTO})")
+    parser.add_argument("--consolidado", action="store_true",
+                        help="Escribir también r_consolidado.xlsx: resumen por archivo, CECO y mes con totales")
+    args = parser.parse_args()
+
+    print(f"Procesando carpeta: {args.ruta_carpeta}")
+    procesar_xlsx(args.ruta_carpeta, streaming=args.streaming, chunksize=args.chunksize, workers=args.workers,
+                  salida=args.salida, tarifas=args.tarifas, tarifa=args.tarifa, fecha=args.fecha,
+                  forzar=args.forzar, consolidar=args.consolidado)
@@ -0,0 +1,131 @@
+"""
+Manifiesto de entradas procesadas por el regularizador.
+
+Junto a los resultados se guarda `r_manifiesto.json` con, por cada CSV de
+entrada, su tamaño, fecha de modificación y SHA-256, la huella de las reglas
+con que se procesó (versión de la tarifa, tabla de CECOS y formato de salida)
+y las salidas que generó (más su agregado por CECO y mes en modo consolidado,
+ver consolidado.py). En la siguiente ejecución un archivo se omite si:
+
+- las reglas son las mismas,
+- sus salidas siguen existiendo, y
+- tamaño y fecha coinciden o, si la fecha cambió, el contenido (hash) es el mismo.
+
+Cualquier cambio en la entrada o en las reglas hace que se vuelva a procesar.
+
+Uso:
+    manifiesto = Manifiesto(carpeta, reglas="main3@...")
+    if manifiesto.pendiente(archivo, salidas):
+        ...
+        manifiesto.registrar(archivo, filas, salidas)
+    manifiesto.guardar()
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+NOMBRE = "r_manifiesto.json"
+VERSION = 1
+
+
+def hash_archivo(ruta, bloque=1024 * 1024):
+    """SHA-256 del contenido del archivo, leído por bloques."""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for datos in iter(lambda: f.read(bloque), b""):
+            h.update(datos)
+    return h.hexdigest()
+
+
+class Manifiesto:
+    """Registro JSON de las entradas procesadas en una carpeta."""
+
+    def __init__(self, carpeta, reglas):
+        """
+        Args:
+            carpeta: Carpeta de los CSV (el manifiesto se guarda en ella)
+            reglas: Huella de las reglas de cálculo y del formato de salida
+        """
+        self.ruta = os.path.join(carpeta, NOMBRE)
+        self.reglas = reglas
+        self.entradas = {}
+        self._hashes = {}
+        if os.path.exists(self.ruta):
+            try:
+                with open(self.ruta, "r", encoding="utf-8") as f:
+                    datos = json.load(f)
+                if datos.get("version") == VERSION:
+                    self.entradas = datos.get("archivos", {})
+            except (OSError, ValueError):
+                self.entradas = {}
+
+    def _hash(self, archivo):
+        clave = str(archivo)
+        if clave not in self._hashes:
+            self._hashes[clave] = hash_archivo(archivo)
+        return self._hashes[clave]
+
+    def pendiente(self, archivo, salidas, con_agregado=False):
+        """
+        True si el archivo hay que procesarlo: es nuevo, cambió su contenido,
+        cambiaron las reglas, falta alguna de sus salidas o (con `con_agregado`)
+        no tiene agregado consolidado guardado.
+        """
+        entrada = self.entradas.get(archivo.name)
+        if not entrada or entrada.get("reglas") != self.reglas:
+            return True
+        if con_agregado and "agregado" not in entrada:
+            return True
+        if not all(os.path.exists(s) for s in salidas):
+            return True
+        estado = os.stat(archivo)
+        if entrada["size"] != estado.st_size:
+            return True
+        if entrada["mtime_ns"] == estado.st_mtime_ns:
+            return False
+        # Misma longitud y otra fecha: decide el contenido
+        if self._hash(archivo) != entrada["sha256"]:
+            return True
+        entrada["mtime_ns"] = estado.st_mtime_ns
+        return False
+
+    def registrar(self, archivo, filas, salidas, agregado=None):
+        """Anota un archivo procesado correctamente (con su agregado consolidado, si lo hay)."""
+        estado = os.stat(archivo)
+        anterior = self.entradas.get(archivo.name, {})
+        entrada = self.entradas[archivo.name] = {
+            "size": estado.st_size,
+            "mtime_ns": estado.st_mtime_ns,
+            "sha256": self._hash(archivo),
+            "reglas": self.reglas,
+            "filas": filas,
+            "salidas": [os.path.basename(s) for s in salidas],
+            "procesado": datetime.now().isoformat(timespec="seconds"),
+        }
+        if agregado is not None:
+            entrada["agregado"] = json.loads(agregado.to_json(orient="split", index=False))
+        elif "agregado" in anterior and anterior.get("sha256") == entrada["sha256"] \
+                and anterior.get("reglas") == self.reglas:
+            entrada["agregado"] = anterior["agregado"]
+
+    def agregado(self, archivo):
+        """Agregado consolidado guardado del archivo (None si no hay)."""
+        guardado = self.entradas.get(archivo.name, {}).get("agregado")
+        if guardado is None:
+            return None
+        return pd.DataFrame(guardado["data"], columns=guardado["columns"])
+
+    def olvidar(self, archivo):
+        """Quita un archivo del manifiesto (ej: falló al procesarlo)."""
+        self.entradas.pop(archivo.name, None)
+
+    def guardar(self):
+        """Escribe el manifiesto (sustitución atómica)."""
+        tmp = self.ruta + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "archivos": self.entradas}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.ruta)
@@ -0,0 +1,282 @@
+"""
+Escritores de resultados del regularizador.
+
+Cada escritor recibe el detalle por bloques (`escribir_detalle`, tantas veces
+como haga falta) y el resumen por CECO una vez (`escribir_resumen`), y escribe
+la salida sin volver a tener el detalle entero en memoria:
+
+- xlsx: r_<archivo>.xlsx con hojas Resumen_CECO y Detalle_Procesado (libro
+  openpyxl write-only, memoria constante). Si el detalle supera el límite de
+  filas de Excel continúa en Detalle_Procesado_2, _3...
+- csv: r_<archivo>_detalle.csv y r_<archivo>_resumen.csv (UTF-8 con BOM)
+- parquet: r_<archivo>_detalle.parquet y r_<archivo>_resumen.parquet (requiere
+  pyarrow). El esquema del detalle se fija con el primer bloque: columnas de
+  esquema.py con su tipo y el resto como texto, para que un bloque posterior
+  con otros valores no cambie el tipo de una columna
+- resumen: solo r_<archivo>.xlsx con la hoja Resumen_CECO
+
+Si el bloque `with` termina con una excepción, el escritor se descarta
+(`abortar`): libera el archivo y borra las salidas a medio escribir.
+
+Uso:
+    from salida import crear_escritor
+
+    with crear_escritor("xlsx", archivo) as escritor:
+        escritor.escribir_detalle(df)
+        escritor.escribir_resumen(df_resumen)
+"""
+
+import numpy as np
+import pandas as pd
+
+from esquema import TIPOS, TIPOS_CALCULO
+
+# pyarrow es opcional: solo se necesita para la salida Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+FORMATOS = ("xlsx", "csv", "parquet", "resumen")
+
+# Filas por hoja en Excel (cabecera incluida)
+MAX_FILAS_EXCEL = 1_048_576
+
+# Archivos que escribe cada formato: r_<archivo><sufijo>
+SUFIJOS = {
+    "xlsx": (".xlsx",),
+    "resumen": (".xlsx",),
+    "csv": ("_detalle.csv", "_resumen.csv"),
+    "parquet": ("_detalle.parquet", "_resumen.parquet"),
+}
+
+HOJA_RESUMEN = "Resumen_CECO"
+HOJA_DETALLE = "Detalle_Procesado"
+
+
+def _filas_excel(df):
+    """Filas de `df` como tuplas, con NaN convertidos a celdas vacías."""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+class EscritorSalida:
+    """Base de los escritores: el detalle llega por bloques y el resumen al final."""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.filas = 0
+        self.rutas = []
+        # Archivos ya empezados por este escritor (se borran si se aborta)
+        self._escritos = []
+
+    def _ruta(self, sufijo):
+        return self.archivo.with_name("r_" + self.archivo.stem + sufijo)
+
+    def _empezar(self, ruta):
+        if ruta not in self._escritos:
+            self._escritos.append(ruta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.cerrar()
+        else:
+            self.abortar()
+
+    def escribir_detalle(self, df):
+        raise NotImplementedError
+
+    def escribir_resumen(self, df_resumen):
+        raise NotImplementedError
+
+    def cerrar(self):
+        pass
+
+    def abortar(self):
+        """Descarta la salida: borra los archivos que este escritor dejó a medias."""
+        for ruta in self._escritos:
+            ruta.unlink(missing_ok=True)
+        self._escritos = []
+        self.rutas = []
+
+
+class EscritorXlsx(EscritorSalida):
+    """Libro write-only; el detalle pasa a una hoja nueva al llegar a `max_filas`."""
+
+    def __init__(self, archivo, detalle=True, max_filas=MAX_FILAS_EXCEL):
+        from openpyxl import Workbook
+
+        super().__init__(archivo)
+        self.max_filas = max_filas
+        self.wb = Workbook(write_only=True)
+        # La hoja de resumen va primera aunque se escriba al final
+        self.ws_resumen = self.wb.create_sheet(HOJA_RESUMEN)
+        self.detalle = detalle
+        self.hojas_detalle = 0
+        self._ws_detalle = None
+        self._filas_hoja = 0
+
+    def _nueva_hoja(self, columnas):
+        self.hojas_detalle += 1
+        nombre = HOJA_DETALLE if self.hojas_detalle == 1 else f"{HOJA_DETALLE}_{self.hojas_detalle}"
+        self._ws_detalle = self.wb.create_sheet(nombre)
+        self._ws_detalle.append(columnas)
+        self._filas_hoja = 1
+
+    def escribir_detalle(self, df):
+        self.filas += len(df)
+        if not self.detalle:
+            return
+        columnas = list(df.columns)
+        if self._ws_detalle is None:
+            self._nueva_hoja(columnas)
+        for fila in _filas_excel(df):
+            if self._filas_hoja >= self.max_filas:
+                self._nueva_hoja(columnas)
+            self._ws_detalle.append(fila)
+            self._filas_hoja += 1
+
+    def escribir_resumen(self, df_resumen):
+        self.ws_resumen.append(list(df_resumen.columns))
+        for fila in _filas_excel(df_resumen):
+            self.ws_resumen.append(fila)
+
+    def cerrar(self):
+        ruta = self._ruta(".xlsx")
+        self._empezar(ruta)
+        self.wb.save(ruta)
+        self.rutas.append(ruta)
+
+    def abortar(self):
+        # Las hojas write-only escriben en un temporal hasta guardar: se cierran para liberarlo
+        for ws in self.wb.worksheets:
+            try:
+                ws.close()
+            except Exception:
+                pass  # ya cerrada por un save a medias
+        super().abortar()
+
+
+class EscritorCsv(EscritorSalida):
+    """Detalle y resumen en dos CSV; el detalle se añade bloque a bloque."""
+
+    def __init__(self, archivo):
+        super().__init__(archivo)
+        self.ruta_detalle = self._ruta("_detalle.csv")
+        self.ruta_resumen = self._ruta("_resumen.csv")
+
+    def escribir_detalle(self, df):
+        primero = self.filas == 0
+        self._empezar(self.ruta_detalle)
+        df.to_csv(self.ruta_detalle, mode="w" if primero else "a", header=primero, index=False,
+                  encoding="utf-8-sig" if primero else "utf-8")
+        self.filas += len(df)
+
+    def escribir_resumen(self, df_resumen):
+        self._empezar(self.ruta_resumen)
+        df_resumen.to_csv(self.ruta_resumen, index=False, encoding="utf-8-sig")
+
+    def cerrar(self):
+        self.rutas = [self.ruta_detalle, self.ruta_resumen]
+
+
+class EscritorParquet(EscritorSalida):
+    """Detalle en un Parquet escrito por row groups (un bloque = un row group) y resumen aparte."""
+
+    def __init__(self, archivo, compression="zstd"):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("La salida Parquet requiere pyarrow. Instalar con: pip install pyarrow")
+        super().__init__(archivo)
+        self.compression = compression
+        self.ruta_detalle = self._ruta("_detalle.parquet")
+        self.ruta_resumen = self._ruta("_resumen.parquet")
+        self._writer = None
+
+    def escribir_detalle(self, df):
+        if self._writer is None:
+            self._empezar(self.ruta_detalle)
+            self._writer = pq.ParquetWriter(self.ruta_detalle, esquema_detalle(df.columns),
+                                            compression=self.compression)
+        self._writer.write_table(_tabla_detalle(df, self._writer.schema))
+        self.filas += len(df)
+
+    def escribir_resumen(self, df_resumen):
+        self._empezar(self.ruta_resumen)
+        pq.write_table(pa.Table.from_pandas(df_resumen, preserve_index=False), self.ruta_resumen,
+                       compression=self.compression)
+
+    def _cerrar_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def cerrar(self):
+        self._cerrar_writer()
+        self.rutas = [self.ruta_detalle, self.ruta_resumen]
+
+    def abortar(self):
+        self._cerrar_writer()
+        super().abortar()
+
+
+def _tipo_arrow(tipo):
+    """Tipo de pyarrow de un tipo de esquema.py (texto si no es numérico ni categoría)."""
+    if tipo == "category":
+        return pa.dictionary(pa.int32(), pa.string())
+    if tipo in ("Int8", "Int16", "float64"):
+        return pa.type_for_alias(tipo.lower())
+    return pa.string()
+
+
+def esquema_detalle(columnas):
+    """Esquema Parquet del detalle: tipos de esquema.py y texto para el resto de columnas."""
+    tipos = {**TIPOS, **TIPOS_CALCULO}
+    return pa.schema([(c, _tipo_arrow(tipos.get(c))) for c in columnas])
+
+
+def _columna_arrow(serie, tipo):
+    """Convierte una columna al tipo del esquema; los valores que no encajan quedan vacíos."""
+    if pa.types.is_string(tipo) or pa.types.is_dictionary(tipo):
+        array = pa.array(serie.astype("string"), from_pandas=True).cast(pa.string())
+        return array.dictionary_encode() if pa.types.is_dictionary(tipo) else array
+    valores = pa.array(pd.to_numeric(serie, errors="coerce").astype("float64"), from_pandas=True)
+    if pa.types.is_integer(tipo):
+        limites = np.iinfo(tipo.to_pandas_dtype())
+        valido = pc.and_(pc.equal(pc.floor(valores), valores),
+                         pc.and_(pc.greater_equal(valores, limites.min), pc.less_equal(valores, limites.max)))
+        valores = pc.if_else(valido, valores, pa.scalar(None, pa.float64()))
+    return valores.cast(tipo)
+
+
+def _tabla_detalle(df, esquema):
+    """Bloque del detalle como tabla con el esquema del archivo."""
+    return pa.Table.from_arrays([_columna_arrow(df[campo.name], campo.type) for campo in esquema], schema=esquema)
+
+
+def rutas_salida(formato, archivo):
+    """Rutas de los archivos que escribe `formato` para el CSV `archivo`."""
+    return [archivo.with_name("r_" + archivo.stem + sufijo) for sufijo in SUFIJOS[formato]]
+
+
+def crear_escritor(formato, archivo):
+    """
+    Escritor de resultados para un CSV de entrada.
+
+    Args:
+        formato: xlsx, csv, parquet o resumen
+        archivo: Path del CSV procesado (las salidas se nombran r_<archivo>...)
+    """
+    if formato == "xlsx":
+        return EscritorXlsx(archivo)
+    if formato == "resumen":
+        return EscritorXlsx(archivo, detalle=False)
+    if formato == "csv":
+        return EscritorCsv(archivo)
+    if formato == "parquet":
+        return EscritorParquet(archivo)
+    raise ValueError(f"Formato de salida no soportado: {formato} (opciones: {', '.join(FORMATOS)})")
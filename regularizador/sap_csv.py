@@ -0,0 +1,109 @@
+"""
+Lectura de los CSV exportados de SAP sin archivos temporales.
+
+SAP puede escribir el export con BOM (`ï»¿` al leerlo como latin-1) y cada
+línea completa entre comillas. En lugar de reescribir el archivo entero en
+un temporal limpio, `SapCsvStream` envuelve el archivo y quita el BOM y las
+comillas exteriores de cada línea a medida que `pd.read_csv` va leyendo.
+
+El formato se detecta leyendo solo los primeros KB del archivo.
+
+Uso:
+    from sap_csv import abrir_csv_sap
+
+    with abrir_csv_sap(archivo) as fuente:
+        df = pd.read_csv(fuente, sep=',', low_memory=False)
+"""
+
+import io
+
+# Bytes que se leen para detectar el formato
+SNIFF_BYTES = 8192
+
+BOM_ARTIFACTS = ('ï»¿', '﻿')
+
+
+def detectar_entrecomillado(ruta, encoding='latin-1', sniff_bytes=SNIFF_BYTES):
+    """True si la primera línea (sin BOM) empieza por comilla: formato SAP con líneas entrecomilladas."""
+    with open(ruta, 'rb') as f:
+        muestra = f.read(sniff_bytes)
+    primera = muestra.decode(encoding, errors='replace').split('\n', 1)[0].strip()
+    for bom in BOM_ARTIFACTS:
+        primera = primera.replace(bom, '')
+    return primera.startswith('"')
+
+
+def limpiar_linea(line):
+    """Quita BOM, espacios y las comillas exteriores de una línea; devuelve la línea con '\\n'."""
+    for bom in BOM_ARTIFACTS:
+        line = line.replace(bom, '')
+    line = line.strip()
+    if line.startswith('"') and line.endswith('"'):
+        line = line[1:-1]
+    return line + '\n'
+
+
+class SapCsvStream(io.TextIOBase):
+    """Archivo de texto de solo lectura que entrega las líneas ya limpias (ver `limpiar_linea`)."""
+
+    def __init__(self, ruta, encoding='latin-1'):
+        self._raw = open(ruta, 'r', encoding=encoding, newline='')
+        self._buffer = ''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._buffer + ''.join(limpiar_linea(line) for line in self._raw)
+            self._buffer = ''
+            return data
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while length < size:
+            line = self._raw.readline()
+            if not line:
+                break
+            line = limpiar_linea(line)
+            parts.append(line)
+            length += len(line)
+        data = ''.join(parts)
+        self._buffer = data[size:]
+        return data[:size]
+
+    def readline(self, size=-1):
+        if self._buffer:
+            line, sep, rest = self._buffer.partition('\n')
+            if sep:
+                self._buffer = rest
+                return line + sep
+            self._buffer = ''
+            raw = self._raw.readline()
+            return line + (limpiar_linea(raw) if raw else '')
+        raw = self._raw.readline()
+        return limpiar_linea(raw) if raw else ''
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+def abrir_csv_sap(ruta, encoding='latin-1'):
+    """
+    Abre un export SAP para `pd.read_csv`.
+
+    Returns:
+        SapCsvStream si las líneas vienen entrecomilladas; si no, el archivo de texto tal cual
+    """
+    if detectar_entrecomillado(ruta, encoding):
+        return SapCsvStream(ruta, encoding)
+    return open(ruta, 'r', encoding=encoding, newline='')
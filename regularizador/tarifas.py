@@ -0,0 +1,158 @@
+"""
+Motor de tasas del regularizador.
+
+Carga una tarifa de `tarifas.yaml` (versiones con fecha de entrada en vigor,
+cada una con tramos por mes de facturación) y calcula las tasas de todas las
+filas con dos `np.searchsorted`: uno sobre las fechas de vigencia para elegir
+la versión y otro sobre la clave (versión, mes) para elegir el tramo. El coste
+no depende del número de tramos ni de versiones.
+
+Uso:
+    from tarifas import MotorTarifas
+
+    motor = MotorTarifas.desde_yaml("tarifas.yaml", tarifa="main3")
+    df = motor.aplicar(df, "Preu unitari: Calculat per les taules de", mes)
+"""
+
+import hashlib
+import json
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+RUTA_TARIFAS = Path(__file__).with_name("tarifas.yaml")
+
+# Los meses se acotan a [MES_MIN, MES_MAX]; un tramo sin límite llega hasta ellos
+MES_MIN = 0
+MES_MAX = 13
+# Separación entre versiones en la clave compuesta versión * PASO + mes
+PASO = 100
+
+
+class MotorTarifas:
+    """Versiones de una tarifa aplanadas en arrays ordenados (inicio, fin y tasas de cada tramo)."""
+
+    def __init__(self, versiones, referencia=None, columnas_anio=None, nombre=None):
+        """
+        Args:
+            versiones: Lista de {vigente_desde, tramos: [{mes_desde, mes_hasta, descuento, incremento}]}
+            referencia: Fecha para las filas sin año (por defecto hoy)
+            columnas_anio: Columnas candidatas con el año de factura
+            nombre: Nombre de la tarifa (informativo)
+
+        Raises:
+            ValueError: Si no hay versiones o dos tramos de una versión se solapan
+        """
+        if not versiones:
+            raise ValueError(f"Tarifa sin versiones: {nombre}")
+        self.nombre = nombre
+        self.referencia = np.datetime64(referencia or date.today(), "D")
+        self.columnas_anio = list(columnas_anio or [])
+
+        versiones = sorted(versiones, key=lambda v: str(v["vigente_desde"]))
+        self.desde = np.array([str(v["vigente_desde"]) for v in versiones], dtype="datetime64[D]")
+
+        inicio, fin, descuento, incremento, version = [], [], [], [], []
+        for n, v in enumerate(versiones):
+            tramos = sorted(v["tramos"], key=lambda t: t.get("mes_desde", MES_MIN))
+            for t in tramos:
+                desde = max(t.get("mes_desde", MES_MIN), MES_MIN)
+                hasta = min(t.get("mes_hasta", MES_MAX), MES_MAX)
+                if fin and version[-1] == n and n * PASO + desde <= fin[-1]:
+                    raise ValueError(f"Tramos solapados en la versión {v['vigente_desde']} de {nombre}: {t}")
+                inicio.append(n * PASO + desde)
+                fin.append(n * PASO + hasta)
+                descuento.append(float(t["descuento"]))
+                incremento.append(float(t["incremento"]))
+                version.append(n)
+        self.inicio = np.array(inicio, dtype=float)
+        self.fin = np.array(fin, dtype=float)
+        self.descuento = np.array(descuento)
+        self.incremento = np.array(incremento)
+        self.version = np.array(version)
+
+        # Huella de la tarifa y de la versión vigente en la fecha de referencia (ver manifiesto.py)
+        contenido = json.dumps([nombre, versiones], sort_keys=True, default=str)
+        vigente = np.searchsorted(self.desde, self.referencia, side="right") - 1
+        self.huella = (f"{nombre}:{hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:16]}"
+                       f"@{self.desde[vigente] if vigente >= 0 else '-'}")
+
+    @classmethod
+    def desde_yaml(cls, ruta=RUTA_TARIFAS, tarifa="main3", referencia=None):
+        """
+        Carga la tarifa `tarifa` de un YAML con la estructura de tarifas.yaml.
+
+        Raises:
+            KeyError: Si la tarifa no está en el archivo
+        """
+        with open(ruta, "r", encoding="utf-8") as f:
+            datos = yaml.safe_load(f) or {}
+        tarifas = datos.get("tarifas", {}) or {}
+        if tarifa not in tarifas:
+            raise KeyError(f"Tarifa '{tarifa}' no encontrada en {ruta}. Disponibles: {list(tarifas)}")
+        return cls(tarifas[tarifa], referencia=referencia, columnas_anio=datos.get("columnas_anio"),
+                   nombre=tarifa)
+
+    def fechas(self, df, mes):
+        """
+        Fecha de vigencia de cada fila: 1 del mes de facturación del año de la
+        columna de año si el export la tiene; si no, o si el año o el mes están
+        vacíos, la fecha de referencia.
+        """
+        columna = next((c for c in self.columnas_anio if c in df.columns), None)
+        if columna is None:
+            return self.referencia
+        # float64: los tipos enteros con vacíos (Int16/Int8 de esquema.py) no se pueden ensamblar
+        anio = pd.to_numeric(df[columna], errors="coerce").astype("float64")
+        mes = np.floor(pd.to_numeric(pd.Series(mes, index=df.index), errors="coerce").astype("float64")).clip(1, 12)
+        fechas = pd.to_datetime(pd.DataFrame({"year": anio, "month": mes, "day": 1}), errors="coerce")
+        return fechas.to_numpy(dtype="datetime64[D]", na_value=self.referencia)
+
+    def tasas(self, mes, fechas=None):
+        """
+        Tasas de descuento e incremento por fila.
+
+        Args:
+            mes: Mes de facturación por fila (NaN = sin tramo)
+            fechas: Fecha de vigencia por fila o una sola fecha (por defecto la de referencia)
+
+        Returns:
+            tuple: (tasa_descuento, tasa_incremento) como arrays float64; 0.0 si ningún tramo aplica
+        """
+        mes = np.asarray(mes, dtype=float)
+        fechas = np.broadcast_to(np.asarray(self.referencia if fechas is None else fechas,
+                                            dtype="datetime64[D]"), mes.shape)
+
+        version = np.searchsorted(self.desde, fechas, side="right") - 1
+        clave = version * PASO + np.clip(mes, MES_MIN, MES_MAX)
+        tramo = np.searchsorted(self.inicio, clave, side="right") - 1
+        tramo_ok = np.clip(tramo, 0, len(self.inicio) - 1)
+        valido = ((version >= 0) & (tramo >= 0) & ~np.isnan(mes)
+                  & (self.version[tramo_ok] == version) & (clave <= self.fin[tramo_ok]))
+        return (np.where(valido, self.descuento[tramo_ok], 0.0),
+                np.where(valido, self.incremento[tramo_ok], 0.0))
+
+    def aplicar(self, df, base_col, mes):
+        """
+        Añade a `df` tasa_descuento, tasa_incremento, DESCUENTO_CALCULADO,
+        INCREMENTO_CALCULADO y DIFF.
+
+        Args:
+            df: Filas del export
+            base_col: Columna con el precio base
+            mes: Mes de facturación por fila
+        """
+        df["tasa_descuento"], df["tasa_incremento"] = self.tasas(mes, self.fechas(df, mes))
+
+        # Descuento: Precio / (1 + tasa_descuento)
+        df["DESCUENTO_CALCULADO"] = df[base_col].astype(float) / (1 + df["tasa_descuento"])
+
+        # Incremento: Descuento * (1 + tasa_incremento)
+        df["INCREMENTO_CALCULADO"] = df["DESCUENTO_CALCULADO"] * (1 + df["tasa_incremento"])
+
+        # DIFF
+        df["DIFF"] = df["INCREMENTO_CALCULADO"] - df[base_col]
+        return df
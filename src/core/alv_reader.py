@@ -0,0 +1,179 @@
+"""
+ALV Grid Reader
+===============
+Lectura directa de un ALV Grid (GuiGridView) sin pasar por la exportación a Excel.
+
+El grid solo carga las filas visibles, por eso se lee por bloques desplazando
+`FirstVisibleRow`. Los metadatos de columnas se leen una sola vez y las filas se
+entregan con un generador, de forma que se pueden escribir a disco (CSV o
+Parquet) sin mantener el resultado completo en memoria.
+
+Uso:
+    from src.core.alv_reader import AlvReader
+
+    reader = AlvReader(alv)
+    rows = reader.to_csv("exports/cliente.csv", columns=["KUNNR", "NETWR"])
+"""
+
+import csv
+import logging
+
+logger = logging.getLogger("SAP_Automation")
+
+# pyarrow es opcional: solo se necesita para escribir Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logger.debug("pyarrow module not available. Parquet output disabled.")
+
+DEFAULT_BLOCK_SIZE = 50
+
+
+class AlvReader:
+    """Lector por bloques de un ALV Grid de SAP GUI."""
+
+    def __init__(self, grid, block_size=None):
+        """
+        Args:
+            grid: GuiGridView (shell ALV devuelto por find_alv_shell)
+            block_size: Filas por bloque. Por defecto, las filas visibles del grid.
+        """
+        self.grid = grid
+        self.block_size = block_size
+        self._columns = None
+
+    def columns(self):
+        """
+        Devuelve los metadatos de columnas como lista de (nombre_técnico, título).
+
+        Se leen una sola vez por lector.
+        """
+        if self._columns is None:
+            names = [self.grid.ColumnOrder(i) for i in range(self.grid.ColumnOrder.Count)]
+            columns = []
+            for name in names:
+                try:
+                    title = self.grid.GetDisplayedColumnTitle(name)
+                except Exception:
+                    title = name
+                columns.append((name, title or name))
+            self._columns = columns
+        return self._columns
+
+    def select_columns(self, columns=None):
+        """
+        Resuelve una proyección de columnas.
+
+        Args:
+            columns: Nombres técnicos o títulos visibles. None = todas.
+
+        Returns:
+            list: (nombre_técnico, título) en el orden pedido
+        """
+        available = self.columns()
+        if not columns:
+            return available
+
+        by_name = {name: (name, title) for name, title in available}
+        by_title = {title: (name, title) for name, title in available}
+        selected = []
+        for col in columns:
+            match = by_name.get(col) or by_title.get(col)
+            if match is None:
+                raise KeyError(f"Column not found in ALV: {col}")
+            selected.append(match)
+        return selected
+
+    def iter_rows(self, columns=None):
+        """
+        Genera las filas del grid como listas de valores (str).
+
+        Args:
+            columns: Proyección opcional (nombres técnicos o títulos)
+        """
+        names = [name for name, _ in self.select_columns(columns)]
+        row_count = self.grid.RowCount
+        block = self._block_size()
+
+        for start in range(0, row_count, block):
+            # Desplazar el grid para que SAP cargue el bloque
+            self.grid.FirstVisibleRow = start
+            for row in range(start, min(start + block, row_count)):
+                yield [self.grid.GetCellValue(row, name) for name in names]
+
+    def to_csv(self, path, columns=None, delimiter=",", encoding="latin-1", header="title"):
+        """
+        Escribe el grid en un CSV fila a fila.
+
+        Args:
+            path: Ruta del archivo de salida
+            columns: Proyección opcional
+            delimiter: Separador de campos
+            encoding: Codificación (latin-1 por defecto, como las exportaciones SAP)
+            header: "title" (títulos visibles) o "name" (nombres técnicos)
+
+        Returns:
+            int: Número de filas escritas
+        """
+        selected = self.select_columns(columns)
+        rows = 0
+        with open(path, "w", newline="", encoding=encoding, errors="replace") as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            writer.writerow([title if header == "title" else name for name, title in selected])
+            for row in self.iter_rows([name for name, _ in selected]):
+                writer.writerow(row)
+                rows += 1
+        logger.info(f"ALV read directly: {rows} rows x {len(selected)} columns -> {path}")
+        return rows
+
+    def to_parquet(self, path, columns=None, header="title", chunk_rows=50000):
+        """
+        Escribe el grid en un archivo Parquet por lotes de `chunk_rows` filas.
+
+        Returns:
+            int: Número de filas escritas
+        """
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Parquet output requires pyarrow. Install with: pip install pyarrow")
+
+        selected = self.select_columns(columns)
+        fields = [title if header == "title" else name for name, title in selected]
+        schema = pa.schema([(field, pa.string()) for field in fields])
+
+        rows = 0
+        batch = []
+        with pq.ParquetWriter(path, schema) as writer:
+            for row in self.iter_rows([name for name, _ in selected]):
+                batch.append(row)
+                if len(batch) >= chunk_rows:
+                    writer.write_table(self._to_table(batch, fields, schema))
+                    rows += len(batch)
+                    batch = []
+            if batch or rows == 0:
+                writer.write_table(self._to_table(batch, fields, schema))
+                rows += len(batch)
+        logger.info(f"ALV read directly: {rows} rows x {len(selected)} columns -> {path}")
+        return rows
+
+    def write(self, path, columns=None, **kwargs):
+        """Escribe en CSV o Parquet según la extensión de `path`."""
+        if str(path).lower().endswith(".parquet"):
+            return self.to_parquet(path, columns=columns, **kwargs)
+        return self.to_csv(path, columns=columns, **kwargs)
+
+    def _block_size(self):
+        if self.block_size:
+            return self.block_size
+        try:
+            visible = int(self.grid.VisibleRowCount)
+        except Exception:
+            visible = 0
+        return visible if visible > 0 else DEFAULT_BLOCK_SIZE
+
+    @staticmethod
+    def _to_table(batch, fields, schema):
+        data = {field: [row[i] for row in batch] for i, field in enumerate(fields)}
+        return pa.table(data, schema=schema)
@@ -0,0 +1,322 @@
+"""
+Dialog Watcher
+==============
+Vigilante de ventanas modales de SAP GUI que corre en segundo plano junto al
+flujo de exportación.
+
+Un registro de manejadores (`DialogHandler`) describe cada diálogo por tipo
+de ventana, título, controles presentes y etiquetas de botones (aviso de
+seguridad "Permetre/Permitir/Allow", formato de exportación o de fichero local,
+Guardar como).
+En cuanto aparece una ventana `wnd[1]`/`wnd[2]` que encaja con un manejador,
+el vigilante ejecuta su acción y lo señala con un `threading.Event`, de modo
+que el flujo principal espera a la señal (`wait_for`) en lugar de reintentar a
+ciegas. Los diálogos opcionales (aviso de seguridad) se atienden sin que el
+flujo principal tenga que esperarlos.
+
+El hilo del vigilante abre su propio apartamento COM y recibe la sesión
+serializada (marshalling) desde el hilo que lo arranca.
+
+Uso:
+    from src.core.dialog_watcher import DialogWatcher, export_format_handler, save_as_handler
+
+    with DialogWatcher(session) as watcher:
+        watcher.arm(save_as_handler("C:/exports", "cliente.csv"))
+        watcher.arm(export_format_handler("csv-LEAN-STANDARD"))
+        alv.ContextMenu()
+        alv.SelectContextMenuItem("&XXL")
+        watcher.wait_for("save_as", timeout=30)
+"""
+
+import logging
+import threading
+
+from src.core.sap_utils import com_apartment, find_button, PYTHONCOM_AVAILABLE, SECURITY_LABELS
+
+if PYTHONCOM_AVAILABLE:
+    import pythoncom
+    import win32com.client
+
+logger = logging.getLogger("SAP_Automation")
+
+# Ventanas modales vigiladas
+WATCHED_WINDOWS = (1, 2)
+
+EXPORT_FORMAT_COMBO = "usr/ssubSUB_CONFIGURATION:SAPLSALV_GUI_CUL_EXPORT_AS:0512/cmbGS_EXPORT-FORMAT"
+
+# Títulos del diálogo de exportación del ALV (&XXL): "Export", "Exportar", "Export list object to XXL"...
+EXPORT_DIALOG_TITLES = ("export", "xxl")
+
+# Diálogo "Grabar lista en fichero" (&PC): una opción de formato por fila
+LOCAL_FILE_RADIO = "usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[{},0]"
+LOCAL_FILE_FORMATS = {"unconverted": 0, "spreadsheet": 1, "rtf": 2, "html": 3}
+DEFAULT_LOCAL_FORMAT = "unconverted"
+# Separador de campos del archivo que escribe cada formato (rtf/html no son tabulares)
+LOCAL_FORMAT_DELIMITERS = {"unconverted": "|", "spreadsheet": "\t"}
+
+
+def _title(window):
+    return (getattr(window, "Text", "") or "").strip().lower()
+
+
+class DialogHandler:
+    """
+    Descripción de un diálogo y la acción que lo resuelve.
+
+    Todos los criterios indicados deben cumplirse para que una ventana encaje.
+    """
+
+    def __init__(self, name, action=None, window_type="GuiModalWindow", titles=(), controls=(),
+                 button_labels=(), once=False):
+        """
+        Args:
+            name: Nombre del manejador (clave de `wait_for`)
+            action: Función (ventana) -> None que resuelve el diálogo (None = solo señalar)
+            window_type: Tipo de ventana esperado
+            titles: Fragmentos de título aceptados (minúsculas, cualquiera)
+            controls: Ids relativos a la ventana que deben existir (todos)
+            button_labels: Etiquetas de botón aceptadas (cualquiera)
+            once: Retirar el manejador tras atender el diálogo una vez
+        """
+        self.name = name
+        self.action = action
+        self.window_type = window_type
+        self.titles = tuple(t.lower() for t in titles)
+        self.controls = tuple(controls)
+        self.button_labels = tuple(b.lower() for b in button_labels)
+        self.once = once
+
+    def matches(self, window):
+        if self.window_type and window.Type != self.window_type:
+            return False
+        if self.titles and not any(t in _title(window) for t in self.titles):
+            return False
+        for control_id in self.controls:
+            try:
+                window.findById(control_id)
+            except Exception:
+                return False
+        if self.button_labels and find_button(window, self.button_labels) is None:
+            return False
+        return True
+
+
+def security_handler():
+    """Aviso de seguridad de SAP GUI al escribir archivos: pulsa Permetre/Permitir/Allow."""
+    def action(window):
+        find_button(window, SECURITY_LABELS).press()
+        logger.info("Security popup handled (Allow pressed).")
+    return DialogHandler("security", action, button_labels=SECURITY_LABELS)
+
+
+def export_format_handler(export_format):
+    """
+    Diálogo de exportación del ALV: elige el formato (si hay combo) y confirma.
+
+    Se reconoce por el título (EXPORT_DIALOG_TITLES), no por sus controles,
+    que varían según la versión de SAP GUI. Cualquier otra ventana modal
+    (errores, confirmaciones) queda sin atender.
+    """
+    def action(window):
+        try:
+            window.findById(EXPORT_FORMAT_COMBO).Key = export_format
+            logger.debug(f"Export format set to: {export_format}")
+        except Exception as e:
+            logger.warning(f"Could not set export format {export_format}: {e}")
+        try:
+            window.findById("tbar[0]/btn[20]").press()
+        except Exception:
+            window.findById("tbar[0]/btn[0]").press()
+        logger.debug("Export dialog handled")
+    return DialogHandler("export_format", action, titles=EXPORT_DIALOG_TITLES, once=True)
+
+
+def local_file_handler(local_format=DEFAULT_LOCAL_FORMAT):
+    """
+    Diálogo "Grabar lista en fichero" del ALV (&PC): elige el formato y confirma.
+
+    Es la ruta de exportación a fichero local: SAP escribe el archivo y no
+    abre Excel. Se registra con el nombre "export_format", como el diálogo de
+    &XXL, para que el flujo espere igual en ambos modos.
+    """
+    if local_format not in LOCAL_FILE_FORMATS:
+        raise ValueError(f"Unknown local file format: {local_format} (expected one of {', '.join(LOCAL_FILE_FORMATS)})")
+    radio = LOCAL_FILE_RADIO.format(LOCAL_FILE_FORMATS[local_format])
+
+    def action(window):
+        window.findById(radio).select()
+        window.findById("tbar[0]/btn[0]").press()
+        logger.debug(f"Local file dialog handled ({local_format})")
+    return DialogHandler("export_format", action, controls=(LOCAL_FILE_RADIO.format(0),), once=True)
+
+
+def export_route(export_config):
+    """
+    Ruta de exportación del ALV según `export.method`.
+
+    Returns:
+        tuple: (opción del menú contextual, manejador del diálogo de formato, headless)
+               - "local": &PC + `local_file_handler(export.local_format)`; no abre Excel
+               - resto: &XXL + `export_format_handler(export.format)`; SAP abre Excel
+    """
+    if export_config.get('method', 'excel') == 'local':
+        return "&PC", local_file_handler(export_config.get('local_format', DEFAULT_LOCAL_FORMAT)), True
+    return "&XXL", export_format_handler(export_config.get('format', 'csv-LEAN-STANDARD')), False
+
+
+def save_as_handler(directory, filename):
+    """Diálogo Guardar como: ruta, nombre de archivo y confirmar."""
+    def action(window):
+        window.findById("usr/ctxtDY_PATH").Text = directory
+        window.findById("usr/ctxtDY_FILENAME").Text = filename
+        window.findById("tbar[0]/btn[0]").press()
+        logger.debug("Save dialog handled")
+    return DialogHandler("save_as", action, controls=("usr/ctxtDY_PATH", "usr/ctxtDY_FILENAME"), once=True)
+
+
+class DialogWatcher:
+    """Hilo que atiende los diálogos modales en cuanto aparecen."""
+
+    def __init__(self, session, handlers=None, poll_interval=0.05):
+        """
+        Args:
+            session: Sesión SAP GUI (del hilo que arranca el vigilante)
+            handlers: Manejadores permanentes (por defecto, el aviso de seguridad)
+            poll_interval: Segundos entre comprobaciones de ventanas
+        """
+        self.session = session
+        self.poll_interval = poll_interval
+        self._handlers = list(handlers) if handlers is not None else [security_handler()]
+        self._events = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+        self._stream = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def arm(self, handler):
+        """
+        Registra un manejador y reinicia su señal (para esperar su próxima ejecución).
+
+        Los manejadores se prueban en orden de registro: los más específicos primero.
+        """
+        with self._lock:
+            self._handlers = [h for h in self._handlers if h.name != handler.name] + [handler]
+            self._event(handler.name).clear()
+            self._errors.pop(handler.name, None)
+
+    def wait_for(self, name, timeout=30):
+        """
+        Espera a que el manejador `name` haya atendido su diálogo.
+
+        Returns:
+            bool: True si se atendió; False si venció el timeout
+
+        Raises:
+            RuntimeError: Si la acción del manejador falló
+        """
+        with self._lock:
+            event = self._event(name)
+        if not event.wait(timeout):
+            return False
+        error = self._errors.get(name)
+        if error is not None:
+            raise RuntimeError(f"Dialog handler '{name}' failed: {error}")
+        return True
+
+    def handled(self, name):
+        """True si el manejador `name` ya se ejecutó (sin esperar)."""
+        with self._lock:
+            return self._event(name).is_set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if PYTHONCOM_AVAILABLE and hasattr(self.session, "_oleobj_"):
+            # Los objetos COM no se comparten entre hilos: se serializa la sesión para el vigilante
+            self._stream = pythoncom.CoMarshalInterThreadInterfaceInStream(
+                pythoncom.IID_IDispatch, self.session._oleobj_)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sap-dialog-watcher", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Hilo
+    # ------------------------------------------------------------------
+
+    def _event(self, name):
+        return self._events.setdefault(name, threading.Event())
+
+    def _thread_session(self):
+        if self._stream is None:
+            return self.session
+        dispatch = pythoncom.CoGetInterfaceAndReleaseStream(self._stream, pythoncom.IID_IDispatch)
+        self._stream = None
+        return win32com.client.Dispatch(dispatch)
+
+    def _run(self):
+        with com_apartment():
+            try:
+                session = self._thread_session()
+            except Exception as e:
+                logger.error(f"Dialog watcher could not attach to the session: {e}")
+                self._ready.set()
+                return
+            self._ready.set()
+
+            unknown = set()
+            while not self._stop.is_set():
+                for index in WATCHED_WINDOWS:
+                    try:
+                        window = session.findById(f"wnd[{index}]")
+                    except Exception:
+                        continue
+                    if not self._dispatch(window):
+                        title = getattr(window, "Text", "")
+                        if title not in unknown:
+                            unknown.add(title)
+                            logger.debug(f"Dialog watcher: no handler for wnd[{index}] '{title}'")
+                self._stop.wait(self.poll_interval)
+
+    def _dispatch(self, window):
+        with self._lock:
+            handlers = list(self._handlers)
+        for handler in handlers:
+            try:
+                if not handler.matches(window):
+                    continue
+            except Exception:
+                continue
+
+            error = None
+            try:
+                if handler.action:
+                    handler.action(window)
+            except Exception as e:
+                error = e
+                logger.error(f"Dialog handler '{handler.name}' failed: {e}")
+
+            with self._lock:
+                if handler.once:
+                    self._handlers = [h for h in self._handlers if h is not handler]
+                if error is not None:
+                    self._errors[handler.name] = error
+                self._event(handler.name).set()
+            return True
+        return False
@@ -1,12 +1,21 @@
-import win32com.client
 import logging
-import time
+from src.core.sap_utils import wait_until, wait_idle, wait_for_control
+
+# win32com solo existe en Windows; en Linux se usa un motor simulado (gui=FakeSapGui(...))
+try:
+    import win32com.client
+    WIN32COM_AVAILABLE = True
+except ImportError:
+    WIN32COM_AVAILABLE = False
 
 logger = logging.getLogger("SAP_Automation")
 
+# SAP GUI permite como máximo 6 sesiones (modos) por conexión
+MAX_SESSIONS_PER_CONNECTION = 6
+
 class SAPConnection:
     def __init__(self, connection_index=0, session_index=0, connection_mode="existing_session", 
-                 connection_string=None, credentials=None):
+                 connection_string=None, credentials=None, gui=None):
         """
         Initialize SAP Connection.
         
@@ -16,14 +25,28 @@ class SAPConnection:
             connection_mode: "existing_session" or "credentials"
             connection_string: SAP connection string (for credentials mode, e.g., "SAP System Name")
             credentials: Dict with keys: username, password, client, system_id (optional)
+            gui: SAPGUI object to use instead of the running SAP Logon (e.g. FakeSapGui for simulation)
         """
         self.connection_index = connection_index
         self.session_index = session_index
         self.connection_mode = connection_mode
         self.connection_string = connection_string
         self.credentials = credentials or {}
+        self.gui = gui
         self.session = None
         self.connection = None
+        self.pool_session_ids = []
+        self._created_session_ids = []
+
+    def _get_sap_gui(self):
+        """
+        Returns the SAPGUI automation object (the injected one, if any).
+        """
+        if self.gui is not None:
+            return self.gui
+        if not WIN32COM_AVAILABLE:
+            raise RuntimeError("pywin32 is not installed: SAP GUI Scripting requires Windows")
+        return win32com.client.GetObject("SAPGUI")
 
     def connect(self):
         """
@@ -45,7 +68,7 @@ class SAPConnection:
         Connects to an already open SAP GUI session.
         """
         try:
-            sap_gui_auto = win32com.client.GetObject("SAPGUI")
+            sap_gui_auto = self._get_sap_gui()
             if not sap_gui_auto:
                 raise RuntimeError("SAPGUI Object not found.")
             
@@ -93,16 +116,16 @@ class SAPConnection:
             # Try to get SAP GUI Scripting Engine
             sap_gui_auto = None
             try:
-                sap_gui_auto = win32com.client.GetObject("SAPGUI")
+                sap_gui_auto = self._get_sap_gui()
             except Exception:
                 # SAP Logon is not running, try to start it
                 logger.info("SAP Logon not running, attempting to start it...")
                 self._start_sap_logon()
-                time.sleep(3)  # Wait for SAP Logon to start
-                try:
-                    sap_gui_auto = win32com.client.GetObject("SAPGUI")
-                except Exception as e:
-                    raise RuntimeError(f"Could not start or connect to SAP Logon: {e}")
+                # Wait for SAP Logon to register its scripting object
+                if not wait_until(None, lambda _: self._get_sap_gui(),
+                                  timeout=30, poll_interval=0.2):
+                    raise RuntimeError("Could not start or connect to SAP Logon (timed out)")
+                sap_gui_auto = self._get_sap_gui()
             
             if not sap_gui_auto:
                 raise RuntimeError("SAPGUI Object not found. Make sure SAP GUI is installed.")
@@ -165,7 +188,8 @@ class SAPConnection:
         """
         try:
             # Wait for login screen to load
-            time.sleep(1)
+            if not wait_for_control(self.session, "wnd[0]/usr/txtRSYST-BNAME", timeout=30):
+                raise RuntimeError("Login screen did not load")
             
             # Find login window (usually wnd[0])
             wnd = self.session.findById("wnd[0]")
@@ -210,7 +234,7 @@ class SAPConnection:
             wnd.sendVKey(0)
             
             # Wait for login to complete
-            time.sleep(2)
+            wait_idle(self.session, timeout=60)
             
             # Check for error messages
             try:
@@ -243,6 +267,74 @@ class SAPConnection:
             return self.connect()
         return self.session
 
+    def open_session_pool(self, size, timeout=30):
+        """
+        Opens additional sessions on the current connection until `size` are available.
+
+        Args:
+            size: Number of sessions wanted in the pool (capped at 6)
+            timeout: Seconds to wait for each new session to appear
+
+        Returns:
+            list: Session ids (e.g. "/app/con[0]/ses[1]"), the main session first
+        """
+        if self.session is None:
+            self.connect()
+
+        if size > MAX_SESSIONS_PER_CONNECTION:
+            logger.warning(f"Requested {size} sessions, SAP allows {MAX_SESSIONS_PER_CONNECTION}. "
+                           f"Using {MAX_SESSIONS_PER_CONNECTION}.")
+            size = MAX_SESSIONS_PER_CONNECTION
+
+        session_ids = [self.session.Id]
+        for i in range(self.connection.Children.Count):
+            if len(session_ids) >= size:
+                break
+            sid = self.connection.Children(i).Id
+            if sid not in session_ids:
+                session_ids.append(sid)
+
+        while len(session_ids) < size:
+            count_before = self.connection.Children.Count
+            self.session.CreateSession()
+
+            # CreateSession es asíncrono: esperar a que la nueva sesión aparezca
+            if not wait_until(None, lambda _: self.connection.Children.Count > count_before,
+                              timeout=timeout, poll_interval=0.2):
+                raise RuntimeError(f"Timed out waiting for new SAP session ({len(session_ids)}/{size} open)")
+
+            new_session = self.connection.Children(self.connection.Children.Count - 1)
+            session_ids.append(new_session.Id)
+            self._created_session_ids.append(new_session.Id)
+            logger.info(f"Opened pool session: {new_session.Id}")
+
+        self.pool_session_ids = session_ids
+        logger.info(f"Session pool ready with {len(session_ids)} sessions")
+        return session_ids
+
+    def attach_session(self, session_id):
+        """
+        Resolves a pool session from the calling thread.
+
+        Must be called inside the worker thread (after `com_apartment()`), since
+        COM objects obtained in one apartment cannot be used from another.
+        """
+        application = self._get_sap_gui().GetScriptingEngine
+        return application.findById(session_id)
+
+    def close_session_pool(self):
+        """
+        Closes the sessions opened by open_session_pool (the main session is kept).
+        """
+        for session_id in self._created_session_ids:
+            try:
+                self.connection.CloseSession(session_id)
+                logger.info(f"Closed pool session: {session_id}")
+            except Exception as e:
+                logger.warning(f"Error closing pool session {session_id}: {e}")
+        self._created_session_ids = []
+        self.pool_session_ids = [self.session.Id] if self.session is not None else []
+
     def disconnect(self):
         """
         Closes the connection (only for credential mode).
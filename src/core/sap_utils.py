@@ -1,8 +1,156 @@
+import os
 import time
 import logging
+from contextlib import contextmanager
 
 logger = logging.getLogger("SAP_Automation")
 
+# pythoncom solo existe en Windows (pywin32); en Linux los stand-ins no necesitan COM
+try:
+    import pythoncom
+    PYTHONCOM_AVAILABLE = True
+except ImportError:
+    PYTHONCOM_AVAILABLE = False
+
+try:
+    import win32clipboard
+    WIN32CLIPBOARD_AVAILABLE = True
+except ImportError:
+    WIN32CLIPBOARD_AVAILABLE = False
+
+# Tabla de valores individuales del diálogo de selección múltiple
+MULTISEL_TABLE_ID = "wnd[1]/usr/tabsTAB_STRIP/tabpSIVA/ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE"
+
+@contextmanager
+def com_apartment():
+    """
+    Initializes a COM apartment for the calling thread.
+
+    SAP GUI objects cannot be shared between threads as-is: every worker
+    thread must initialize its own apartment and resolve its session there.
+    """
+    if not PYTHONCOM_AVAILABLE:
+        yield
+        return
+    pythoncom.CoInitialize()
+    try:
+        yield
+    finally:
+        pythoncom.CoUninitialize()
+
+def wait_until(session, predicate, timeout=30, poll_interval=0.05, max_interval=0.5):
+    """
+    Waits until the session is idle and `predicate(session)` holds.
+
+    Polls with exponential backoff (poll_interval doubling up to max_interval)
+    and returns as soon as the condition is met. Exceptions raised by the
+    predicate (e.g. control not found yet) count as "not yet".
+    `session` may be None for conditions that do not depend on a session.
+
+    Returns:
+        bool: True if the condition was met, False on timeout
+    """
+    deadline = time.monotonic() + timeout
+    interval = poll_interval
+    while True:
+        try:
+            if (session is None or not session.Busy) and predicate(session):
+                return True
+        except Exception:
+            pass
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+def window_exists(index):
+    """Predicate: window wnd[index] is open."""
+    def predicate(session):
+        session.findById(f"wnd[{index}]")
+        return True
+    return predicate
+
+def control_exists(control_id):
+    """Predicate: control `control_id` can be found."""
+    def predicate(session):
+        session.findById(control_id)
+        return True
+    return predicate
+
+def wait_idle(session, timeout=30, **kwargs):
+    """Waits until the session is no longer busy."""
+    return wait_until(session, lambda s: True, timeout, **kwargs)
+
+def wait_for_window(session, index, timeout=30, **kwargs):
+    """Waits until window wnd[index] is open."""
+    return wait_until(session, window_exists(index), timeout, **kwargs)
+
+def wait_for_control(session, control_id, timeout=30, **kwargs):
+    """Waits until control `control_id` is available."""
+    return wait_until(session, control_exists(control_id), timeout, **kwargs)
+
+def status_message(session):
+    """Returns the status bar text of the main window ("" if none)."""
+    try:
+        return (session.findById("wnd[0]/sbar").Text or "").strip()
+    except Exception:
+        return ""
+
+def set_multiple_selection(session, field_name, values, use_clipboard=True, timeout=30):
+    """
+    Fills the multiple selection list of a select-option (e.g. S_KUNNR).
+
+    Opens the multiple selection dialog, clears previous entries and loads
+    `values` either through a clipboard upload (one value per line) or by
+    typing them page by page into the single values table.
+
+    Args:
+        session: SAP GUI session on the selection screen
+        field_name: Select-option name (e.g. "S_KUNNR")
+        values: Values to include
+        use_clipboard: Use clipboard upload when win32clipboard is available
+        timeout: Seconds to wait for the dialog
+    """
+    session.findById(f"wnd[0]/usr/btn%_{field_name}_%_APP_%-VALU_PUSH").press()
+    if not wait_for_window(session, 1, timeout):
+        raise RuntimeError(f"Multiple selection dialog for {field_name} did not open")
+
+    # Borrar la selección anterior
+    session.findById("wnd[1]/tbar[0]/btn[16]").press()
+
+    if use_clipboard and WIN32CLIPBOARD_AVAILABLE:
+        win32clipboard.OpenClipboard()
+        try:
+            win32clipboard.EmptyClipboard()
+            win32clipboard.SetClipboardText("\r\n".join(str(v) for v in values))
+        finally:
+            win32clipboard.CloseClipboard()
+        session.findById("wnd[1]/tbar[0]/btn[24]").press()
+    else:
+        table = session.findById(MULTISEL_TABLE_ID)
+        page = max(int(table.VisibleRowCount), 1)
+        for start in range(0, len(values), page):
+            # Desplazar la tabla invalida las referencias: volver a buscarla
+            session.findById(MULTISEL_TABLE_ID).verticalScrollbar.position = start
+            for i, value in enumerate(values[start:start + page]):
+                session.findById(f"{MULTISEL_TABLE_ID}/ctxtRSCSEL_255-SLOW_I[1,{i}]").Text = str(value)
+            # Enter confirma la página y amplía la tabla para la siguiente
+            session.findById("wnd[1]").sendVKey(0)
+
+    # Copiar (F8) y volver a la pantalla de selección
+    session.findById("wnd[1]/tbar[0]/btn[8]").press()
+    wait_until(session, lambda s: not _window_open(s, 1), timeout)
+    logger.debug(f"Multiple selection {field_name}: {len(values)} values")
+
+def _window_open(session, index):
+    try:
+        session.findById(f"wnd[{index}]")
+        return True
+    except Exception:
+        return False
+
 def _iter_children(component):
     """Safe iterator over SAP component children."""
     try:
@@ -41,56 +189,78 @@ def find_alv_shell(root):
     
     return find_control_recursive(root, is_alv)
 
-def handle_security_popup(session, max_attempts=6):
+SECURITY_LABELS = ("permetre", "permitir", "allow")
+
+def find_button(window, labels):
     """
-    Handles the SAP security popup by clicking 'Allow'.
+    Returns the first direct child button of `window` whose text or tooltip
+    contains one of `labels` (lowercase), or None.
     """
-    labels_ok = ("permetre", "permitir", "allow")
-    
-    for attempt in range(max_attempts):
+    for child in _iter_children(window):
+        if child.Type != "GuiButton":
+            continue
+        text = (getattr(child, "Text", "") or "").strip().lower()
+        tooltip = (getattr(child, "Tooltip", "") or "").strip().lower()
+        if any(lbl in text or lbl in tooltip for lbl in labels):
+            return child
+    return None
+
+def handle_security_popup(session, timeout=3, poll_interval=0.05):
+    """
+    Handles the SAP security popup by clicking 'Allow', waiting at most `timeout` seconds.
+
+    The exporters no longer call this: the popup is answered in the background
+    by `DialogWatcher` (see src/core/dialog_watcher.py) as soon as it appears.
+
+    Returns:
+        bool: True if the popup was found and answered
+    """
+    def press_allow(s):
         for idx in (1, 2):
             try:
-                wnd = session.findById(f"wnd[{idx}]")
-                if wnd.Type != "GuiModalWindow":
-                    continue
-                
-                for child in _iter_children(wnd):
-                    if child.Type != "GuiButton":
-                        continue
-                    
-                    text = (getattr(child, "Text", "") or "").strip().lower()
-                    tooltip = (getattr(child, "Tooltip", "") or "").strip().lower()
-                    
-                    if any(lbl in text for lbl in labels_ok) or any(lbl in tooltip for lbl in labels_ok):
-                        child.press()
-                        logger.info("Security popup handled (Allow pressed).")
-                        return
+                wnd = s.findById(f"wnd[{idx}]")
             except Exception:
                 continue
-        time.sleep(0.5)
+            if wnd.Type != "GuiModalWindow":
+                continue
+            button = find_button(wnd, SECURITY_LABELS)
+            if button is not None:
+                button.press()
+                logger.info("Security popup handled (Allow pressed).")
+                return True
+        return False
 
-def close_excel_workbook(full_path):
+    return wait_until(session, press_allow, timeout=timeout, poll_interval=poll_interval)
+
+def _find_excel_workbook(full_path):
     """
-    Closes the specific Excel workbook if open.
+    Returns (excel, workbook) for the workbook open at `full_path`, or (None, None).
     """
     try:
         import win32com.client
         excel = win32com.client.GetActiveObject("Excel.Application")
     except Exception:
         logger.debug("Excel not running or pywin32 issue.")
-        return
+        return None, None
 
+    full_path_norm = full_path.lower().replace("/", "\\")
+    for wb in excel.Workbooks:
+        try:
+            if wb.FullName.lower().replace("/", "\\") == full_path_norm:
+                return excel, wb
+        except Exception:
+            continue
+    return excel, None
+
+def close_excel_workbook(full_path):
+    """
+    Closes the specific Excel workbook if open.
+    """
     try:
-        full_path_norm = full_path.lower().replace("/", "\\")
-        target_wb = None
-        for wb in excel.Workbooks:
-            try:
-                if wb.FullName.lower().replace("/", "\\") == full_path_norm:
-                    target_wb = wb
-                    break
-            except Exception:
-                continue
-        
+        excel, target_wb = _find_excel_workbook(full_path)
+        if excel is None:
+            return
+
         if target_wb:
             only_this = excel.Workbooks.Count == 1
             target_wb.Close(SaveChanges=0)
@@ -104,3 +274,61 @@ def close_excel_workbook(full_path):
 
     except Exception as e:
         logger.warning(f"Error closing Excel: {e}")
+
+def _file_locked(path):
+    """True if another process holds `path` open without write sharing (Windows)."""
+    try:
+        with open(path, "r+b"):
+            return False
+    except PermissionError:
+        return True
+    except OSError:
+        return True
+
+def wait_for_export_file(full_path, timeout=120, poll_interval=0.05, stable_for=0.3, since=None, excel=True):
+    """
+    Waits until SAP has finished writing an export file.
+
+    The file is complete when it exists, its size has not changed for
+    `stable_for` seconds and it is not locked, or it is already open in Excel
+    (Excel only opens it once SAP has written it). Returns as soon as that
+    holds, so a file that lands in 300 ms does not cost a fixed sleep, and a
+    slow export is never closed half-written.
+
+    Args:
+        full_path: Expected path (export.default_directory + filename)
+        timeout: Maximum seconds to wait
+        poll_interval: Initial poll interval (backoff up to 0.5 s)
+        stable_for: Seconds the size must stay unchanged
+        since: Ignore a file last modified before this epoch time (e.g. a previous export)
+        excel: Accept a locked file that is open in Excel (False for headless exports)
+
+    Returns:
+        bool: True if the file is complete, False on timeout
+    """
+    state = {"size": None, "since": None}
+
+    def complete(_):
+        try:
+            st = os.stat(full_path)
+        except FileNotFoundError:
+            return False
+        if since is not None and st.st_mtime < since - 1:
+            return False
+
+        now = time.monotonic()
+        if st.st_size != state["size"]:
+            state["size"], state["since"] = st.st_size, now
+            return False
+        if now - state["since"] < stable_for:
+            return False
+        if not _file_locked(full_path):
+            return True
+        return excel and _find_excel_workbook(full_path)[1] is not None
+
+    if wait_until(None, complete, timeout=timeout, poll_interval=poll_interval,
+                  max_interval=max(poll_interval, min(0.5, stable_for))):
+        logger.debug(f"Export file complete: {full_path} ({state['size']} bytes)")
+        return True
+    logger.warning(f"Export file not completed within {timeout}s: {full_path}")
+    return False
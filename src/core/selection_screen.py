@@ -0,0 +1,130 @@
+"""
+Selection Screen
+================
+Gestión de la pantalla de selección de un report (ej: ZTSD_FACTURACION).
+
+Evita reiniciar la transacción en cada cliente: si la sesión ya está en la
+pantalla de selección (`session.Info.Transaction` / `ScreenNumber`) no se
+vuelve a navegar, y tras cada exportación se regresa con Atrás (F3). Además
+recuerda los valores escritos en cada campo, de modo que entre clientes solo
+se escriben los campos que cambian (normalmente solo `S_KUNNR`).
+"""
+
+import logging
+from src.core.sap_utils import wait_until, wait_for_control
+
+logger = logging.getLogger("SAP_Automation")
+
+BACK_BUTTON_ID = "wnd[0]/tbar[0]/btn[3]"
+
+
+class SelectionScreen:
+    """Pantalla de selección con caché de los valores ya escritos."""
+
+    def __init__(self, session, transaction_code, screen_number=1000, ready_control=None,
+                 timeout=30, poll_interval=0.05):
+        """
+        Args:
+            session: Sesión SAP GUI
+            transaction_code: Código tal como se teclea (ej: "/nZTSD_FACTURACION")
+            screen_number: Dynpro de la pantalla de selección
+            ready_control: Control que indica que la pantalla está cargada
+            timeout: Segundos máximos de espera por paso
+            poll_interval: Sondeo inicial de las esperas
+        """
+        self.session = session
+        self.transaction_code = transaction_code
+        self.transaction = self._transaction_name(transaction_code)
+        self.screen_number = int(screen_number)
+        self.ready_control = ready_control
+        self.wait_kwargs = {"timeout": timeout, "poll_interval": poll_interval}
+        self._applied = {}
+
+    @staticmethod
+    def _transaction_name(tcode):
+        tcode = tcode.strip()
+        if tcode[:2].lower() in ("/n", "/o"):
+            tcode = tcode[2:]
+        return tcode.upper()
+
+    def is_active(self):
+        """True si la sesión está en la pantalla de selección de la transacción."""
+        try:
+            info = self.session.Info
+            return (str(info.Transaction).upper() == self.transaction
+                    and int(info.ScreenNumber) == self.screen_number)
+        except Exception:
+            return False
+
+    def ensure(self):
+        """
+        Deja la sesión en la pantalla de selección, navegando solo si hace falta.
+
+        Returns:
+            bool: True si la pantalla de selección está disponible
+        """
+        if self.is_active():
+            return True
+
+        # Transacción nueva: SAP puede rellenar campos por su cuenta, se olvida la caché
+        self._applied = {}
+        self.session.findById("wnd[0]/tbar[0]/okcd").Text = self.transaction_code
+        self.session.findById("wnd[0]").sendVKey(0)
+        if self.ready_control:
+            ok = wait_for_control(self.session, self.ready_control, **self.wait_kwargs)
+        else:
+            ok = wait_until(self.session, lambda s: self.is_active(), **self.wait_kwargs)
+        if not ok:
+            logger.error(f"Selection screen of {self.transaction_code} did not load")
+        return ok
+
+    def back(self):
+        """
+        Vuelve a la pantalla de selección con Atrás (F3) tras mostrar resultados.
+
+        Returns:
+            bool: True si se llegó a la pantalla de selección
+        """
+        if self.is_active():
+            return True
+        try:
+            self.session.findById(BACK_BUTTON_ID).press()
+        except Exception as e:
+            logger.debug(f"Back button failed: {e}")
+            self._applied = {}
+            return False
+
+        if wait_until(self.session, lambda s: self.is_active(), **self.wait_kwargs):
+            return True
+        logger.debug("Back did not return to the selection screen")
+        self._applied = {}
+        return False
+
+    def apply(self, values):
+        """
+        Escribe en pantalla solo los campos cuyo valor difiere del último escrito.
+
+        Args:
+            values: dict id_control -> valor (str)
+
+        Returns:
+            int: Número de campos escritos
+        """
+        writes = 0
+        for control_id, value in values.items():
+            value = "" if value is None else str(value)
+            if self._applied.get(control_id) == value:
+                continue
+            self.session.findById(control_id).Text = value
+            self._applied[control_id] = value
+            writes += 1
+        logger.debug(f"Selection screen: {writes} fields written, {len(values) - writes} unchanged")
+        return writes
+
+    def invalidate(self, control_ids=None):
+        """Olvida los valores recordados (todos o los de `control_ids`)."""
+        if control_ids is None:
+            self._applied = {}
+        else:
+            for control_id in control_ids:
+                self._applied.pop(control_id, None)
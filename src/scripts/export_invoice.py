@@ -2,60 +2,101 @@ import os
 import time
 import logging
 from datetime import datetime
-from src.core.sap_utils import find_alv_shell, handle_security_popup, close_excel_workbook
+from src.core.sap_utils import find_alv_shell, close_excel_workbook, wait_for_export_file
+from src.core.dialog_watcher import DialogWatcher, export_route, save_as_handler
+from src.utils.tracing import Tracer
 
 logger = logging.getLogger("SAP_Automation")
 
 class InvoiceExporter:
-    def __init__(self, session, config):
+    def __init__(self, session, config, cache=None, tracer=None):
         self.session = session
         self.config = config
+        self.cache = cache
+        self.tracer = tracer or Tracer()
 
     def run(self, invoice_number):
         logger.info(f"Starting export for invoice: {invoice_number}")
         
+        with self.tracer.context(client=f"invoice:{invoice_number}"), self.tracer.span("total"):
+            return self._run(invoice_number)
+
+    def _run(self, invoice_number):
         try:
-            # 1. Run Transaction
             tcode = self.config['sap']['transaction_code']
-            self.session.findById("wnd[0]/tbar[0]/okcd").Text = tcode
-            self.session.findById("wnd[0]").sendVKey(0)
+            extension = self.config['export'].get('extension', 'csv')
+            filename = f"{self.config['export']['default_filename_prefix']}{datetime.now():%Y%m%d_%H%M%S}.{extension}"
+            export_dir = self.config['export']['default_directory']
+            full_path = os.path.join(export_dir, filename)
+            cache_filters = {"factura_no": (invoice_number, None)}
+            
+            # 0. Issued invoices do not change: serve from cache without touching SAP
+            if self.cache:
+                with self.tracer.span("cache_fetch"):
+                    hit = self.cache.fetch(tcode, cache_filters, full_path)
+                if hit:
+                    logger.info(f"Export completed from cache: {full_path}")
+                    return True
+            
+            # 1. Run Transaction
+            with self.tracer.span("navigate"):
+                self.session.findById("wnd[0]/tbar[0]/okcd").Text = tcode
+                self.session.findById("wnd[0]").sendVKey(0)
             logger.info(f"Transaction {tcode} started.")
 
             # 2. Apply Filter
-            self.session.findById("wnd[0]/usr/txtS_NUM_F-LOW").Text = invoice_number
-            self.session.findById("wnd[0]/usr/txtS_NUM_F-HIGH").Text = ""
-            self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
+            with self.tracer.span("apply_filters"):
+                self.session.findById("wnd[0]/usr/txtS_NUM_F-LOW").Text = invoice_number
+                self.session.findById("wnd[0]/usr/txtS_NUM_F-HIGH").Text = ""
+            with self.tracer.span("execute"):
+                self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
             logger.info("Filter applied.")
 
             # 3. Find ALV
-            wnd0 = self.session.findById("wnd[0]")
-            alv = find_alv_shell(wnd0)
+            with self.tracer.span("alv_lookup"):
+                wnd0 = self.session.findById("wnd[0]")
+                alv = find_alv_shell(wnd0)
             if not alv:
                 logger.error("ALV Grid not found.")
                 return False
             
-            # 4. Trigger Export
-            alv.ContextMenu()
-            alv.SelectContextMenuItem("&XXL")
-            logger.info("Export menu triggered.")
+            # 4-7. Trigger Export; format/save dialogs and security popup are answered by the watcher
+            # (export.method "local" saves through &PC and never starts Excel)
+            menu_item, format_handler, headless = export_route(self.config['export'])
+            timeouts = self.config['timeouts']
+            timeout = timeouts.get('wait_timeout', 30)
+            started = time.time()
+            with DialogWatcher(self.session, poll_interval=timeouts.get('poll_interval', 0.05)) as watcher:
+                watcher.arm(save_as_handler(export_dir, filename))
+                watcher.arm(format_handler)
 
-            # 5. Handle Export Dialog
-            self._handle_export_dialog()
-
-            # 6. Handle Save Dialog
-            extension = self.config['export'].get('extension', 'csv')
-            filename = f"{self.config['export']['default_filename_prefix']}{datetime.now():%Y%m%d_%H%M%S}.{extension}"
-            export_dir = self.config['export']['default_directory']
-            full_path = os.path.join(export_dir, filename)
-            
-            self._handle_save_dialog(export_dir, filename)
+                with self.tracer.span("export_dialog"):
+                    alv.ContextMenu()
+                    alv.SelectContextMenuItem(menu_item)
+                    logger.info("Export menu triggered.")
+                    if not watcher.wait_for("export_format", timeout):
+                        raise RuntimeError("Export dialog did not appear")
+                logger.info("Export dialog handled.")
 
-            # 7. Handle Security Popup
-            handle_security_popup(self.session)
+                with self.tracer.span("save_dialog"):
+                    if not watcher.wait_for("save_as", timeout):
+                        raise RuntimeError("Save dialog did not appear")
+                logger.info("Save dialog handled.")
 
-            # 8. Close Excel
-            time.sleep(self.config['timeouts']['long_wait'])
-            close_excel_workbook(full_path)
+                # 8. Wait until SAP has written the file, then close Excel if it was opened
+                with self.tracer.span("export_file"):
+                    if not wait_for_export_file(full_path,
+                                                timeout=timeouts.get('export_file_timeout', 120),
+                                                poll_interval=timeouts.get('poll_interval', 0.05),
+                                                stable_for=timeouts.get('file_stable_for', 0.3),
+                                                since=started, excel=not headless):
+                        raise RuntimeError(f"Export file was not completed: {full_path}")
+            if not headless:
+                with self.tracer.span("excel_close"):
+                    close_excel_workbook(full_path)
+            
+            if self.cache:
+                self.cache.store(tcode, cache_filters, full_path)
             
             logger.info(f"Export completed successfully: {full_path}")
             return True
@@ -63,33 +104,3 @@ class InvoiceExporter:
         except Exception as e:
             logger.error(f"Export failed: {e}")
             return False
-
-    def _handle_export_dialog(self):
-        try:
-            wnd1 = self.session.findById("wnd[1]")
-            # Set format
-            cmb_format = wnd1.findById("usr/ssubSUB_CONFIGURATION:SAPLSALV_GUI_CUL_EXPORT_AS:0512/cmbGS_EXPORT-FORMAT")
-            cmb_format.Key = self.config['export']['format']
-            
-            # Press Export
-            try:
-                wnd1.findById("tbar[0]/btn[20]").press() # Try one button
-            except:
-                wnd1.findById("tbar[0]/btn[0]").press() # Try another
-            
-            logger.info("Export dialog handled.")
-        except Exception as e:
-            logger.error(f"Error in export dialog: {e}")
-            raise
-
-    def _handle_save_dialog(self, directory, filename):
-        time.sleep(self.config['timeouts']['default_wait'])
-        try:
-            wnd1 = self.session.findById("wnd[1]")
-            wnd1.findById("usr/ctxtDY_PATH").Text = directory
-            wnd1.findById("usr/ctxtDY_FILENAME").Text = filename
-            wnd1.findById("tbar[0]/btn[0]").press()
-            logger.info("Save dialog handled.")
-        except Exception as e:
-            logger.error(f"Error in save dialog: {e}")
-            raise
@@ -19,9 +19,19 @@ La lista de clientes se lee desde un archivo de texto con el formato:
 
 import os
 import time
+import queue
 import logging
+import threading
 from datetime import datetime
-from src.core.sap_utils import find_alv_shell, handle_security_popup, close_excel_workbook
+from src.core.sap_utils import (find_alv_shell, close_excel_workbook, com_apartment,
+                                wait_until, wait_for_export_file, status_message, set_multiple_selection)
+from src.core.alv_reader import AlvReader
+from src.core.dialog_watcher import DialogWatcher, export_route, save_as_handler
+from src.core.selection_screen import SelectionScreen
+from src.utils.export_splitter import split_by_column, export_delimiter
+from src.utils.run_journal import RunJournal
+from src.utils.incremental import WatermarkStore, merge_delta
+from src.utils.tracing import Tracer
 
 logger = logging.getLogger("SAP_Automation")
 
@@ -70,27 +80,48 @@ def read_client_list(file_path):
 class MultiClientExporter:
     """Exportador de facturas para múltiples clientes."""
     
-    def __init__(self, session, config):
+    def __init__(self, session, config, sessions=None, attach=None, journal=None, tracer=None):
         """
         Inicializa el exportador.
         
         Args:
             session: Sesión SAP GUI activa
             config: Configuración del proyecto
+            sessions: Pool opcional de sesiones (ids u objetos) para exportar en paralelo
+            attach: Función que resuelve un elemento del pool dentro del hilo trabajador
+                    (ej: SAPConnection.attach_session). Si es None se usa tal cual.
+            journal: RunJournal opcional donde se registra cada cliente terminado
+            tracer: Tracer opcional para medir la duración de cada paso
         """
         self.session = session
         self.config = config
+        self.sessions = sessions or []
+        self.attach = attach
+        self.journal = journal
+        self.tracer = tracer or Tracer()
+        self.last_export = {}
+        self.screen = SelectionScreen(
+            session,
+            config['sap']['transaction_code'],
+            screen_number=config['sap'].get('selection_screen', 1000),
+            ready_control="wnd[0]/usr/ctxtS_KUNNR-LOW",
+            **self._wait_kwargs()
+        )
         
-    def run(self, client_list, month_from, month_to, year, status):
+    def run(self, client_list, month_from, month_to, year, status, resume=False):
         """
         Ejecuta la exportación para múltiples clientes.
         
+        Si hay un pool de más de una sesión, los clientes se reparten entre
+        las sesiones con un hilo trabajador por sesión.
+        
         Args:
             client_list: Lista de códigos de clientes (ej: ["CLI001", "CLI002"])
             month_from: Mes inicial de facturación (ej: 1)
             month_to: Mes final de facturación (ej: 10)
             year: Año de facturación (ej: 2025)
             status: Status de facturación (ej: "F")
+            resume: Saltar los clientes ya exportados con los mismos filtros según el diario
             
         Returns:
             dict: Resultados de la exportación por cliente
@@ -98,37 +129,17 @@ class MultiClientExporter:
         logger.info(f"Starting multi-client export for {len(client_list)} clients")
         logger.info(f"Filters: Month={month_from}-{month_to}, Year={year}, Status={status}")
         
-        results = {}
+        filters = dict(month_from=month_from, month_to=month_to, year=year, status=status)
+        pending, skipped = self._skip_completed(client_list, filters, resume)
         
-        for idx, client_code in enumerate(client_list, 1):
-            logger.info(f"[{idx}/{len(client_list)}] Processing client: {client_code}")
-            
-            try:
-                success = self._export_single_client(
-                    client_code=client_code,
-                    month_from=month_from,
-                    month_to=month_to,
-                    year=year,
-                    status=status
-                )
-                
-                results[client_code] = {
-                    "success": success,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                if success:
-                    logger.info(f"✓ Client {client_code} exported successfully")
-                else:
-                    logger.warning(f"✗ Client {client_code} export failed")
-                    
-            except Exception as e:
-                logger.error(f"✗ Error exporting client {client_code}: {e}")
-                results[client_code] = {
-                    "success": False,
-                    "error": str(e),
-                    "timestamp": datetime.now().isoformat()
-                }
+        if len(self.sessions) > 1:
+            results = self._run_parallel(pending, filters)
+        else:
+            results = {}
+            for idx, client_code in enumerate(pending, 1):
+                logger.info(f"[{idx}/{len(pending)}] Processing client: {client_code}")
+                results[client_code] = self._process_client(client_code, filters)
+        results = {c: skipped[c] if c in skipped else results[c] for c in client_list}
         
         # Resumen final
         successful = sum(1 for r in results.values() if r["success"])
@@ -140,6 +151,373 @@ class MultiClientExporter:
         
         return results
     
+    def run_batched(self, client_list, month_from, month_to, year, status, batch_size=None, resume=False):
+        """
+        Exporta varios clientes por consulta usando la selección múltiple de S_KUNNR.
+        
+        Cada lote de K clientes se exporta una sola vez y el archivo resultante se
+        reparte en un archivo por cliente. K se ajusta tras cada lote correcto para
+        que el número de filas por exportación se acerque a `batch.max_rows`; tras
+        un lote fallido K se reduce a la mitad.
+        
+        Args:
+            client_list: Lista de códigos de clientes
+            month_from: Mes inicial de facturación
+            month_to: Mes final de facturación
+            year: Año de facturación
+            status: Status de facturación
+            batch_size: Clientes por lote inicial (default: batch.size)
+            resume: Saltar los clientes ya exportados con los mismos filtros según el diario
+            
+        Returns:
+            dict: Resultados de la exportación por cliente
+        """
+        batch_cfg = self.config.get('batch', {})
+        size = batch_size or batch_cfg.get('size', 20)
+        min_size = batch_cfg.get('min_size', 1)
+        max_size = batch_cfg.get('max_size', 200)
+        max_rows = batch_cfg.get('max_rows', 200000)
+        
+        logger.info(f"Starting batched export for {len(client_list)} clients (initial batch size {size})")
+        logger.info(f"Filters: Month={month_from}-{month_to}, Year={year}, Status={status}")
+        
+        filters = dict(month_from=month_from, month_to=month_to, year=year, status=status)
+        pending, results = self._skip_completed(client_list, filters, resume)
+        pos = 0
+        while pos < len(pending):
+            batch = pending[pos:pos + size]
+            logger.info(f"[{pos + 1}-{pos + len(batch)}/{len(pending)}] Processing batch of {len(batch)} clients")
+            
+            batch_results, rows = self._export_batch(batch, filters)
+            results.update(batch_results)
+            pos += len(batch)
+            
+            # Ajustar el tamaño del lote al volumen observado; un lote fallido no da volumen
+            # (0 filas) y solo puede reducir el siguiente
+            if any(r["success"] for r in batch_results.values()):
+                rows_per_client = max(rows / len(batch), 1)
+                new_size = int(max(min_size, min(max_size, max_rows // rows_per_client)))
+                if new_size != size:
+                    logger.info(f"Batch size adjusted {size} -> {new_size} ({rows_per_client:.0f} rows/client)")
+                    size = new_size
+            elif size > min_size:
+                new_size = max(min_size, size // 2)
+                logger.info(f"Batch failed, batch size reduced {size} -> {new_size}")
+                size = new_size
+        
+        results = {c: results[c] for c in client_list}
+        successful = sum(1 for r in results.values() if r["success"])
+        logger.info("="*60)
+        logger.info(f"EXPORT SUMMARY: Success={successful}, Failed={len(results) - successful}, Total={len(results)}")
+        logger.info("="*60)
+        return results
+    
+    def run_incremental(self, client_list, month_from, month_to, year, status):
+        """
+        Exporta solo los meses nuevos de cada cliente y los fusiona en su dataset consolidado.
+        
+        Cada cliente tiene una marca de agua por perfil (año + status) con el
+        último mes cerrado ya exportado. Solo se consulta desde el mes siguiente
+        hasta `month_to`, y las filas de esos meses se reemplazan en
+        `incremental.consolidated_directory/<cliente>_<año>_<status>.csv`.
+        
+        Args:
+            client_list: Lista de códigos de clientes
+            month_from: Mes inicial si el cliente no tiene marca de agua
+            month_to: Mes final de facturación
+            year: Año de facturación
+            status: Status de facturación
+            
+        Returns:
+            dict: Resultados de la exportación por cliente
+        """
+        inc_cfg = self.config.get('incremental', {})
+        store = WatermarkStore(inc_cfg.get('watermarks_path', 'state/watermarks.json'))
+        consolidated_dir = inc_cfg.get('consolidated_directory', 'exports/consolidated')
+        month_column = inc_cfg.get('month_column', ["Mes en que es factura", "MES"])
+        delimiter = export_delimiter(self.config, 'incremental')
+        os.makedirs(consolidated_dir, exist_ok=True)
+        profile = f"{year}|{status}"
+        
+        logger.info(f"Starting incremental export for {len(client_list)} clients (profile {profile})")
+        results = {}
+        for idx, client_code in enumerate(client_list, 1):
+            start = store.next_month(client_code, profile, default=month_from)
+            if start > month_to:
+                logger.info(f"[{idx}/{len(client_list)}] Client {client_code} up to date (through month {start - 1})")
+                results[client_code] = {"success": True, "skipped": True, "timestamp": datetime.now().isoformat()}
+                continue
+            
+            logger.info(f"[{idx}/{len(client_list)}] Processing client: {client_code} (months {start}-{month_to})")
+            filters = dict(month_from=start, month_to=month_to, year=year, status=status)
+            result = self._process_client(client_code, filters, allow_empty=True)
+            
+            if result.get("no_data"):
+                # Sin filas nuevas desde la marca de agua: correcto, la marca no avanza
+                logger.info(f"Client {client_code}: no new rows since month {start - 1}")
+                result["delta_rows"] = 0
+            elif result["success"]:
+                try:
+                    consolidated = os.path.join(consolidated_dir, f"{client_code}_{year}_{status}.csv")
+                    with self.tracer.span("merge_delta", client=client_code):
+                        added = merge_delta(consolidated, result["output"], month_column, range(start, month_to + 1),
+                                            delimiter=delimiter)
+                    store.update(client_code, profile, year, month_to)
+                    result.update({"consolidated": consolidated, "delta_rows": added})
+                    logger.info(f"Client {client_code}: {added} delta rows merged into {consolidated}")
+                except Exception as e:
+                    logger.error(f"✗ Could not merge delta for client {client_code}: {e}")
+                    result.update({"success": False, "error": f"Merge failed: {e}"})
+            results[client_code] = result
+        
+        successful = sum(1 for r in results.values() if r["success"])
+        logger.info("="*60)
+        logger.info(f"EXPORT SUMMARY: Success={successful}, Failed={len(results) - successful}, Total={len(results)}")
+        logger.info("="*60)
+        return results
+    
+    def _export_batch(self, batch, filters):
+        """
+        Exporta un lote de clientes en una sola consulta y lo reparte por cliente.
+        
+        Returns:
+            tuple: (resultados por cliente, filas totales del lote)
+        """
+        month_from, month_to, year = filters['month_from'], filters['month_to'], filters['year']
+        batch_cfg = self.config.get('batch', {})
+        export_dir = self.config['export']['default_directory']
+        extension = self.config['export'].get('extension', 'csv')
+        
+        started = time.monotonic()
+        filter_key = RunJournal.filter_key(filters) if self.journal else None
+        
+        def failed(error):
+            ts = datetime.now().isoformat()
+            for c in batch:
+                if self.journal:
+                    self.journal.record(filter_key, c, False, error=error, filters=filters,
+                                        duration=(time.monotonic() - started) / len(batch))
+            return {c: {"success": False, "error": error, "timestamp": ts} for c in batch}, 0
+        
+        try:
+            stamp = f"{datetime.now():%Y%m%d_%H%M%S}"
+            with self.tracer.context(client=f"batch:{batch[0]}", batch_size=len(batch)):
+                batch_file, error = self._export_batch_file(batch, filters, stamp)
+            if batch_file is None:
+                return failed(error)
+            
+            # Repartir por cliente; los códigos SAP pueden llevar ceros a la izquierda
+            by_norm = {str(c).lstrip("0"): c for c in batch}
+            client_path = lambda c: os.path.join(
+                export_dir, f"EXPORT_CLIENT_{c}_{year}M{month_from:02d}-{month_to:02d}_{stamp}.{extension}")
+            with self.tracer.span("split", client=f"batch:{batch[0]}", batch_size=len(batch)):
+                counts = split_by_column(
+                    batch_file,
+                    batch_cfg.get('client_column', ["Client", "KUNNR"]),
+                    client_path,
+                    key=lambda raw: by_norm.get(raw.lstrip("0")),
+                    delimiter=export_delimiter(self.config, 'batch'),
+                )
+            
+            if not batch_cfg.get('keep_batch_file', False):
+                os.remove(batch_file)
+        
+        except Exception as e:
+            logger.error(f"Error during batch export starting at {batch[0]}: {e}")
+            return failed(str(e))
+        
+        ts = datetime.now().isoformat()
+        duration = (time.monotonic() - started) / len(batch)
+        results = {}
+        for client_code in batch:
+            if counts.get(client_code):
+                logger.info(f"✓ Client {client_code} exported successfully ({counts[client_code]} rows)")
+                results[client_code] = {"success": True, "output": client_path(client_code),
+                                        "rows": counts[client_code], "timestamp": ts}
+            else:
+                logger.warning(f"✗ Client {client_code}: no rows in batch export")
+                results[client_code] = {"success": False, "error": "No data", "timestamp": ts}
+            if self.journal:
+                r = results[client_code]
+                self.journal.record(filter_key, client_code, r["success"], output=r.get("output"),
+                                    rows=r.get("rows"), duration=duration, error=r.get("error"),
+                                    filters=filters)
+        return results, sum(counts.values())
+    
+    def _export_batch_file(self, batch, filters, stamp):
+        """
+        Consulta el lote en SAP (selección múltiple de S_KUNNR) y exporta el ALV a un archivo.
+        
+        Returns:
+            tuple: (ruta del export, None) o (None, motivo del fallo)
+        """
+        month_from, month_to, year = filters['month_from'], filters['month_to'], filters['year']
+        export_dir = self.config['export']['default_directory']
+        extension = self.config['export'].get('extension', 'csv')
+        
+        with self.tracer.span("total"):
+            with self.tracer.span("navigate"):
+                if not self._open_selection_screen():
+                    return None, "Selection screen did not load"
+            
+            with self.tracer.span("apply_filters"):
+                self._apply_filters(None, **filters)
+            with self.tracer.span("multiple_selection"):
+                set_multiple_selection(self.session, "S_KUNNR", batch,
+                                       use_clipboard=self.config.get('batch', {}).get('use_clipboard', True),
+                                       timeout=self._wait_kwargs()['timeout'])
+            # El diálogo rellena S_KUNNR-LOW con el primer valor
+            self.screen.invalidate(["wnd[0]/usr/ctxtS_KUNNR-LOW", "wnd[0]/usr/ctxtS_KUNNR-HIGH"])
+            
+            alv = self._execute_and_find_alv()
+            if not alv:
+                logger.warning(f"No ALV found for batch starting at {batch[0]} - possibly no data")
+                return None, "No data"
+            
+            batch_file = self._export_alv(alv, export_dir,
+                                          f"EXPORT_BATCH_{batch[0]}_{year}M{month_from:02d}-{month_to:02d}_{stamp}.{extension}")
+            with self.tracer.span("back"):
+                self.screen.back()
+        return batch_file, None
+    
+    def _process_client(self, client_code, filters, allow_empty=False):
+        """
+        Exporta un cliente, construye su entrada de resultados y la registra en el diario.
+        
+        Args:
+            client_code: Código del cliente
+            filters: Diccionario con month_from, month_to, year y status
+            allow_empty: Dar por correcta una consulta sin datos (rows=0, no_data=True)
+            
+        Returns:
+            dict: Resultado de la exportación del cliente
+        """
+        started = time.monotonic()
+        self.last_export = {}
+        try:
+            with self.tracer.context(client=client_code), self.tracer.span("total"):
+                success = self._export_single_client(client_code=client_code, **filters)
+            no_data = not success and allow_empty and self.last_export.get("no_data")
+            if no_data:
+                success = True
+                logger.info(f"✓ Client {client_code}: no data for these filters")
+            elif success:
+                logger.info(f"✓ Client {client_code} exported successfully")
+            else:
+                logger.warning(f"✗ Client {client_code} export failed")
+            
+            result = {
+                "success": success,
+                "timestamp": datetime.now().isoformat()
+            }
+            if success:
+                result.update(self.last_export)
+            
+        except Exception as e:
+            logger.error(f"✗ Error exporting client {client_code}: {e}")
+            result = {
+                "success": False,
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        if self.journal:
+            self.journal.record(RunJournal.filter_key(filters), client_code, result["success"],
+                                output=result.get("output"), rows=result.get("rows"),
+                                duration=time.monotonic() - started, error=result.get("error"),
+                                filters=filters)
+        return result
+    
+    def _skip_completed(self, client_list, filters, resume):
+        """
+        Separa los clientes ya exportados con estos filtros (según el diario).
+        
+        Returns:
+            tuple: (clientes pendientes, resultados de los clientes saltados)
+        """
+        if not (resume and self.journal):
+            return list(client_list), {}
+        
+        done = self.journal.completed(RunJournal.filter_key(filters))
+        skipped = {
+            c: {"success": True, "skipped": True, "output": done[c].get("output"),
+                "rows": done[c].get("rows"), "timestamp": done[c].get("timestamp")}
+            for c in client_list if c in done
+        }
+        logger.info(f"Resume: skipping {len(skipped)} clients already exported with these filters")
+        return [c for c in client_list if c not in done], skipped
+    
+    def _run_parallel(self, client_list, filters):
+        """
+        Reparte los clientes entre las sesiones del pool.
+        
+        Cada hilo toma el siguiente cliente pendiente de una cola compartida,
+        así una sesión lenta no retrasa a las demás.
+        
+        Args:
+            client_list: Lista de códigos de clientes
+            filters: Diccionario con month_from, month_to, year y status
+            
+        Returns:
+            dict: Resultados por cliente, en el orden de client_list
+        """
+        logger.info(f"Parallel export using {len(self.sessions)} sessions")
+        
+        work = queue.Queue()
+        for idx, client_code in enumerate(client_list, 1):
+            work.put((idx, client_code))
+        
+        results = {}
+        lock = threading.Lock()
+        
+        threads = [
+            threading.Thread(
+                target=self._worker,
+                args=(handle, work, results, lock, len(client_list), filters),
+                name=f"sap-session-{n}",
+                daemon=True,
+            )
+            for n, handle in enumerate(self.sessions)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        # Clientes que ningún hilo llegó a procesar (ej: ninguna sesión pudo adjuntarse)
+        for client_code in client_list:
+            if client_code not in results:
+                results[client_code] = {
+                    "success": False,
+                    "error": "Not processed: no pool session available",
+                    "timestamp": datetime.now().isoformat()
+                }
+        
+        return {c: results[c] for c in client_list}
+    
+    def _worker(self, handle, work, results, lock, total, filters):
+        """
+        Hilo trabajador: abre su apartamento COM, resuelve su sesión y consume clientes.
+        """
+        with com_apartment():
+            try:
+                session = self.attach(handle) if self.attach else handle
+            except Exception as e:
+                logger.error(f"Could not attach pool session {handle}: {e}")
+                return
+            
+            exporter = MultiClientExporter(session, self.config, journal=self.journal, tracer=self.tracer)
+            while True:
+                try:
+                    idx, client_code = work.get_nowait()
+                except queue.Empty:
+                    return
+                
+                logger.info(f"[{idx}/{total}] [{threading.current_thread().name}] Processing client: {client_code}")
+                result = exporter._process_client(client_code, filters)
+                with lock:
+                    results[client_code] = result
+    
     def _export_single_client(self, client_code, month_from, month_to, year, status):
         """
         Exporta facturas para un solo cliente.
@@ -155,49 +533,34 @@ class MultiClientExporter:
             bool: True si la exportación fue exitosa
         """
         try:
-            # 1. Navegar a la transacción
-            tcode = self.config['sap']['transaction_code']
-            self.session.findById("wnd[0]/tbar[0]/okcd").Text = tcode
-            self.session.findById("wnd[0]").sendVKey(0)
-            time.sleep(self.config['timeouts']['long_wait'])  # Need more time for transaction to load
+            # 1. Ir a la pantalla de selección (solo navega si hace falta)
+            with self.tracer.span("navigate"):
+                if not self._open_selection_screen():
+                    return False
             
             # 2. Aplicar filtros
-            self._apply_filters(client_code, month_from, month_to, year, status)
+            with self.tracer.span("apply_filters"):
+                self._apply_filters(client_code, month_from, month_to, year, status)
             
-            # 3. Ejecutar búsqueda
-            self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
-            time.sleep(self.config['timeouts']['long_wait'])
-            
-            # 4. Verificar si hay resultados
-            wnd0 = self.session.findById("wnd[0]")
-            alv = find_alv_shell(wnd0)
+            # 3. Ejecutar búsqueda y 4. verificar si hay resultados
+            alv = self._execute_and_find_alv()
             
             if not alv:
                 logger.warning(f"No ALV found for client {client_code} - possibly no data")
+                self.last_export = {"output": None, "rows": 0, "no_data": True}
                 return False
             
-            # 5. Exportar a Excel
-            alv.ContextMenu()
-            alv.SelectContextMenuItem("&XXL")
-            time.sleep(self.config['timeouts']['default_wait'])
-            
-            # 6. Configurar formato de exportación
-            self._handle_export_dialog()
-            
-            # 7. Guardar archivo
+            # 5. Nombre del archivo de salida
             extension = self.config['export'].get('extension', 'csv')
             filename = f"EXPORT_CLIENT_{client_code}_{year}M{month_from:02d}-{month_to:02d}_{datetime.now():%Y%m%d_%H%M%S}.{extension}"
             export_dir = self.config['export']['default_directory']
-            full_path = os.path.join(export_dir, filename)
             
-            self._handle_save_dialog(export_dir, filename)
+            # 6. Exportar: lectura directa del grid, fichero local o exportación a Excel
+            self._export_alv(alv, export_dir, filename)
             
-            # 8. Manejar popup de seguridad
-            handle_security_popup(self.session)
-            
-            # 9. Cerrar Excel
-            time.sleep(self.config['timeouts']['long_wait'])
-            close_excel_workbook(full_path)
+            # 7. Volver a la pantalla de selección para el siguiente cliente
+            with self.tracer.span("back"):
+                self.screen.back()
             
             logger.info(f"Export saved: {filename}")
             return True
@@ -206,92 +569,131 @@ class MultiClientExporter:
             logger.error(f"Error during export for client {client_code}: {e}")
             return False
     
+    def _open_selection_screen(self):
+        """
+        Deja la sesión en la pantalla de selección de la transacción.
+        
+        Si la sesión ya está en ella (ej: tras volver con Atrás) no se reinicia
+        la transacción.
+        
+        Returns:
+            bool: True si la pantalla de selección está disponible
+        """
+        return self.screen.ensure()
+    
+    def _execute_and_find_alv(self):
+        """
+        Ejecuta la búsqueda y devuelve el ALV de resultados (None si no hay datos).
+        
+        La búsqueda termina con el ALV o con un mensaje en la barra de estado.
+        """
+        with self.tracer.span("execute"):
+            self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
+            wait_until(self.session,
+                       lambda s: find_alv_shell(s.findById("wnd[0]")) is not None or status_message(s),
+                       **self._wait_kwargs())
+        with self.tracer.span("alv_lookup"):
+            return find_alv_shell(self.session.findById("wnd[0]"))
+    
+    def _export_alv(self, alv, export_dir, filename):
+        """Exporta el ALV según export.method: lectura directa del grid, fichero local o Excel."""
+        full_path = os.path.join(export_dir, filename)
+        rows = None
+        if self.config['export'].get('method', 'excel') == 'grid':
+            with self.tracer.span("grid_read"):
+                rows = AlvReader(alv).write(full_path, columns=self.config['export'].get('columns'))
+        else:
+            self._export_via_menu(alv, export_dir, filename, full_path)
+        self.last_export = {"output": full_path, "rows": rows}
+        return full_path
+    
+    def _export_via_menu(self, alv, export_dir, filename, full_path):
+        """
+        Exporta el ALV con el menú contextual y, si SAP abrió Excel, lo cierra.
+        
+        Con export.method "local" se usa "Grabar lista en fichero" (&PC): SAP
+        escribe el archivo sin arrancar Excel. Si no, &XXL con export.format,
+        que abre el archivo en Excel. Los diálogos de formato y guardado y el
+        popup de seguridad los atiende un DialogWatcher en segundo plano en
+        cuanto aparecen. Excel se cierra cuando SAP ha terminado de escribir
+        el archivo.
+        """
+        timeout = self._wait_kwargs()['timeout']
+        menu_item, format_handler, headless = export_route(self.config['export'])
+        started = time.time()
+        with DialogWatcher(self.session, poll_interval=self._wait_kwargs()['poll_interval']) as watcher:
+            watcher.arm(save_as_handler(export_dir, filename))
+            watcher.arm(format_handler)
+            
+            with self.tracer.span("export_dialog"):
+                alv.ContextMenu()
+                alv.SelectContextMenuItem(menu_item)
+                if not watcher.wait_for("export_format", timeout):
+                    raise RuntimeError("Export dialog did not appear")
+            
+            # Guardar archivo
+            with self.tracer.span("save_dialog"):
+                if not watcher.wait_for("save_as", timeout):
+                    raise RuntimeError("Save dialog did not appear")
+            
+            # Esperar a que SAP termine de escribir el archivo (el popup de seguridad lo atiende el vigilante)
+            with self.tracer.span("export_file"):
+                if not wait_for_export_file(full_path, since=started, excel=not headless,
+                                            **self._file_wait_kwargs()):
+                    raise RuntimeError(f"Export file was not completed: {full_path}")
+        
+        if not headless:
+            with self.tracer.span("excel_close"):
+                close_excel_workbook(full_path)
+    
+    def _wait_kwargs(self):
+        """Parámetros de espera (timeout y sondeo inicial) desde la configuración."""
+        timeouts = self.config.get('timeouts', {})
+        return {
+            "timeout": timeouts.get('wait_timeout', 30),
+            "poll_interval": timeouts.get('poll_interval', 0.05),
+        }
+    
+    def _file_wait_kwargs(self):
+        """Parámetros de espera del archivo exportado desde la configuración."""
+        timeouts = self.config.get('timeouts', {})
+        return {
+            "timeout": timeouts.get('export_file_timeout', 120),
+            "poll_interval": timeouts.get('poll_interval', 0.05),
+            "stable_for": timeouts.get('file_stable_for', 0.3),
+        }
+    
     def _apply_filters(self, client_code, month_from, month_to, year, status):
         """
-        Aplica los filtros en el formulario.
+        Aplica los filtros en el formulario (solo los campos que han cambiado).
         
         Args:
-            client_code: Código del cliente
+            client_code: Código del cliente (None para no tocar S_KUNNR)
             month_from: Mes inicial
             month_to: Mes final
             year: Año
             status: Status
         """
-        # Cliente
-        self.session.findById("wnd[0]/usr/ctxtS_KUNNR-LOW").Text = str(client_code)
-        self.session.findById("wnd[0]/usr/ctxtS_KUNNR-HIGH").Text = ""
+        values = {}
         
-        # Mes inicial
-        self.session.findById("wnd[0]/usr/ctxtS_MES-LOW").Text = str(month_from)
+        # Cliente (None en modo lote: se usa la selección múltiple)
+        if client_code is not None:
+            values["wnd[0]/usr/ctxtS_KUNNR-LOW"] = client_code
+            values["wnd[0]/usr/ctxtS_KUNNR-HIGH"] = ""
         
-        # Mes final
-        self.session.findById("wnd[0]/usr/ctxtS_MES-HIGH").Text = str(month_to)
+        # Mes inicial y final
+        values["wnd[0]/usr/ctxtS_MES-LOW"] = month_from
+        values["wnd[0]/usr/ctxtS_MES-HIGH"] = month_to
         
         # Año
-        self.session.findById("wnd[0]/usr/txtS_GJAHR-LOW").Text = str(year)
-        self.session.findById("wnd[0]/usr/txtS_GJAHR-HIGH").Text = ""
+        values["wnd[0]/usr/txtS_GJAHR-LOW"] = year
+        values["wnd[0]/usr/txtS_GJAHR-HIGH"] = ""
         
         # Status
-        self.session.findById("wnd[0]/usr/ctxtS_STATUS-LOW").Text = str(status)
-        self.session.findById("wnd[0]/usr/ctxtS_STATUS-HIGH").Text = ""
+        values["wnd[0]/usr/ctxtS_STATUS-LOW"] = status
+        values["wnd[0]/usr/ctxtS_STATUS-HIGH"] = ""
         
-        logger.debug(f"Filters applied: Client={client_code}, Month={month_from}-{month_to}, Year={year}, Status={status}")
-    
-    def _handle_export_dialog(self):
-        """Maneja el diálogo de exportación."""
-        try:
-            wnd1 = self.session.findById("wnd[1]")
-            
-            # Intentar seleccionar formato
-            try:
-                cmb_format = wnd1.findById("usr/ssubSUB_CONFIGURATION:SAPLSALV_GUI_CUL_EXPORT_AS:0512/cmbGS_EXPORT-FORMAT")
-                
-                # Intentar establecer el formato configurado
-                export_format = self.config['export'].get('format', 'csv-LEAN-STANDARD')
-                
-                # Si el formato es numérico, intentar convertirlo
-                try:
-                    cmb_format.Key = export_format
-                    logger.debug(f"Export format set to: {export_format}")
-                except Exception as format_error:
-                    # Si falla, intentar con el formato por texto
-                    logger.warning(f"Could not set format '{export_format}': {format_error}")
-                    logger.info("Continuing with default export format")
-                    
-            except Exception as combo_error:
-                logger.warning(f"Could not find format combo box: {combo_error}")
-                logger.info("Continuing with default export format")
-            
-            # Presionar botón de exportación
-            try:
-                wnd1.findById("tbar[0]/btn[20]").press()
-            except:
-                wnd1.findById("tbar[0]/btn[0]").press()
-            
-            logger.debug("Export dialog handled")
-            
-        except Exception as e:
-            logger.error(f"Error in export dialog: {e}")
-            raise
-    
-    def _handle_save_dialog(self, directory, filename):
-        """
-        Maneja el diálogo de guardado.
-        
-        Args:
-            directory: Directorio de destino
-            filename: Nombre del archivo
-        """
-        time.sleep(self.config['timeouts']['default_wait'])
+        # Solo se escriben los campos que cambian respecto al cliente anterior
+        self.screen.apply(values)
         
-        try:
-            wnd1 = self.session.findById("wnd[1]")
-            wnd1.findById("usr/ctxtDY_PATH").Text = directory
-            wnd1.findById("usr/ctxtDY_FILENAME").Text = filename
-            wnd1.findById("tbar[0]/btn[0]").press()
-            
-            logger.debug("Save dialog handled")
-            
-        except Exception as e:
-            logger.error(f"Error in save dialog: {e}")
-            raise
+        logger.debug(f"Filters applied: Client={client_code}, Month={month_from}-{month_to}, Year={year}, Status={status}")
@@ -9,7 +9,8 @@ Modo de uso (ejemplo):
 python3 -m src.scripts.export_multi_client_cli --clients src/scripts/clientes.txt --filter date_end_service=01/01/2025:31/12/2025 --filter status=F --connection-mode credentials
 
 Soporta filtros en formato `key=value` (LOW) o `key=low:high`.
-Si se pasa `--simulate`, no requiere sesión SAP y sólo emula la ejecución.
+Si se pasa `--simulate`, no requiere SAP: el flujo completo se ejecuta contra el
+motor de scripting simulado (`src/utils/fake_sap.py`, sección `simulation`).
 """
 
 from __future__ import annotations
@@ -22,7 +23,15 @@ import time
 from datetime import datetime
 from typing import Dict, Optional, Tuple
 import yaml
-from src.core.sap_utils import find_alv_shell, handle_security_popup, close_excel_workbook
+from src.core.sap_utils import (find_alv_shell, close_excel_workbook, wait_until, wait_for_export_file,
+                                status_message)
+from src.core.alv_reader import AlvReader
+from src.core.dialog_watcher import DialogWatcher, export_route, save_as_handler
+from src.core.selection_screen import SelectionScreen
+from src.utils.run_journal import RunJournal
+from src.utils.export_cache import ExportCache
+from src.utils.export_pipeline import ExportPipeline, default_stages
+from src.utils.tracing import Tracer
 
 logger = logging.getLogger("SAP_Automation")
 logging.basicConfig(level=logging.INFO)
@@ -175,41 +184,114 @@ class MultiClientExporterV2:
     If `simulate` is True, SAP interactions are not performed and actions are logged.
     """
 
-    def __init__(self, session=None, config: Optional[dict] = None, simulate: bool = True):
+    def __init__(self, session=None, config: Optional[dict] = None, simulate: bool = True,
+                 journal: Optional[RunJournal] = None, cache: Optional[ExportCache] = None,
+                 tracer: Optional[Tracer] = None, pipeline: Optional[bool] = None):
         self.session = session
         self.config = config or {}
         self.simulate = simulate
-
-    def run(self, client_list: list[str], filters: Dict[str, Tuple[Optional[str], Optional[str]]]) -> dict:
+        self.cache = cache
+        self.tracer = tracer or Tracer()
+        # Simulated runs are never journaled: they must not mark clients as done
+        self.journal = journal if not simulate else None
+        self.last_export: dict = {}
+        # Post-process exports (validate/normalize/convert/register) while SAP fetches the next client
+        pipeline_cfg = self.config.get('pipeline', {}) or {}
+        self.pipeline = (pipeline_cfg.get('enabled', False) if pipeline is None else pipeline) and not simulate
+        self.pipeline_stats: Optional[dict] = None
+        tcode = self.config.get('sap', {}).get('transaction_code')
+        # The selection screen is reused across clients; only changed fields are rewritten
+        self.screen: Optional[SelectionScreen] = None
+        if tcode and not simulate:
+            self.screen = SelectionScreen(session, tcode,
+                                          screen_number=self.config['sap'].get('selection_screen', 1000),
+                                          ready_control=FIELD_MAP['client']['low'], **self._wait_kwargs())
+
+    def run(self, client_list: list[str], filters: Dict[str, Tuple[Optional[str], Optional[str]]],
+            resume: bool = False) -> dict:
         logger.info(f"Running exporter for {len(client_list)} clients (simulate={self.simulate})")
         results = {}
-        for i, client in enumerate(client_list, 1):
-            logger.info(f"[{i}/{len(client_list)}] {client}")
-            # Build a per-client copy of filters so we don't reuse/mutate the same dict
-            per_client_filters = dict(filters) if filters is not None else {}
-            per_client_filters['client'] = (client, None)
-
-            try:
-                ok = self._export_single_client(client, per_client_filters)
-                results[client] = {"success": ok, "timestamp": datetime.now().isoformat()}
-            except Exception as e:
-                logger.exception("Error exporting client %s", client)
-                results[client] = {"success": False, "error": str(e), "timestamp": datetime.now().isoformat()}
+        filter_key = RunJournal.filter_key(filters or {})
+        done = self.journal.completed(filter_key) if (resume and self.journal) else {}
+        if done:
+            logger.info("Resume: skipping %d clients already exported with these filters",
+                        sum(1 for c in client_list if c in done))
+
+        post = self._new_pipeline() if self.pipeline else None
+        if post:
+            post.start()
+        try:
+            for i, client in enumerate(client_list, 1):
+                if client in done:
+                    results[client] = {"success": True, "skipped": True, "output": done[client].get("output"),
+                                       "rows": done[client].get("rows"), "timestamp": done[client].get("timestamp")}
+                    continue
+
+                logger.info(f"[{i}/{len(client_list)}] {client}")
+                # Build a per-client copy of filters so we don't reuse/mutate the same dict
+                per_client_filters = dict(filters) if filters is not None else {}
+                per_client_filters['client'] = (client, None)
+
+                started = time.monotonic()
+                self.last_export = {}
+                try:
+                    with self.tracer.context(client=client), self.tracer.span("total"):
+                        ok = self._export_single_client(client, per_client_filters)
+                    results[client] = {"success": ok, "timestamp": datetime.now().isoformat()}
+                    if ok:
+                        results[client].update(self.last_export)
+                except Exception as e:
+                    logger.exception("Error exporting client %s", client)
+                    results[client] = {"success": False, "error": str(e), "timestamp": datetime.now().isoformat()}
+
+                r = results[client]
+                if post and r["success"] and r.get("output"):
+                    # Workers validate/convert the file and journal it; blocks while the queue is full
+                    post.submit(client, r["output"], r, filters=filters, duration=time.monotonic() - started)
+                elif self.journal:
+                    self.journal.record(filter_key, client, r["success"], output=r.get("output"),
+                                        rows=r.get("rows"), duration=time.monotonic() - started,
+                                        error=r.get("error"), filters=filters)
+        finally:
+            if post:
+                self.pipeline_stats = post.join()
 
         successful = sum(1 for r in results.values() if r.get('success'))
         logger.info(f"Summary: {successful} succeeded / {len(results)-successful} failed")
         return results
 
+    def _new_pipeline(self) -> ExportPipeline:
+        """Post-processing pipeline from the `pipeline` config section."""
+        cfg = self.config.get('pipeline', {}) or {}
+        return ExportPipeline(default_stages(self.config, self.journal),
+                              workers=cfg.get('workers', 2), queue_size=cfg.get('queue_size', 4),
+                              tracer=self.tracer)
+
     def _export_single_client(self, client_code: str, filters: Dict[str, Tuple[Optional[str], Optional[str]]]) -> bool:
-        # 1) Navigate to transaction if config provided (optional)
         tcode = self.config.get('sap', {}).get('transaction_code') if self.config else None
-        if tcode and not self.simulate:
-            self.session.findById("wnd[0]/tbar[0]/okcd").Text = tcode
-            self.session.findById("wnd[0]").sendVKey(0)
-            time.sleep(self.config.get('timeouts', {}).get('long_wait', 2))
+
+        # 0) Closed billing periods are served from the local cache without touching SAP
+        if self.cache and not self.simulate:
+            export_dir, filename = self._export_target(client_code)
+            full_path = os.path.join(export_dir, filename)
+            with self.tracer.span("cache_fetch"):
+                hit = self.cache.fetch(tcode or "", filters, full_path)
+            if hit:
+                self.last_export = {"output": full_path, "rows": None, "cached": True}
+                logger.info(f"Export saved (cache): {filename}")
+                return True
+
+        # 1) Go to the selection screen (navigates only when not already there)
+        if self.screen:
+            with self.tracer.span("navigate"):
+                ready = self.screen.ensure()
+            if not ready:
+                logger.error("Selection screen of %s did not load for client %s", tcode, client_code)
+                return False
 
         # 2) Apply filters
-        self._apply_filters_by_map(filters)
+        with self.tracer.span("apply_filters"):
+            self._apply_filters_by_map(filters)
 
         # 3) Trigger search / export - real flow
         if self.simulate:
@@ -218,62 +300,42 @@ class MultiClientExporterV2:
 
         try:
             # Execute search
-            self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
-            time.sleep(self.config.get('timeouts', {}).get('long_wait', 2))
+            with self.tracer.span("execute"):
+                self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
+                wait_until(self.session,
+                           lambda s: find_alv_shell(s.findById("wnd[0]")) is not None or status_message(s),
+                           **self._wait_kwargs())
 
             # Find ALV
-            wnd0 = self.session.findById("wnd[0]")
-            alv = find_alv_shell(wnd0)
+            with self.tracer.span("alv_lookup"):
+                wnd0 = self.session.findById("wnd[0]")
+                alv = find_alv_shell(wnd0)
             if not alv:
                 logger.warning(f"No ALV found for client {client_code} - possibly no data")
                 return False
 
-            # Export via context menu
-            try:
-                alv.ContextMenu()
-                alv.SelectContextMenuItem("&XXL")
-            except Exception:
-                logger.warning("Could not invoke ALV context menu/export action")
-
-            time.sleep(self.config.get('timeouts', {}).get('default_wait', 0.5))
-
-            # Handle export dialog
-            self._handle_export_dialog()
-
-            # Prepare filename and save
-            extension = self.config.get('export', {}).get('extension', 'csv')
-            prefix = self.config.get('export', {}).get('default_filename_prefix', 'EXPORT')
-            export_dir = self.config.get('export', {}).get('default_directory', '.')
-            filename = f"{prefix}{client_code}_{datetime.now():%Y%m%d_%H%M%S}.{extension}"
+            # Prepare filename
+            export_dir, filename = self._export_target(client_code)
             full_path = os.path.join(export_dir, filename)
 
-            self._handle_save_dialog(export_dir, filename)
-
-            # Handle security popup
-            handle_security_popup(self.session)
-
-            # Wait and close Excel workbook
-            time.sleep(self.config.get('timeouts', {}).get('long_wait', 2))
-            close_excel_workbook(full_path)
-            # Attempt to close the SAP results window for this client
-            try:
-                # Prefer closing a secondary window if present
-                try:
-                    self.session.findById("wnd[1]").close()
-                    logger.debug("Closed SAP results window wnd[1].")
-                except Exception:
-                    try:
-                        self.session.findById("wnd[0]").close()
-                        logger.debug("Closed SAP main window wnd[0].")
-                    except Exception:
-                        try:
-                            # As fallback, send a close VKey
-                            self.session.findById("wnd[0]").sendVKey(15)
-                            logger.debug("Sent close VKey(15) to wnd[0].")
-                        except Exception:
-                            logger.debug("Could not close any SAP window for this client.")
-            except Exception as e:
-                logger.warning("Error when attempting to close SAP window: %s", e)
+            # Export: read the grid directly, save a local file or go through the Excel export
+            rows = None
+            if self.config.get('export', {}).get('method', 'excel') == 'grid':
+                with self.tracer.span("grid_read"):
+                    rows = AlvReader(alv).write(full_path, columns=self.config.get('export', {}).get('columns'))
+            else:
+                self._export_via_menu(alv, export_dir, filename, full_path)
+            self.last_export = {"output": full_path, "rows": rows}
+
+            if self.cache:
+                self.cache.store(tcode or "", filters, full_path)
+
+            # Back to the selection screen for the next client (F3 instead of closing windows)
+            if self.screen:
+                with self.tracer.span("back"):
+                    returned = self.screen.back()
+                if not returned:
+                    logger.debug("Could not return to the selection screen; next client will navigate again.")
 
             logger.info(f"Export saved: {filename}")
             return True
@@ -282,58 +344,68 @@ class MultiClientExporterV2:
             logger.exception("SAP export failed for %s", client_code)
             return False
 
-    def _handle_export_dialog(self):
-        """Mimic the export dialog handling from original exporter."""
-        try:
-            wnd1 = self.session.findById("wnd[1]")
-
-            # Try to select format combo
-            try:
-                cmb = wnd1.findById("usr/ssubSUB_CONFIGURATION:SAPLSALV_GUI_CUL_EXPORT_AS:0512/cmbGS_EXPORT-FORMAT")
-                export_format = self.config.get('export', {}).get('format', 'csv-LEAN-STANDARD')
-                try:
-                    cmb.Key = export_format
-                    logger.debug("Export format set to: %s", export_format)
-                except Exception as fe:
-                    logger.warning("Could not set export format %s: %s", export_format, fe)
-            except Exception:
-                logger.debug("Format combo box not found in export dialog")
-
-            # Press export button - try known buttons
-            try:
-                wnd1.findById("tbar[0]/btn[20]").press()
-            except Exception:
+    def _export_target(self, client_code: str) -> Tuple[str, str]:
+        """Returns (export directory, filename) for a client export."""
+        extension = self.config.get('export', {}).get('extension', 'csv')
+        prefix = self.config.get('export', {}).get('default_filename_prefix', 'EXPORT')
+        export_dir = self.config.get('export', {}).get('default_directory', '.')
+        filename = f"{prefix}{client_code}_{datetime.now():%Y%m%d_%H%M%S}.{extension}"
+        return export_dir, filename
+
+    def _export_via_menu(self, alv, export_dir: str, filename: str, full_path: str):
+        """Export through the ALV context menu and close Excel if SAP opened it.
+
+        export.method "local" uses "Save list in file" (&PC), which writes the file without
+        starting Excel; otherwise &XXL with export.format opens it in Excel. Format/save dialogs
+        and the security popup are answered in the background by a DialogWatcher as soon as they
+        appear. Excel is closed once SAP has finished writing the file.
+        """
+        timeout = self._wait_kwargs()['timeout']
+        started = time.time()
+        menu_item, format_handler, headless = export_route(self.config.get('export', {}))
+        with DialogWatcher(self.session, poll_interval=self._wait_kwargs()['poll_interval']) as watcher:
+            watcher.arm(save_as_handler(export_dir, filename))
+            watcher.arm(format_handler)
+
+            with self.tracer.span("export_dialog"):
                 try:
-                    wnd1.findById("tbar[0]/btn[0]").press()
+                    alv.ContextMenu()
+                    alv.SelectContextMenuItem(menu_item)
                 except Exception:
-                    logger.warning("Could not press export button in dialog")
-
-            logger.debug("Export dialog handled")
-
-        except Exception as e:
-            logger.error("Error in export dialog: %s", e)
-            raise
-
-    def _handle_save_dialog(self, directory: str, filename: str):
-        time.sleep(self.config.get('timeouts', {}).get('default_wait', 0.5))
-        try:
-            wnd1 = self.session.findById("wnd[1]")
-            try:
-                wnd1.findById("usr/ctxtDY_PATH").Text = directory
-            except Exception:
-                logger.debug("Save dialog path field not found")
-            try:
-                wnd1.findById("usr/ctxtDY_FILENAME").Text = filename
-            except Exception:
-                logger.debug("Save dialog filename field not found")
-            try:
-                wnd1.findById("tbar[0]/btn[0]").press()
-            except Exception:
-                logger.debug("Save dialog OK button not found/press failed")
-            logger.debug("Save dialog handled")
-        except Exception as e:
-            logger.error("Error in save dialog: %s", e)
-            raise
+                    logger.warning("Could not invoke ALV context menu/export action")
+                if not watcher.wait_for("export_format", timeout):
+                    raise RuntimeError("Export dialog did not appear")
+
+            with self.tracer.span("save_dialog"):
+                if not watcher.wait_for("save_as", timeout):
+                    raise RuntimeError("Save dialog did not appear")
+
+            # Wait until SAP has written the file (the watcher answers the security popup meanwhile)
+            with self.tracer.span("export_file"):
+                if not wait_for_export_file(full_path, since=started, excel=not headless,
+                                            **self._file_wait_kwargs()):
+                    raise RuntimeError(f"Export file was not completed: {full_path}")
+
+        if not headless:
+            with self.tracer.span("excel_close"):
+                close_excel_workbook(full_path)
+
+    def _file_wait_kwargs(self) -> dict:
+        """Export file wait (timeout, poll interval, stability window) from config."""
+        timeouts = self.config.get('timeouts', {})
+        return {
+            "timeout": timeouts.get('export_file_timeout', 120),
+            "poll_interval": timeouts.get('poll_interval', 0.05),
+            "stable_for": timeouts.get('file_stable_for', 0.3),
+        }
+
+    def _wait_kwargs(self) -> dict:
+        """Wait timeout and initial poll interval from config."""
+        timeouts = self.config.get('timeouts', {})
+        return {
+            "timeout": timeouts.get('wait_timeout', 30),
+            "poll_interval": timeouts.get('poll_interval', 0.05),
+        }
 
     def _apply_filters_by_map(self, filters: Dict[str, Tuple[Optional[str], Optional[str]]]):
         """Applies the provided logical filters to the current SAP screen using FIELD_MAP.
@@ -354,10 +426,16 @@ class MultiClientExporterV2:
                     logger.debug("Simulate set %s = %r", low_id, low_val)
                     logger.debug("Simulate set %s = %r", high_id, high_val)
                 else:
+                    values = {}
                     if low_val is not None and low_id:
-                        self.session.findById(low_id).Text = str(low_val)
+                        values[low_id] = low_val
                     if high_val is not None and high_id:
-                        self.session.findById(high_id).Text = str(high_val)
+                        values[high_id] = high_val
+                    if self.screen:
+                        self.screen.apply(values)
+                    else:
+                        for control_id, value in values.items():
+                            self.session.findById(control_id).Text = str(value)
             except Exception as e:
                 logger.warning("Could not set filter %s (ids %s/%s): %s", logical_key, low_id, high_id, e)
 
@@ -375,7 +453,8 @@ def main(argv: Optional[list[str]] = None) -> int:
     p = argparse.ArgumentParser(description="Multi-client export using FIELD_MAP to apply filters")
     p.add_argument("--clients", required=True, help="Path to clients file (one code per line)")
     p.add_argument("--filter", action='append', default=[], help="Filter in form key=value or key=low:high. Repeatable.")
-    p.add_argument("--simulate", action='store_true', help="Don't talk to SAP, just simulate actions")
+    p.add_argument("--simulate", action='store_true',
+                   help="Run the full flow against the fake SAP scripting engine (see 'simulation' in config)")
     p.add_argument("--connection-mode", choices=["existing_session", "credentials"], default="existing_session",
                    help="How to obtain SAP session when not simulating")
     p.add_argument("--connection-index", type=int, default=0, help="Connection index for existing session")
@@ -386,6 +465,14 @@ def main(argv: Optional[list[str]] = None) -> int:
     p.add_argument("--client", help="Client (mandante) for credentials mode")
     p.add_argument("--output", help="If provided, write JSON summary to this file")
     p.add_argument("--config", default="config/settings.yaml", help="Path to settings YAML file")
+    p.add_argument("--journal", help="Export journal (JSONL). Default: journal.path from config")
+    p.add_argument("--no-cache", action='store_true', help="Ignore the export cache for this run")
+    p.add_argument("--trace", action='store_true',
+                   help="Write per-step timings to tracing.path (report: python -m src.utils.tracing)")
+    p.add_argument("--resume", action='store_true',
+                   help="Skip clients already exported with the same filters according to the journal")
+    p.add_argument("--pipeline", action='store_true', default=None,
+                   help="Post-process exports in worker threads while SAP fetches the next client (see 'pipeline' in config)")
     args = p.parse_args(argv)
 
     # Load configuration
@@ -406,7 +493,18 @@ def main(argv: Optional[list[str]] = None) -> int:
 
     session = None
     sap_conn = None
-    if not args.simulate:
+    fake_engine = False
+    if args.simulate:
+        from src.core.sap_connection import SAPConnection
+        from src.utils.fake_sap import FakeSapGui, FakeScriptingEngine
+        sap_conn = SAPConnection(connection_mode="existing_session",
+                                 gui=FakeSapGui(FakeScriptingEngine.from_config(config)))
+        session = sap_conn.connect()
+        fake_engine = True
+        sim_dir = config.get('simulation', {}).get('export_directory', 'exports/simulated')
+        os.makedirs(sim_dir, exist_ok=True)
+        config.setdefault('export', {})['default_directory'] = sim_dir
+    else:
         try:
             from src.core.sap_connection import SAPConnection
             # Prefer CLI-specified connection_mode, otherwise use config
@@ -441,13 +539,28 @@ def main(argv: Optional[list[str]] = None) -> int:
                                      credentials=creds)
             session = sap_conn.connect()
         except Exception as e:
-            logger.warning("Could not obtain SAP session (%s). Falling back to simulate. Error: %s", args.connection_mode, e)
+            logger.warning("Could not obtain SAP session (%s). Falling back to a dry run (no SAP actions). Error: %s", args.connection_mode, e)
             args.simulate = True
 
-    exporter = MultiClientExporterV2(session=session, config=config, simulate=args.simulate)
-    results = exporter.run(clients, filters)
+    journal_path = args.journal or config.get('journal', {}).get('path', 'logs/export_journal.jsonl')
+    cache = None if args.no_cache else ExportCache.from_config(config)
+    tracer = Tracer.from_config(config, enabled=args.trace or None)
+    if fake_engine:
+        # Simulated data must never reach the journal or the cache
+        exporter = MultiClientExporterV2(session=session, config=config, simulate=False, tracer=tracer,
+                                         pipeline=args.pipeline)
+    else:
+        exporter = MultiClientExporterV2(session=session, config=config, simulate=args.simulate,
+                                         journal=RunJournal(journal_path), cache=cache, tracer=tracer,
+                                         pipeline=args.pipeline)
+    results = exporter.run(clients, filters, resume=args.resume)
+    if tracer.enabled:
+        logger.info("Trace written to %s (run %s). Report: python -m src.utils.tracing %s --run-id %s",
+                    tracer.path, tracer.run_id, tracer.path, tracer.run_id)
 
     summary = {"generated_at": datetime.now().isoformat(), "results": results}
+    if exporter.pipeline_stats:
+        summary["pipeline"] = exporter.pipeline_stats
     out = json.dumps(summary, indent=2, ensure_ascii=False)
     if args.output:
         with open(args.output, 'w', encoding='utf-8') as f:
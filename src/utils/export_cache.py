@@ -0,0 +1,295 @@
+"""
+Export Cache
+============
+Caché local de exportaciones para periodos de facturación cerrados.
+
+Las facturas con status cerrado (ej: `F`) de meses anteriores no cambian, así
+que volver a exportarlas desde SAP es trabajo perdido. La caché guarda cada
+exportación con direccionamiento por contenido (el archivo se almacena con el
+SHA-256 de su contenido) y un índice JSON que asocia la clave
+(transacción + filtros normalizados + ajustes de `export` que cambian el
+archivo: método, formato y proyección de columnas) al contenido.
+
+- Solo se cachean consultas cuyo periodo está cerrado (`is_cacheable`).
+- Las entradas caducan tras `ttl_days` (0 = nunca).
+- El tamaño total se limita a `max_size_mb` expulsando las entradas menos
+  usadas recientemente (LRU).
+
+Uso:
+    from src.utils.export_cache import ExportCache
+
+    cache = ExportCache.from_config(config)
+    if cache and cache.fetch(tcode, filters, full_path):
+        ...  # servido desde caché, sin tocar SAP
+    else:
+        ...  # exportar desde SAP
+        cache.store(tcode, filters, full_path)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date
+
+from src.core.dialog_watcher import DEFAULT_LOCAL_FORMAT
+
+logger = logging.getLogger("SAP_Automation")
+
+INDEX_FILE = "index.json"
+
+
+def _as_range(value):
+    """Normaliza un filtro a (low, high): admite tuplas/listas o valores sueltos."""
+    if isinstance(value, (tuple, list)):
+        low = value[0] if len(value) > 0 else None
+        high = value[1] if len(value) > 1 else None
+        return low, high
+    return value, None
+
+
+def export_settings(export_config):
+    """
+    Ajustes de la sección `export` que determinan el archivo generado.
+
+    Forman parte de la clave: cambiar el método, el formato o las columnas
+    no debe servir un archivo cacheado con otro formato u otras columnas.
+    """
+    export_config = export_config or {}
+    method = export_config.get('method', 'excel')
+    settings = {"method": method, "extension": export_config.get('extension', 'csv')}
+    if method == 'local':
+        settings["local_format"] = export_config.get('local_format', DEFAULT_LOCAL_FORMAT)
+    elif method == 'grid':
+        settings["columns"] = [str(c) for c in export_config.get('columns') or []]
+    else:
+        settings["format"] = export_config.get('format', 'csv-LEAN-STANDARD')
+    return settings
+
+
+class ExportCache:
+    """Caché de exportaciones con índice JSON y expulsión LRU."""
+
+    def __init__(self, directory, max_size_mb=2048, ttl_days=0, closed_statuses=("F",),
+                 invoices_closed=True, export_config=None):
+        """
+        Args:
+            directory: Carpeta de la caché (objetos + index.json)
+            max_size_mb: Tamaño máximo de los objetos almacenados
+            ttl_days: Días de validez de una entrada (0 = sin caducidad)
+            closed_statuses: Status de facturación que se consideran definitivos
+            invoices_closed: Si una consulta por número de factura es siempre cacheable
+            export_config: Sección `export` de la configuración (método, formato, columnas)
+        """
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_days * 86400 if ttl_days else None
+        self.closed_statuses = {str(s).upper() for s in closed_statuses}
+        self.invoices_closed = invoices_closed
+        self.export_settings = export_settings(export_config)
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    @classmethod
+    def from_config(cls, config):
+        """Crea la caché desde la sección `cache` de la configuración (None si está desactivada)."""
+        cache_cfg = (config or {}).get('cache', {})
+        if not cache_cfg.get('enabled', False):
+            return None
+        return cls(
+            directory=cache_cfg.get('directory', 'cache/exports'),
+            max_size_mb=cache_cfg.get('max_size_mb', 2048),
+            ttl_days=cache_cfg.get('ttl_days', 0),
+            closed_statuses=cache_cfg.get('closed_statuses', ["F"]),
+            invoices_closed=cache_cfg.get('invoices_closed', True),
+            export_config=config.get('export'),
+        )
+
+    # ------------------------------------------------------------------
+    # Reglas
+    # ------------------------------------------------------------------
+
+    def is_cacheable(self, filters, today=None):
+        """
+        Indica si el resultado de la consulta ya no puede cambiar.
+
+        - Consulta por número de factura (`factura_no`): cacheable si `invoices_closed`.
+        - Resto: requiere status cerrado y que el último mes del periodo
+          (`year`/`month`) sea anterior al mes en curso.
+
+        Args:
+            filters: Filtros lógicos (claves de FIELD_MAP) -> valor o (low, high)
+        """
+        today = today or date.today()
+
+        invoice_low, _ = _as_range(filters.get('factura_no'))
+        if invoice_low and self.invoices_closed:
+            return True
+
+        status_low, status_high = _as_range(filters.get('status'))
+        if not status_low or status_high or str(status_low).upper() not in self.closed_statuses:
+            return False
+
+        year_low, year_high = _as_range(filters.get('year'))
+        if not year_low:
+            return False
+        try:
+            last_year = int(year_high or year_low)
+            month_low, month_high = _as_range(filters.get('month'))
+            last_month = int(month_high or month_low or 12)
+        except (TypeError, ValueError):
+            return False
+
+        return (last_year, last_month) < (today.year, today.month)
+
+    @staticmethod
+    def make_key(tcode, filters, export=None):
+        """Clave de la consulta: transacción + filtros normalizados + ajustes de exportación."""
+        normalized = {
+            str(k): [None if v is None else str(v) for v in _as_range(filters[k])]
+            for k in filters
+        }
+        payload = json.dumps({"tcode": str(tcode).upper(), "filters": normalized, "export": export or {}},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Operaciones
+    # ------------------------------------------------------------------
+
+    def fetch(self, tcode, filters, dest_path):
+        """
+        Copia a `dest_path` la exportación cacheada para la consulta, si existe y es válida.
+
+        Returns:
+            bool: True si fue un acierto de caché
+        """
+        if not self.is_cacheable(filters):
+            return False
+
+        key = self.make_key(tcode, filters, self.export_settings)
+        with self._lock:
+            entry = self._index["entries"].get(key)
+            if entry is None:
+                return False
+
+            if self.ttl_seconds and time.time() - entry["created"] > self.ttl_seconds:
+                logger.debug(f"Cache entry expired: {key[:12]}")
+                self._drop(key)
+                self._save_index()
+                return False
+
+            object_path = self._object_path(entry["digest"], entry["ext"])
+            if not os.path.exists(object_path):
+                self._drop(key)
+                self._save_index()
+                return False
+
+            entry["last_access"] = time.time()
+            self._save_index()
+
+        shutil.copyfile(object_path, dest_path)
+        logger.info(f"Export served from cache: {dest_path}")
+        return True
+
+    def store(self, tcode, filters, path):
+        """
+        Guarda una exportación en la caché (si la consulta es cacheable).
+
+        Returns:
+            bool: True si se almacenó
+        """
+        if not self.is_cacheable(filters) or not os.path.exists(path):
+            return False
+
+        digest = self._hash_file(path)
+        ext = os.path.splitext(path)[1].lstrip(".").lower() or "dat"
+        object_path = self._object_path(digest, ext)
+
+        with self._lock:
+            if not os.path.exists(object_path):
+                tmp_path = object_path + ".tmp"
+                shutil.copyfile(path, tmp_path)
+                os.replace(tmp_path, object_path)
+
+            now = time.time()
+            self._index["entries"][self.make_key(tcode, filters, self.export_settings)] = {
+                "digest": digest,
+                "ext": ext,
+                "size": os.path.getsize(object_path),
+                "created": now,
+                "last_access": now,
+                "tcode": tcode,
+                "filters": {k: list(_as_range(v)) for k, v in filters.items()},
+                "export": self.export_settings,
+            }
+            self._evict()
+            self._save_index()
+
+        logger.debug(f"Export cached: {path} ({digest[:12]})")
+        return True
+
+    def total_size(self):
+        """Bytes ocupados por los objetos referenciados en el índice."""
+        objects = {(e["digest"], e["ext"]): e["size"] for e in self._index["entries"].values()}
+        return sum(objects.values())
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _evict(self):
+        """Expulsa entradas LRU hasta respetar max_bytes."""
+        by_age = sorted(self._index["entries"].items(), key=lambda kv: kv[1]["last_access"])
+        for key, _ in by_age:
+            if self.total_size() <= self.max_bytes:
+                break
+            logger.debug(f"Cache eviction (LRU): {key[:12]}")
+            self._drop(key)
+
+    def _drop(self, key):
+        """Elimina una entrada y su objeto si ya no lo referencia ninguna otra."""
+        entry = self._index["entries"].pop(key, None)
+        if entry is None:
+            return
+        still_used = any(e["digest"] == entry["digest"] and e["ext"] == entry["ext"]
+                         for e in self._index["entries"].values())
+        if not still_used:
+            try:
+                os.remove(self._object_path(entry["digest"], entry["ext"]))
+            except FileNotFoundError:
+                pass
+
+    def _object_path(self, digest, ext):
+        return os.path.join(self.objects_dir, f"{digest}.{ext}")
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                if isinstance(index.get("entries"), dict):
+                    return index
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read cache index {self.index_path}, starting empty: {e}")
+        return {"version": 1, "entries": {}}
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _hash_file(path, chunk_size=1024 * 1024):
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        return h.hexdigest()
@@ -0,0 +1,313 @@
+"""
+Export Pipeline
+===============
+Post-proceso de los archivos exportados en paralelo con la extracción de SAP.
+
+El exportador (productor) entrega la ruta de cada export terminado a una cola
+acotada; un grupo de hilos trabajadores (consumidores) ejecuta sobre cada
+archivo las etapas de post-proceso mientras la sesión SAP ya está consultando
+el siguiente cliente:
+
+- validate: el archivo existe, no está vacío y tiene cabecera; cuenta filas
+- normalize: quita BOM y comillas exteriores de cada línea y reescribe el
+  archivo de `pipeline.encoding` a `pipeline.target_encoding` (sustitución atómica)
+- convert: copia opcional a Parquet (`pipeline.convert: parquet`) o ingesta en
+  el almacén particionado (`pipeline.convert: store`, ver parquet_store); requiere pyarrow
+- warehouse: carga opcional en el almacén SQLite (`pipeline.warehouse: true`, ver warehouse)
+- register: registra el resultado final en el diario de exportaciones (se
+  ejecuta también si una etapa anterior falló, para que el fallo quede anotado)
+
+Si la cola está llena, `submit` bloquea al productor (contrapresión): SAP no
+se adelanta más de `queue_size` archivos al post-proceso. `join` espera a que
+se vacíe la cola y devuelve el rendimiento de cada etapa.
+
+Uso:
+    from src.utils.export_pipeline import ExportPipeline, default_stages
+
+    pipeline = ExportPipeline(default_stages(config, journal), workers=2, queue_size=4)
+    pipeline.start()
+    pipeline.submit("CLI001", "exports/EXPORT_CLI001.csv", results["CLI001"])
+    stats = pipeline.join()
+"""
+
+import csv
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+
+from src.utils.export_splitter import read_export_rows, export_delimiter
+from src.utils.run_journal import RunJournal
+from src.utils.tracing import Tracer
+
+logger = logging.getLogger("SAP_Automation")
+
+# pyarrow es opcional: solo se necesita para convertir a Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+_STOP = object()
+
+
+class PipelineItem:
+    """Un archivo exportado que recorre las etapas; `result` es la entrada de resultados del cliente."""
+
+    def __init__(self, client, path, result, filters=None, duration=None):
+        self.client = client
+        self.path = path
+        self.result = result
+        self.filters = filters
+        self.duration = duration
+        self.rows = result.get("rows")
+
+
+class ExportPipeline:
+    """Cola acotada de archivos exportados consumida por un grupo de hilos de post-proceso."""
+
+    def __init__(self, stages, workers=2, queue_size=4, tracer=None, always=("register",)):
+        """
+        Args:
+            stages: Lista de (nombre, función(item)) ejecutadas en orden sobre cada archivo
+            workers: Hilos de post-proceso
+            queue_size: Archivos pendientes como máximo antes de bloquear al productor
+            tracer: Tracer opcional (un paso por etapa y archivo)
+            always: Etapas que se ejecutan aunque una anterior haya fallado
+        """
+        self.stages = list(stages)
+        self.always = set(always)
+        self.workers = max(int(workers), 1)
+        self.tracer = tracer or Tracer()
+        self._queue = queue.Queue(maxsize=max(int(queue_size), 1))
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stats = {name: {"files": 0, "failed": 0, "seconds": 0.0, "bytes": 0} for name, _ in self.stages}
+        self._produced = {"files": 0, "seconds": 0.0, "blocked": 0.0}
+        self._started = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.join()
+
+    def start(self):
+        if self._threads:
+            return
+        self._started = time.monotonic()
+        for n in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"export-post-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, client, path, result, filters=None, duration=None):
+        """
+        Encola un export terminado; bloquea mientras la cola está llena.
+
+        Args:
+            client: Código del cliente
+            path: Ruta del archivo exportado
+            result: Diccionario de resultado del cliente (las etapas lo actualizan)
+            filters: Filtros de la exportación (para el diario)
+            duration: Segundos que tardó SAP en producir el archivo
+        """
+        waited = time.monotonic()
+        self._queue.put(PipelineItem(client, path, result, filters, duration))
+        with self._lock:
+            self._produced["files"] += 1
+            self._produced["seconds"] += duration or 0.0
+            self._produced["blocked"] += time.monotonic() - waited
+
+    def join(self):
+        """
+        Espera a que los trabajadores terminen todos los archivos encolados.
+
+        Returns:
+            dict: Por etapa: archivos, fallos, segundos, archivos/s y MB/s; más "sap" (productor)
+                  y "wall" (segundos desde start)
+        """
+        if not self._threads:
+            return self.stats()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        stats = self.stats()
+        self._log_stats(stats)
+        return stats
+
+    def stats(self):
+        with self._lock:
+            stages = {name: dict(s) for name, s in self._stats.items()}
+            produced = dict(self._produced)
+        for s in list(stages.values()) + [produced]:
+            seconds = s["seconds"]
+            s["files_per_s"] = round(s["files"] / seconds, 3) if seconds else None
+            if "bytes" in s:
+                s["mb_per_s"] = round(s["bytes"] / 1e6 / seconds, 3) if seconds else None
+            s["seconds"] = round(seconds, 3)
+        produced["blocked"] = round(produced["blocked"], 3)
+        wall = time.monotonic() - self._started if self._started else 0.0
+        return {"sap": produced, "stages": stages, "wall": round(wall, 3)}
+
+    def _log_stats(self, stats):
+        sap = stats["sap"]
+        logger.info(f"Pipeline: {sap['files']} exports in {stats['wall']}s "
+                    f"(SAP {sap['seconds']}s, blocked on full queue {sap['blocked']}s)")
+        for name, s in stats["stages"].items():
+            logger.info(f"  {name:<10} files={s['files']} failed={s['failed']} busy={s['seconds']}s "
+                        f"files/s={s['files_per_s']} MB/s={s['mb_per_s']}")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._process(item)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, item):
+        failed = False
+        for name, stage in self.stages:
+            if failed and name not in self.always:
+                continue
+            size = _file_size(item.path)
+            started = time.perf_counter()
+            try:
+                with self.tracer.span(name, client=item.client):
+                    stage(item)
+                error = False
+            except Exception as e:
+                error = failed = True
+                logger.error(f"✗ Post-processing '{name}' failed for client {item.client}: {e}")
+                item.result.update({"success": False, "error": f"{name} failed: {e}"})
+            with self._lock:
+                s = self._stats[name]
+                s["seconds"] += time.perf_counter() - started
+                s["files"] += 1
+                s["bytes"] += size
+                s["failed"] += error
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def validate_stage(delimiter=",", encoding="latin-1"):
+    """Comprueba que el export existe, no está vacío y tiene cabecera; guarda el número de filas."""
+    def stage(item):
+        if not os.path.exists(item.path):
+            raise FileNotFoundError(f"Export file not found: {item.path}")
+        if os.path.getsize(item.path) == 0:
+            raise ValueError(f"Export file is empty: {item.path}")
+        with open(item.path, "r", encoding=encoding, newline="") as f:
+            header, rows = read_export_rows(f, delimiter)
+            if not header:
+                raise ValueError(f"Export file has no header: {item.path}")
+            item.rows = sum(1 for _ in rows)
+        item.result["rows"] = item.rows
+    return stage
+
+
+def normalize_stage(delimiter=",", encoding="latin-1", target_encoding="latin-1"):
+    """Reescribe el export sin BOM ni comillas exteriores, en `target_encoding`."""
+    def stage(item):
+        tmp = item.path + ".tmp"
+        with open(item.path, "r", encoding=encoding, newline="") as f_in, \
+                open(tmp, "w", encoding=target_encoding, errors="replace", newline="") as f_out:
+            header, rows = read_export_rows(f_in, delimiter)
+            writer = csv.writer(f_out, delimiter=delimiter)
+            writer.writerow(header)
+            writer.writerows(rows)
+        os.replace(tmp, item.path)
+    return stage
+
+
+def parquet_stage(delimiter=",", encoding="latin-1", chunk_rows=50000):
+    """
+    Escribe una copia Parquet (columnas de texto) junto al export; la ruta queda en result["parquet"].
+
+    El archivo se recorre en lotes de `chunk_rows` filas (un row group por
+    lote), por lo que la memoria no crece con el tamaño del export.
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Parquet conversion requires pyarrow. Install with: pip install pyarrow")
+
+    def stage(item):
+        target = os.path.splitext(item.path)[0] + ".parquet"
+        with open(item.path, "r", encoding=encoding, newline="") as f:
+            header, rows = read_export_rows(f, delimiter)
+            schema = pa.schema([(name, pa.string()) for name in header])
+            written = 0
+            with pq.ParquetWriter(target, schema) as writer:
+                while True:
+                    batch = list(itertools.islice(rows, chunk_rows))
+                    if batch or written == 0:
+                        writer.write_table(_rows_to_table(batch, schema))
+                    written += len(batch)
+                    if len(batch) < chunk_rows:
+                        break
+        item.result["parquet"] = target
+    return stage
+
+
+def _rows_to_table(batch, schema):
+    """Tabla de texto de un lote de filas; las filas cortas se completan con nulos."""
+    data = {field.name: [row[i] if i < len(row) else None for row in batch] for i, field in enumerate(schema)}
+    return pa.table(data, schema=schema)
+
+
+def register_stage(journal):
+    """Registra el resultado final del cliente en el diario (tras el post-proceso)."""
+    def stage(item):
+        if journal is None:
+            return
+        journal.record(RunJournal.filter_key(item.filters or {}), item.client, item.result["success"],
+                       output=item.path, rows=item.rows, duration=item.duration,
+                       error=item.result.get("error"), filters=item.filters)
+    return stage
+
+
+def default_stages(config, journal=None):
+    """
+    Etapas de post-proceso según la sección `pipeline` de la configuración.
+
+    Returns:
+        list: [(nombre, función)] en orden validate, normalize, convert, warehouse, register
+    """
+    cfg = (config or {}).get('pipeline', {}) or {}
+    delimiter = export_delimiter(config, 'pipeline')
+    encoding = cfg.get('encoding', "latin-1")
+
+    stages = [("validate", validate_stage(delimiter, encoding))]
+    if cfg.get('normalize', True):
+        # Tras normalizar, las etapas siguientes leen el archivo en la codificación de destino
+        target_encoding = cfg.get('target_encoding') or encoding
+        stages.append(("normalize", normalize_stage(delimiter, encoding, target_encoding)))
+        encoding = target_encoding
+    if cfg.get('convert') == "parquet":
+        stages.append(("convert", parquet_stage(delimiter, encoding, cfg.get('chunk_rows', 50000))))
+    elif cfg.get('convert') == "store":
+        from src.utils.parquet_store import ParquetStore, ingest_stage
+        store = ParquetStore.from_config(config)
+        store.encoding = encoding
+        stages.append(("convert", ingest_stage(store)))
+    if cfg.get('warehouse', False):
+        from src.utils.warehouse import Warehouse, load_stage
+        warehouse = Warehouse.from_config(config)
+        warehouse.encoding = encoding
+        stages.append(("warehouse", load_stage(warehouse)))
+    stages.append(("register", register_stage(journal)))
+    return stages
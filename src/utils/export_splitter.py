@@ -0,0 +1,178 @@
+"""
+Export Splitter
+===============
+Parte un archivo exportado de SAP en un archivo por valor de una columna
+(por ejemplo, un CSV con varios clientes en un CSV por cliente).
+
+El archivo se recorre línea a línea y cada fila se escribe directamente en su
+archivo de destino, por lo que la memoria no crece con el tamaño del export.
+Soporta el formato de SAP con líneas completamente entrecomilladas y BOM.
+
+Uso:
+    from src.utils.export_splitter import split_by_column
+
+    counts = split_by_column("exports/batch.csv", ["Client", "KUNNR"],
+                             lambda client: f"exports/{client}.csv")
+"""
+
+import csv
+import logging
+
+from src.core.dialog_watcher import DEFAULT_LOCAL_FORMAT, LOCAL_FORMAT_DELIMITERS
+
+logger = logging.getLogger("SAP_Automation")
+
+BOM_ARTIFACTS = ("\ufeff", "ï»¿")
+
+
+def export_delimiter(config, section=None):
+    """
+    Separador de campos de los archivos exportados.
+
+    Con `export.method: local` el separador lo fija `export.local_format`
+    (lista sin convertir con "|", hoja de cálculo con tabuladores); un
+    `delimiter` configurado distinto se ignora con un aviso. En el resto de
+    casos: `<section>.delimiter`, `batch.delimiter` o ",".
+    """
+    config = config or {}
+    configured = (config.get(section, {}) or {}).get('delimiter') if section else None
+    if configured is None:
+        configured = (config.get('batch', {}) or {}).get('delimiter')
+
+    export_cfg = config.get('export', {}) or {}
+    if export_cfg.get('method') == 'local':
+        local_format = export_cfg.get('local_format', DEFAULT_LOCAL_FORMAT)
+        delimiter = LOCAL_FORMAT_DELIMITERS.get(local_format)
+        if delimiter is not None:
+            if configured is not None and configured != delimiter:
+                logger.warning(f"Delimiter {configured!r} ignored: local_format {local_format!r} "
+                               f"writes {delimiter!r}-separated files")
+            return delimiter
+    return configured if configured is not None else ","
+
+
+def _clean_line(line, unwrap):
+    for bom in BOM_ARTIFACTS:
+        line = line.replace(bom, "")
+    line = line.rstrip("\r\n")
+    if unwrap and len(line) >= 2 and line.startswith('"') and line.endswith('"'):
+        line = line[1:-1]
+    return line
+
+
+def _is_rule(line):
+    """True si la línea es una regla de guiones o está vacía (lista sin convertir)."""
+    return not line.strip(" -|")
+
+
+def _unbox(line):
+    """Quita los bordes "|" de una línea de la lista sin convertir."""
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return line
+
+
+def _is_wrapped(header_line, delimiter):
+    """True si la cabecera es una sola celda entrecomillada que contiene separadores."""
+    fields = next(csv.reader([header_line], delimiter=delimiter), [])
+    return len(fields) == 1 and delimiter in fields[0]
+
+
+def read_export_rows(f_in, delimiter=","):
+    """
+    Itera un export SAP abierto como (cabecera, generador de filas).
+
+    Limpia BOM y, si la cabecera viene como una sola celda entrecomillada,
+    quita las comillas exteriores de cada línea. Con separador "|" (lista sin
+    convertir de "Grabar lista en fichero") descarta reglas de guiones, bordes
+    y el relleno de espacios de cada celda.
+
+    Returns:
+        tuple: (lista de columnas, iterador de filas) o ([], iterador vacío) si está vacío
+    """
+    boxed = delimiter == "|"
+    first = f_in.readline()
+    while boxed and first and _is_rule(_clean_line(first, False)):
+        first = f_in.readline()
+    if not first:
+        return [], iter(())
+
+    if boxed:
+        header = [h.strip() for h in _unbox(_clean_line(first, False)).split("|")]
+        lines = (_unbox(line) for line in (_clean_line(line, False) for line in f_in) if not _is_rule(line))
+        rows = ([cell.strip() for cell in line.split("|")] for line in lines)
+        return header, rows
+
+    unwrap = _is_wrapped(_clean_line(first, False), delimiter)
+    header = next(csv.reader([_clean_line(first, unwrap)], delimiter=delimiter))
+    header = [h.strip() for h in header]
+    lines = (_clean_line(line, unwrap) for line in f_in)
+    rows = (row for row in csv.reader(lines, delimiter=delimiter) if row)
+    return header, rows
+
+
+def find_column(header, column):
+    """Índice de la primera columna candidata presente en la cabecera (None si no hay)."""
+    candidates = [column] if isinstance(column, str) else list(column)
+    return next((header.index(c) for c in candidates if c in header), None)
+
+
+def split_by_column(path, column, output_path_for, key=None, encoding="latin-1", delimiter=","):
+    """
+    Reparte las filas de `path` en archivos según el valor de `column`.
+
+    Args:
+        path: Archivo CSV de entrada
+        column: Nombre de la columna, o lista de nombres candidatos
+        output_path_for: Función valor -> ruta del archivo de salida
+        key: Función opcional valor_bruto -> valor (None descarta la fila)
+        encoding: Codificación de entrada y salida
+        delimiter: Separador de campos
+
+    Returns:
+        dict: Filas escritas por valor
+
+    Raises:
+        KeyError: Si la columna no existe en la cabecera
+    """
+    counts = {}
+    files = {}
+    writers = {}
+    skipped = 0
+
+    with open(path, "r", encoding=encoding, newline="") as f_in:
+        header, rows = read_export_rows(f_in, delimiter)
+        if not header:
+            return counts
+
+        idx = find_column(header, column)
+        if idx is None:
+            raise KeyError(f"Column {column} not found in {path}. Available: {header}")
+
+        try:
+            for row in rows:
+                raw = row[idx].strip() if idx < len(row) else ""
+                value = key(raw) if key else raw
+                if value is None:
+                    skipped += 1
+                    continue
+
+                writer = writers.get(value)
+                if writer is None:
+                    files[value] = open(output_path_for(value), "w", encoding=encoding, newline="")
+                    writer = writers[value] = csv.writer(files[value], delimiter=delimiter)
+                    writer.writerow(header)
+                    counts[value] = 0
+                writer.writerow(row)
+                counts[value] += 1
+        finally:
+            for f_out in files.values():
+                f_out.close()
+
+    if skipped:
+        logger.warning(f"{skipped} rows in {path} did not match any requested value")
+    logger.debug(f"Split {path} into {len(counts)} files")
+    return counts
@@ -0,0 +1,657 @@
+"""
+Fake SAP GUI Scripting Engine
+=============================
+Motor de scripting SAP GUI simulado para ejecutar la conexión, los
+exportadores y `sap_utils` sin Windows ni SAP (tests y benchmarks en Linux).
+
+Simula la parte de la API de scripting que usan los scripts:
+`GetScriptingEngine`, conexiones (`OpenConnection`, `Children`), sesiones
+(`findById`, `Info`, `CreateSession`), ventanas y diálogos modales, un ALV con
+filas sintéticas y los flujos de exportación (&XXL -> Exportar -> Guardar como
+y &PC -> Grabar lista en fichero -> Guardar como, que escriben el archivo en
+disco). Cada llamada tiene una latencia configurable y se pueden inyectar
+fallos (probabilidad por llamada o por id de control).
+
+Uso:
+    from src.utils.fake_sap import FakeScriptingEngine, FakeSapGui
+
+    engine = FakeScriptingEngine(latency=0.05, failure_rate=0.01, seed=1)
+    sap_conn = SAPConnection(gui=FakeSapGui(engine))
+    session = sap_conn.connect()
+
+    # O directamente una conexión suelta:
+    connection = FakeConnection(latency=0.05)
+    connection.CreateSession()
+    sessions = list(connection.Children)
+"""
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+import zlib
+
+logger = logging.getLogger("SAP_Automation")
+
+MAX_SESSIONS = 6
+
+GRID_ID = "wnd[0]/usr/cntlGRID1/shellcont/shell"
+
+# Columnas del ALV sintético (nombre técnico -> título mostrado)
+GRID_TITLES = {
+    "KUNNR": "Client",
+    "VBELN": "Factura",
+    "MES": "Mes en que es factura",
+    "GJAHR": "Any",
+    "STATUS": "Status",
+    "NETWR": "Import",
+}
+
+# Controles de cada diálogo modal (prefijos relativos a la ventana); el resto no existe
+DIALOG_CONTROLS = {
+    "Export": ("tbar[0]/", "usr/ssubSUB_CONFIGURATION:SAPLSALV_GUI_CUL_EXPORT_AS:0512/"),
+    "Save As": ("tbar[0]/", "usr/ctxtDY_PATH", "usr/ctxtDY_FILENAME"),
+    "Save list in file...": ("tbar[0]/", "usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/"),
+    "Multiple Selection": ("tbar[0]/", "usr/"),
+    "SAP GUI Security": (),
+}
+# Cualquier otro diálogo (información, error, confirmación): mensaje y botones
+MESSAGE_DIALOG_CONTROLS = ("tbar[0]/", "usr/txtMESSTXT", "usr/btnSPOP-")
+
+_ID_RE = re.compile(r"^/?app/con\[(\d+)\](?:/ses\[(\d+)\])?(?:/(.*))?$")
+
+
+class FakeComError(Exception):
+    """Error de scripting simulado (equivalente a `pywintypes.com_error`)."""
+
+
+class FailureInjector:
+    """
+    Inyección de fallos compartida por todas las sesiones de un motor.
+
+    Args:
+        failure_rate: Probabilidad de fallo de cada llamada (0 = nunca)
+        fail_ids: dict fragmento_de_id -> nº de fallos a provocar en los controles que lo contengan
+        seed: Semilla para que los fallos aleatorios sean reproducibles
+    """
+
+    def __init__(self, failure_rate=0.0, fail_ids=None, seed=None):
+        self.failure_rate = failure_rate
+        self.fail_ids = dict(fail_ids or {})
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def check(self, component_id):
+        with self._lock:
+            for pattern, remaining in self.fail_ids.items():
+                if remaining > 0 and pattern in component_id:
+                    self.fail_ids[pattern] = remaining - 1
+                    self.failures += 1
+                    raise FakeComError(f"Injected failure on {component_id}")
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self.failures += 1
+                raise FakeComError(f"Injected failure on {component_id}")
+
+
+class FakeCollection:
+    """Colección estilo COM: `Count` y acceso por índice con llamada."""
+
+    def __init__(self, items):
+        self._items = items
+
+    @property
+    def Count(self):
+        return len(self._items)
+
+    def __call__(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+
+class FakeComponent:
+    """Control genérico de SAP GUI (campo, botón, ventana, shell...)."""
+
+    def __init__(self, session, component_id, component_type, text=""):
+        self.session = session
+        self.Id = component_id
+        self.Type = component_type
+        self.Name = component_id.rsplit("/", 1)[-1]
+        self.Text = text
+        self.Tooltip = ""
+        self.Changeable = True
+        self.Key = ""
+        self.Selected = False
+        self._children = []
+
+    @property
+    def Children(self):
+        return FakeCollection(self._children)
+
+    def findById(self, relative_id):
+        # SAP GUI también acepta ids completos (ej: "wnd[0]/usr/...") desde cualquier control
+        if relative_id.startswith(("wnd[", "/")):
+            return self.session.findById(relative_id)
+        return self.session.findById(f"{self.Id}/{relative_id}")
+
+    def press(self):
+        self.session._latency(self.Id)
+        self.session._on_press(self)
+
+    def sendVKey(self, key):
+        self.session._latency(self.Id)
+        self.session._on_vkey(self, key)
+
+    def select(self):
+        self.session._latency(self.Id)
+        self.Selected = True
+        self.session._on_select(self)
+
+    def close(self):
+        self.session._latency(self.Id)
+        self.session._close_window(self.Id)
+
+    def __repr__(self):
+        return f"<FakeComponent {self.Type} {self.Id}>"
+
+
+class FakeAlvGrid(FakeComponent):
+    """Shell ALV con filas sintéticas."""
+
+    def __init__(self, session, component_id, rows, titles=None):
+        super().__init__(session, component_id, "GuiShell")
+        self.rows = rows
+        self.columns = list(rows[0]) if rows else []
+        self.titles = titles or {}
+        self.FirstVisibleRow = 0
+        self.VisibleRowCount = 25
+
+    @property
+    def RowCount(self):
+        return len(self.rows)
+
+    @property
+    def ColumnCount(self):
+        return len(self.columns)
+
+    @property
+    def ColumnOrder(self):
+        return FakeCollection(self.columns)
+
+    def GetDisplayedColumnTitle(self, column):
+        return self.titles.get(column, column)
+
+    def GetCellValue(self, row, column):
+        self.session._latency(self.Id)
+        return self.rows[row].get(column, "")
+
+    def ContextMenu(self):
+        self.session._latency(self.Id)
+
+    def SelectContextMenuItem(self, item):
+        self.session._latency(self.Id)
+        if item == "&XXL":
+            self.session._open_window(1, "GuiModalWindow", "Export")
+        elif item == "&PC":
+            self.session._open_window(1, "GuiModalWindow", "Save list in file...")
+
+
+class FakeScrollbar:
+    def __init__(self):
+        self.position = 0
+
+
+class FakeTable(FakeComponent):
+    """Table control (ej: valores individuales de la selección múltiple)."""
+
+    def __init__(self, session, component_id, visible_rows=8):
+        super().__init__(session, component_id, "GuiTableControl")
+        self.VisibleRowCount = visible_rows
+        self.verticalScrollbar = FakeScrollbar()
+        self.entries = {}
+
+
+class FakeTableCell(FakeComponent):
+    """Celda de un table control: escribe en la fila absoluta según el scroll."""
+
+    def __init__(self, session, component_id, table, row):
+        self._table = None
+        super().__init__(session, component_id, "GuiCTextField")
+        self._table = table
+        self._row = row
+
+    @property
+    def Text(self):
+        if self._table is None:
+            return ""
+        return self._table.entries.get(self._table.verticalScrollbar.position + self._row, "")
+
+    @Text.setter
+    def Text(self, value):
+        if self._table is None:
+            return
+        self._table.entries[self._table.verticalScrollbar.position + self._row] = value
+
+
+class FakeInfo:
+    def __init__(self, session_number):
+        self.SystemName = "FAKE"
+        self.Client = "100"
+        self.User = "TESTER"
+        self.Transaction = "SESSION_MANAGER"
+        self.ScreenNumber = 0
+        self.SessionNumber = session_number
+
+
+class FakeSession:
+    """
+    Sesión SAP GUI simulada.
+
+    Los controles bajo `wnd[0]/usr` se crean bajo demanda (como campos de
+    texto), de forma que cualquier pantalla de selección puede rellenarse.
+    Ejecutar (`tbar[1]/btn[8]`) genera un ALV con `rows_per_query` filas por
+    cliente (con 0 filas no hay ALV, solo un mensaje en la barra de estado) y
+    Atrás (`tbar[0]/btn[3]`) vuelve a la pantalla de selección.
+    """
+
+    def __init__(self, connection, session_id, latency=0.0, rows_per_query=3, failures=None,
+                 security_popup=False, login=False):
+        """
+        Args:
+            connection: Conexión propietaria
+            session_id: Id absoluto (ej: "/app/con[0]/ses[0]")
+            latency: Segundos de latencia por llamada
+            rows_per_query: Filas del ALV por cliente consultado
+            failures: FailureInjector compartido (None = sin fallos)
+            security_popup: Mostrar el aviso de seguridad de SAP GUI tras guardar un export
+            login: Arrancar en la pantalla de login (conexiones abiertas con OpenConnection)
+        """
+        self.connection = connection
+        self.Id = session_id
+        self.Type = "GuiSession"
+        self.Busy = False
+        self.latency = latency
+        self.rows_per_query = rows_per_query
+        self.failures = failures
+        self.security_popup = security_popup
+        self.Info = FakeInfo(int(session_id.rsplit("[", 1)[-1].rstrip("]")))
+        self.calls = 0
+        self.multiple_selection = {}
+        self.saved_files = []
+        self.export_layout = "csv"
+        self._components = {}
+        self._windows = {}
+        self._lock = threading.Lock()
+        if login:
+            self.Info.Transaction = "S000"
+            self.Info.ScreenNumber = 20
+            self._open_window(0, "GuiMainWindow", "SAP")
+        else:
+            self._open_window(0, "GuiMainWindow", "SAP Easy Access")
+
+    @property
+    def Children(self):
+        return FakeCollection([self._windows[i] for i in sorted(self._windows)])
+
+    def findById(self, component_id):
+        component_id = self._normalize(component_id)
+        self._latency(component_id)
+        with self._lock:
+            component = self._components.get(component_id)
+            if component is not None:
+                return component
+
+            window = component_id.split("/", 1)[0]
+            window_index = int(window[4:-1])
+            if window_index not in self._windows:
+                raise Exception(f"The control could not be found by id: {component_id}")
+            allowed = DIALOG_CONTROLS.get(self._windows[window_index].Text, MESSAGE_DIALOG_CONTROLS) \
+                if window_index else None
+            relative = component_id[len(window) + 1:]
+            if allowed is not None and not relative.startswith(allowed):
+                raise Exception(f"The control could not be found by id: {component_id}")
+
+            # Controles creados bajo demanda dentro de ventanas abiertas
+            parent_id, leaf = component_id.rsplit("/", 1)
+            parent = self._components.get(parent_id)
+            if leaf.startswith("tbl"):
+                component = FakeTable(self, component_id)
+            elif isinstance(parent, FakeTable) and "[" in leaf:
+                row = int(leaf.rsplit(",", 1)[-1].rstrip("]"))
+                component = FakeTableCell(self, component_id, parent, row)
+            else:
+                component_type = "GuiButton" if leaf.startswith("btn") else \
+                    "GuiRadioButton" if leaf.startswith("rad") else \
+                    "GuiCTextField" if leaf.startswith("ctxt") else \
+                    "GuiComboBox" if leaf.startswith("cmb") else "GuiTextField"
+                component = FakeComponent(self, component_id, component_type)
+            self._components[component_id] = component
+            return component
+
+    def CreateSession(self):
+        self._latency(self.Id)
+        self.connection.CreateSession()
+
+    def _normalize(self, component_id):
+        prefix = f"{self.Id}/"
+        if component_id.startswith(prefix):
+            component_id = component_id[len(prefix):]
+        return component_id.lstrip("/")
+
+    def _latency(self, component_id=""):
+        self.calls += 1
+        if self.latency:
+            self.Busy = True
+            time.sleep(self.latency)
+            self.Busy = False
+        if self.failures is not None:
+            self.failures.check(component_id)
+
+    def _open_window(self, index, window_type, title):
+        window_id = f"wnd[{index}]"
+        with self._lock:
+            for key in [k for k in self._components if k.startswith(window_id + "/")]:
+                del self._components[key]
+            window = FakeComponent(self, window_id, window_type, title)
+            self._windows[index] = window
+            self._components[window_id] = window
+        return window
+
+    def _close_window(self, window_id):
+        index = int(window_id.split("/", 1)[0][4:-1])
+        if index == 0:
+            return
+        with self._lock:
+            self._windows.pop(index, None)
+            for key in [k for k in self._components if k == window_id or k.startswith(window_id + "/")]:
+                del self._components[key]
+
+    def _on_vkey(self, component, key):
+        if component.Id == "wnd[0]" and key == 0:
+            okcode = self._components.get("wnd[0]/tbar[0]/okcd")
+            if okcode is not None and okcode.Text:
+                tcode = okcode.Text[2:] if okcode.Text[:2].lower() in ("/n", "/o") else okcode.Text
+                self.Info.Transaction = tcode.upper()
+                self.Info.ScreenNumber = 1000
+                okcode.Text = ""
+            elif self.Info.Transaction == "S000" and self._field_text("wnd[0]/usr/txtRSYST-BNAME"):
+                self.Info.User = self._field_text("wnd[0]/usr/txtRSYST-BNAME").upper()
+                self.Info.Client = self._field_text("wnd[0]/usr/txtRSYST-MANDT") or self.Info.Client
+                self.Info.Transaction = "SESSION_MANAGER"
+                self.Info.ScreenNumber = 100
+                self._windows[0].Text = "SAP Easy Access"
+        elif component.Id == "wnd[0]" and key == 3:
+            self._back()
+        elif component.Id.startswith("wnd[1]") and key == 12:
+            self._close_window("wnd[1]")
+
+    def _on_press(self, component):
+        if component.Id == "wnd[0]/tbar[1]/btn[8]":
+            self._show_results()
+        elif component.Id == "wnd[0]/tbar[0]/btn[3]":
+            self._back()
+        elif component.Id.endswith("_%_APP_%-VALU_PUSH"):
+            field = component.Id.rsplit("/btn%_", 1)[-1].split("_%_APP_")[0]
+            window = self._open_window(1, "GuiModalWindow", "Multiple Selection")
+            window.field = field
+        elif component.Id.startswith("wnd[1]/"):
+            window = self._windows.get(1)
+            title = window.Text if window is not None else ""
+            if title == "Export" and "/tbar[0]/" in component.Id:
+                self.export_layout = "csv"
+                self._open_window(1, "GuiModalWindow", "Save As")
+            elif title == "Save list in file..." and component.Id.endswith("tbar[0]/btn[0]"):
+                self._open_window(1, "GuiModalWindow", "Save As")
+            elif title == "Save As" and component.Id.endswith("tbar[0]/btn[0]"):
+                self._save_export()
+            elif title == "Multiple Selection" and "/tbar[0]/" in component.Id:
+                self._on_multiple_selection(window, component.Id)
+            elif title == "SAP GUI Security" or "/tbar[0]/" in component.Id:
+                self._close_window("wnd[1]")
+
+    def _on_select(self, component):
+        # Grabar lista en fichero: fila 0 = sin convertir, 1 = hoja de cálculo (tabuladores)
+        if "radSPOPLI-SELFLAG[" in component.Id:
+            row = int(component.Id.rsplit("[", 1)[-1].split(",")[0])
+            self.export_layout = {0: "unconverted", 1: "spreadsheet"}.get(row, "unconverted")
+
+    def _on_multiple_selection(self, window, button_id):
+        table = next((c for c in self._components.values() if isinstance(c, FakeTable)), None)
+        if button_id.endswith("btn[16]"):
+            self.multiple_selection.pop(window.field, None)
+            if table is not None:
+                table.entries = {}
+        elif button_id.endswith("btn[8]"):
+            values = [table.entries[k] for k in sorted(table.entries) if table.entries[k]] if table else []
+            self.multiple_selection[window.field] = values
+            self._close_window("wnd[1]")
+
+    def _save_export(self):
+        """Guardar como: escribe el ALV en DY_PATH/DY_FILENAME con el formato CSV de SAP."""
+        directory = self._field_text("wnd[1]/usr/ctxtDY_PATH")
+        filename = self._field_text("wnd[1]/usr/ctxtDY_FILENAME")
+        grid = self._components.get(GRID_ID)
+        self._close_window("wnd[1]")
+        if not filename or grid is None:
+            return
+
+        path = os.path.join(directory, filename)
+        titles = [grid.titles.get(c, c) for c in grid.columns]
+        rows = [[row.get(c, "") for c in grid.columns] for row in grid.rows]
+        if self.export_layout == "spreadsheet":
+            # Fichero local, hoja de cálculo: separado por tabuladores, sin comillas
+            data = "".join("\t".join(r) + "\r\n" for r in [titles] + rows).encode("latin-1")
+        elif self.export_layout == "unconverted":
+            # Fichero local, sin convertir: listado con barras verticales
+            data = "".join(f"|{'|'.join(r)}|\r\n" for r in [titles] + rows).encode("latin-1")
+        else:
+            # SAP escribe el BOM UTF-8 y cada línea entrecomillada completa
+            lines = [",".join(titles)] + [",".join(r) for r in rows]
+            data = b"\xef\xbb\xbf" + "".join(f'"{line}"\r\n' for line in lines).encode("latin-1")
+        with open(path, "wb") as f:
+            f.write(data)
+        self.saved_files.append(path)
+
+        if self.security_popup:
+            window = self._open_window(1, "GuiModalWindow", "SAP GUI Security")
+            button = FakeComponent(self, "wnd[1]/usr/btnSPOP-OPTION1", "GuiButton", "Allow")
+            with self._lock:
+                self._components[button.Id] = button
+                window._children = [button]
+
+    def _synthetic_rows(self, clients):
+        """Filas del ALV: `rows_per_query` por cliente, repartidas entre los meses del filtro."""
+        try:
+            month_from = int(self._field_text("wnd[0]/usr/ctxtS_MES-LOW") or 1)
+            month_to = int(self._field_text("wnd[0]/usr/ctxtS_MES-HIGH") or month_from)
+        except ValueError:
+            month_from, month_to = 1, 12
+        months = list(range(month_from, max(month_from, month_to) + 1))
+        year = self._field_text("wnd[0]/usr/txtS_GJAHR-LOW") or "2025"
+        status = self._field_text("wnd[0]/usr/ctxtS_STATUS-LOW") or "F"
+
+        rows = []
+        for client in clients:
+            for i in range(self.rows_per_query):
+                rows.append({
+                    "KUNNR": client,
+                    # Número de factura estable por cliente y fila: reexportar da los mismos números
+                    "VBELN": f"9{zlib.crc32(str(client).encode()) % 1000000:06d}{i:03d}",
+                    "MES": str(months[i % len(months)]),
+                    "GJAHR": year,
+                    "STATUS": status,
+                    "NETWR": f"{(i + 1) * 12.5:.2f}",
+                })
+        return rows
+
+    def _show_results(self):
+        clients = self.multiple_selection.get("S_KUNNR") or [self._field_text("wnd[0]/usr/ctxtS_KUNNR-LOW")]
+        rows = self._synthetic_rows(clients)
+        # Como SAP: sin datos no hay ALV, solo el mensaje en la barra de estado
+        self.findById("wnd[0]/sbar").Text = "" if rows else "No data was selected"
+        if not rows:
+            return
+        with self._lock:
+            usr = self._components.setdefault("wnd[0]/usr", FakeComponent(self, "wnd[0]/usr", "GuiUserArea"))
+            grid = FakeAlvGrid(self, GRID_ID, rows, titles=GRID_TITLES)
+            self._components[grid.Id] = grid
+            usr._children = [grid]
+            self._windows[0]._children = [usr]
+        self.Info.ScreenNumber = 500
+
+    def _back(self):
+        """Atrás (F3): del listado ALV a la pantalla de selección, conservando los campos."""
+        if self.Info.ScreenNumber != 500:
+            return
+        with self._lock:
+            self._components.pop(GRID_ID, None)
+            usr = self._components.get("wnd[0]/usr")
+            if usr is not None:
+                usr._children = []
+        self.Info.ScreenNumber = 1000
+
+    def _field_text(self, component_id):
+        component = self._components.get(component_id)
+        return component.Text if component is not None else ""
+
+
+class FakeConnection:
+    """Conexión SAP simulada con hasta 6 sesiones."""
+
+    def __init__(self, latency=0.0, rows_per_query=3, connection_id="/app/con[0]", failures=None,
+                 security_popup=False, login=False, description="FAKE"):
+        self.Id = connection_id
+        self.Type = "GuiConnection"
+        self.Description = description
+        self.latency = latency
+        self.rows_per_query = rows_per_query
+        self.failures = failures
+        self.security_popup = security_popup
+        self._sessions = []
+        self._new_session(login)
+
+    @property
+    def Children(self):
+        return FakeCollection(self._sessions)
+
+    @property
+    def Sessions(self):
+        return self.Children
+
+    def CreateSession(self):
+        return self._new_session(login=False)
+
+    def _new_session(self, login):
+        if len(self._sessions) >= MAX_SESSIONS:
+            raise Exception("Maximum number of sessions reached")
+        # SAP reutiliza el primer número de sesión libre
+        used = {s.Info.SessionNumber for s in self._sessions}
+        number = next(i for i in range(MAX_SESSIONS) if i not in used)
+        session = FakeSession(self, f"{self.Id}/ses[{number}]", latency=self.latency,
+                              rows_per_query=self.rows_per_query, failures=self.failures,
+                              security_popup=self.security_popup, login=login)
+        self._sessions.append(session)
+        return session
+
+    def CloseSession(self, session_id):
+        self._sessions = [s for s in self._sessions if s.Id != session_id]
+
+    def CloseConnection(self):
+        self._sessions = []
+
+    def find_session(self, session_id):
+        return next((s for s in self._sessions if s.Id == session_id), None)
+
+
+class FakeScriptingEngine:
+    """
+    GuiApplication simulada: lista de conexiones, `OpenConnection` y `findById`
+    por id absoluto (ej: "/app/con[0]/ses[2]").
+    """
+
+    def __init__(self, latency=0.0, rows_per_query=3, failure_rate=0.0, fail_ids=None, seed=None,
+                 security_popup=False, connections=1):
+        """
+        Args:
+            latency: Segundos de latencia por llamada de scripting
+            rows_per_query: Filas del ALV por cliente consultado
+            failure_rate: Probabilidad de fallo de cada llamada
+            fail_ids: dict fragmento_de_id -> nº de fallos forzados
+            seed: Semilla de la inyección de fallos
+            security_popup: Mostrar el aviso de seguridad tras guardar exports
+            connections: Conexiones ya abiertas (con una sesión logueada cada una)
+        """
+        self.Id = "/app"
+        self.Type = "GuiApplication"
+        self.latency = latency
+        self.rows_per_query = rows_per_query
+        self.security_popup = security_popup
+        self.failures = FailureInjector(failure_rate, fail_ids, seed)
+        self._connections = []
+        for _ in range(connections):
+            self._add_connection(login=False)
+
+    @classmethod
+    def from_config(cls, config):
+        """Crea el motor desde la sección `simulation` de la configuración."""
+        sim_cfg = (config or {}).get('simulation', {}) or {}
+        return cls(
+            latency=sim_cfg.get('latency', 0.0),
+            rows_per_query=sim_cfg.get('rows_per_query', 3),
+            failure_rate=sim_cfg.get('failure_rate', 0.0),
+            fail_ids=sim_cfg.get('fail_ids'),
+            seed=sim_cfg.get('seed'),
+            security_popup=sim_cfg.get('security_popup', False),
+        )
+
+    @property
+    def Children(self):
+        return FakeCollection(self._connections)
+
+    @property
+    def Connections(self):
+        return self.Children
+
+    def OpenConnection(self, description, sync=True):
+        """Abre una conexión nueva con una sesión en la pantalla de login."""
+        connection = self._add_connection(login=True, description=description)
+        logger.debug(f"Fake connection opened: {connection.Id} ({description})")
+        return connection
+
+    def findById(self, component_id):
+        match = _ID_RE.match(component_id)
+        if not match:
+            raise FakeComError(f"The control could not be found by id: {component_id}")
+        con_id = f"/app/con[{match.group(1)}]"
+        connection = next((c for c in self._connections if c.Id == con_id), None)
+        if connection is None:
+            raise FakeComError(f"The control could not be found by id: {component_id}")
+        if match.group(2) is None:
+            return connection
+        session = connection.find_session(f"{con_id}/ses[{match.group(2)}]")
+        if session is None:
+            raise FakeComError(f"The control could not be found by id: {component_id}")
+        if match.group(3):
+            return session.findById(match.group(3))
+        return session
+
+    def _add_connection(self, login, description="FAKE"):
+        used = {c.Id for c in self._connections}
+        number = next(i for i in range(len(used) + 1) if f"/app/con[{i}]" not in used)
+        connection = FakeConnection(latency=self.latency, rows_per_query=self.rows_per_query,
+                                    connection_id=f"/app/con[{number}]", failures=self.failures,
+                                    security_popup=self.security_popup, login=login,
+                                    description=description)
+        self._connections.append(connection)
+        return connection
+
+
+class FakeSapGui:
+    """Objeto "SAPGUI" simulado (lo que devuelve `GetObject("SAPGUI")`)."""
+
+    def __init__(self, engine=None):
+        self.GetScriptingEngine = engine or FakeScriptingEngine()
@@ -0,0 +1,158 @@
+"""
+Incremental Exports
+===================
+Marcas de agua (watermarks) por cliente y perfil de filtros, y fusión de los
+deltas exportados en un dataset consolidado por cliente.
+
+La marca de agua guarda el último mes que ya estaba cerrado cuando se exportó
+(`complete_through`). La siguiente ejecución solo consulta desde el mes
+siguiente; los meses abiertos (el mes en curso) se vuelven a consultar y sus
+filas se reemplazan en el consolidado.
+
+Uso:
+    from src.utils.incremental import WatermarkStore, merge_delta
+
+    store = WatermarkStore("state/watermarks.json")
+    start = store.next_month("CLI001", "2025|F", default=1)
+    ...  # exportar meses start..month_to
+    merge_delta("consolidated/CLI001.csv", delta_path, "Mes en que es factura", range(start, 11))
+    store.update("CLI001", "2025|F", year=2025, month_to=10)
+"""
+
+import csv
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime
+
+from src.utils.export_splitter import read_export_rows, find_column
+
+logger = logging.getLogger("SAP_Automation")
+
+
+def last_closed_month(year, today=None):
+    """Último mes cerrado de `year` a fecha de hoy (0 si ninguno, 12 si el año ya terminó)."""
+    today = today or date.today()
+    if year < today.year:
+        return 12
+    if year > today.year:
+        return 0
+    return today.month - 1
+
+
+class WatermarkStore:
+    """Marcas de agua persistidas en un archivo JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read watermarks {path}, starting empty: {e}")
+
+    @staticmethod
+    def _key(client, profile):
+        return f"{client}|{profile}"
+
+    def get(self, client, profile):
+        """Devuelve la marca de agua del cliente/perfil (dict) o None."""
+        return self._data.get(self._key(client, profile))
+
+    def next_month(self, client, profile, default):
+        """Primer mes que hay que consultar: el siguiente al último cerrado exportado."""
+        wm = self.get(client, profile)
+        if not wm:
+            return default
+        return max(default, wm["complete_through"] + 1)
+
+    def update(self, client, profile, year, month_to, today=None):
+        """
+        Registra una exportación correcta hasta `month_to`.
+
+        Solo avanza hasta el último mes cerrado: el mes en curso se volverá a pedir.
+        """
+        complete = min(month_to, last_closed_month(year, today))
+        with self._lock:
+            key = self._key(client, profile)
+            previous = self._data.get(key, {}).get("complete_through", 0)
+            self._data[key] = {
+                "complete_through": max(previous, complete),
+                "last_month_exported": month_to,
+                "updated": datetime.now().isoformat(),
+            }
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def _month_of(value):
+    try:
+        return int(float(str(value).strip()))
+    except ValueError:
+        return None
+
+
+def merge_delta(consolidated_path, delta_path, month_column, months, encoding="latin-1", delimiter=","):
+    """
+    Fusiona un delta en el dataset consolidado de un cliente, en streaming.
+
+    Las filas del consolidado cuyos meses están en `months` se descartan (el
+    delta las trae actualizadas) y a continuación se añaden las filas del delta.
+
+    Args:
+        consolidated_path: CSV consolidado del cliente (se crea si no existe)
+        delta_path: CSV exportado con los meses consultados
+        month_column: Columna del mes (nombre o lista de candidatos)
+        months: Meses consultados en el delta
+
+    Returns:
+        int: Filas añadidas desde el delta
+    """
+    months = set(months)
+    tmp_path = consolidated_path + ".tmp"
+    added = 0
+
+    with open(delta_path, "r", encoding=encoding, newline="") as f_delta:
+        delta_header, delta_rows = read_export_rows(f_delta, delimiter)
+        if not delta_header:
+            delta_header, delta_rows = None, iter(())
+
+        with open(tmp_path, "w", encoding=encoding, newline="") as f_out:
+            writer = csv.writer(f_out, delimiter=delimiter)
+            header = None
+
+            if os.path.exists(consolidated_path):
+                with open(consolidated_path, "r", encoding=encoding, newline="") as f_old:
+                    header, old_rows = read_export_rows(f_old, delimiter)
+                    if header:
+                        if delta_header and delta_header != header:
+                            raise ValueError(f"Delta columns differ from consolidated dataset {consolidated_path}")
+                        idx = find_column(header, month_column)
+                        if idx is None:
+                            raise KeyError(f"Column {month_column} not found in {consolidated_path}")
+                        writer.writerow(header)
+                        for row in old_rows:
+                            if _month_of(row[idx] if idx < len(row) else "") not in months:
+                                writer.writerow(row)
+
+            if delta_header:
+                if not header:
+                    writer.writerow(delta_header)
+                for row in delta_rows:
+                    writer.writerow(row)
+                    added += 1
+
+    os.replace(tmp_path, consolidated_path)
+    return added
@@ -0,0 +1,302 @@
+"""
+Parquet Store
+=============
+Almacén columnar de los datos de facturación exportados.
+
+Cada export (`EXPORT_CLIENT_<código>_<año>M..._<ts>.csv`, o cualquier export
+con columna de cliente) se convierte en un dataset Parquet particionado por
+cliente, año y mes (`client=<c>/year=<a>/month=<m>/data.parquet`), con
+columnas tipadas: meses como int8, importes como float64 y códigos
+(cliente, CECO, status...) codificados como diccionario, todo comprimido.
+
+Un export de un cliente contiene todas las filas de los meses consultados, así
+que la ingesta reemplaza las particiones que toca: reexportar un mes no
+duplica filas.
+
+`query` lee solo las particiones y columnas pedidas, de modo que los
+consumidores (ej: el regularizador) leen megabytes en lugar de volver a
+parsear todo el CSV latin-1.
+
+Uso:
+    from src.utils.parquet_store import ParquetStore
+
+    store = ParquetStore("store/facturacion")
+    store.ingest("exports/EXPORT_CLIENT_CLI001_2025M01-10_20251128_090000.csv")
+    df = store.query(columns=["UT Fact.", "Mes en que es factura"], clients=["CLI001"],
+                     years=[2025], months=range(1, 7))
+
+    python -m src.utils.parquet_store ingest exports/*.csv
+    python -m src.utils.parquet_store query --client CLI001 --year 2025 --month 3 --column "UT Fact."
+"""
+
+import argparse
+import glob
+import logging
+import os
+import re
+import sys
+from collections import defaultdict
+
+from src.utils.export_splitter import read_export_rows, find_column, export_delimiter
+
+logger = logging.getLogger("SAP_Automation")
+
+# pyarrow es opcional: solo se necesita para el almacén Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logger.debug("pyarrow module not available. Parquet store disabled.")
+
+# EXPORT_CLIENT_<cliente>_<año>M<mm>-<mm>_<fecha>_<hora>.<ext>
+EXPORT_NAME_RE = re.compile(r"^EXPORT_CLIENT_(?P<client>.+?)_(?P<year>\d{4})M\d{2}-\d{2}_")
+
+# Tipos por columna (títulos del export de ZTSD_FACTURACION y del ALV simulado)
+DEFAULT_TYPES = {
+    "Mes en que es factura": "int8",
+    "MES": "int8",
+    "Any": "int16",
+    "GJAHR": "int16",
+    "Preu unitari: Calculat per les taules de": "float64",
+    "Import": "float64",
+    "NETWR": "float64",
+    "Client": "dictionary",
+    "KUNNR": "dictionary",
+    "UT Fact.": "dictionary",
+    "Status": "dictionary",
+    "STATUS": "dictionary",
+}
+
+PARTITION_FIELDS = ("client", "year", "month")
+
+
+def _arrow_type(name):
+    if name == "dictionary":
+        return pa.dictionary(pa.int32(), pa.string())
+    return getattr(pa, name)()
+
+
+def _parse(value, type_name):
+    """Convierte un valor de texto del export al tipo de la columna (None si no es válido)."""
+    value = value.strip()
+    if type_name in ("dictionary", "string"):
+        return value
+    if not value:
+        return None
+    try:
+        if type_name.startswith("int"):
+            return int(float(value))
+        return float(value)
+    except ValueError:
+        return None
+
+
+class ParquetStore:
+    """Dataset Parquet particionado por cliente/año/mes."""
+
+    def __init__(self, root, types=None, compression="zstd", client_column=None, year_column=None,
+                 month_column=None, delimiter=",", encoding="latin-1"):
+        """
+        Args:
+            root: Carpeta raíz del dataset
+            types: Tipos por columna (int8/int16/int32/int64/float64/dictionary/string); el resto, string
+            compression: Códec Parquet (zstd, snappy, gzip...)
+            client_column: Columnas candidatas con el código de cliente
+            year_column: Columnas candidatas con el año
+            month_column: Columnas candidatas con el mes de facturación
+            delimiter: Separador de los exports
+            encoding: Codificación de los exports
+        """
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Parquet store requires pyarrow. Install with: pip install pyarrow")
+        self.root = root
+        self.types = dict(DEFAULT_TYPES, **(types or {}))
+        self.compression = compression
+        self.client_column = client_column or ["Client", "KUNNR"]
+        self.year_column = year_column or ["Any", "GJAHR"]
+        self.month_column = month_column or ["Mes en que es factura", "MES"]
+        self.delimiter = delimiter
+        self.encoding = encoding
+
+    @classmethod
+    def from_config(cls, config):
+        """Crea el almacén desde la sección `parquet_store` (columnas de cliente/mes de `batch`/`incremental`)."""
+        config = config or {}
+        cfg = config.get('parquet_store', {}) or {}
+        return cls(
+            cfg.get('root', 'store/facturacion'),
+            types=cfg.get('types'),
+            compression=cfg.get('compression', 'zstd'),
+            client_column=config.get('batch', {}).get('client_column'),
+            year_column=cfg.get('year_column'),
+            month_column=config.get('incremental', {}).get('month_column'),
+            delimiter=export_delimiter(config, 'parquet_store'),
+            encoding=cfg.get('encoding', "latin-1"),
+        )
+
+    def ingest(self, path, client=None, year=None):
+        """
+        Convierte un export en particiones del dataset (reemplaza las que ya existían).
+
+        El cliente y el año se toman de sus columnas o, si no están, del nombre
+        del archivo (`EXPORT_CLIENT_<cliente>_<año>M...`) o de los argumentos.
+
+        Args:
+            path: Archivo exportado
+            client: Cliente por defecto
+            year: Año por defecto
+
+        Returns:
+            int: Filas ingeridas
+        """
+        match = EXPORT_NAME_RE.match(os.path.basename(path))
+        if match:
+            client = client or match.group("client")
+            year = year or int(match.group("year"))
+
+        with open(path, "r", encoding=self.encoding, newline="") as f:
+            header, rows = read_export_rows(f, self.delimiter)
+            if not header:
+                logger.warning(f"Parquet store: {path} is empty")
+                return 0
+            idx_client = find_column(header, self.client_column)
+            idx_year = find_column(header, self.year_column)
+            idx_month = find_column(header, self.month_column)
+            if idx_month is None:
+                raise KeyError(f"Month column {self.month_column} not found in {path}. Available: {header}")
+
+            partitions = defaultdict(list)
+            for row in rows:
+                row = row + [""] * (len(header) - len(row))
+                key = (
+                    row[idx_client].strip() if idx_client is not None else client,
+                    _parse(row[idx_year], "int16") if idx_year is not None else year,
+                    _parse(row[idx_month], "int8"),
+                )
+                if None in key or not key[0]:
+                    raise ValueError(f"Row without client/year/month in {path}: {row}")
+                partitions[key].append(row)
+
+        schema = pa.schema([(name, _arrow_type(self.types.get(name, "string"))) for name in header])
+        total = 0
+        for (p_client, p_year, p_month), p_rows in partitions.items():
+            columns = {
+                name: [_parse(r[i], self.types.get(name, "string")) for r in p_rows]
+                for i, name in enumerate(header)
+            }
+            table = pa.table(columns, schema=schema)
+            self._write_partition(p_client, p_year, p_month, table)
+            total += len(p_rows)
+
+        logger.info(f"Parquet store: {total} rows from {os.path.basename(path)} "
+                    f"into {len(partitions)} partitions")
+        return total
+
+    def _write_partition(self, client, year, month, table):
+        directory = os.path.join(self.root, f"client={client}", f"year={year}", f"month={month}")
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, "data.parquet")
+        tmp = target + ".tmp"
+        pq.write_table(table, tmp, compression=self.compression)
+        os.replace(tmp, target)
+
+    def dataset(self):
+        """Dataset de pyarrow con las particiones client/year/month."""
+        partitioning = ds.partitioning(
+            pa.schema([("client", pa.string()), ("year", pa.int16()), ("month", pa.int8())]), flavor="hive")
+        return ds.dataset(self.root, format="parquet", partitioning=partitioning)
+
+    def query(self, columns=None, clients=None, years=None, months=None, as_pandas=True):
+        """
+        Lee solo las particiones y columnas pedidas.
+
+        Args:
+            columns: Columnas a leer (None = todas); admite también client/year/month
+            clients: Clientes (None = todos)
+            years: Años (None = todos)
+            months: Meses (None = todos)
+            as_pandas: Devolver un DataFrame (si no, una pyarrow.Table)
+
+        Returns:
+            DataFrame o pyarrow.Table
+        """
+        if not os.path.isdir(self.root):
+            raise FileNotFoundError(f"Parquet store not found: {self.root}")
+        expression = None
+        for field, values in (("client", clients), ("year", years), ("month", months)):
+            if values is None:
+                continue
+            values = [str(v) for v in values] if field == "client" else [int(v) for v in values]
+            condition = ds.field(field).isin(values)
+            expression = condition if expression is None else expression & condition
+        table = self.dataset().to_table(columns=list(columns) if columns else None, filter=expression)
+        return table.to_pandas() if as_pandas else table
+
+    def partitions(self):
+        """Lista de (cliente, año, mes) presentes en el almacén."""
+        found = []
+        for path in glob.glob(os.path.join(self.root, "client=*", "year=*", "month=*", "data.parquet")):
+            parts = dict(p.split("=", 1) for p in os.path.relpath(os.path.dirname(path), self.root).split(os.sep))
+            found.append((parts["client"], int(parts["year"]), int(parts["month"])))
+        return sorted(found)
+
+
+def ingest_stage(store):
+    """Etapa de `ExportPipeline`: ingiere cada export en el almacén Parquet."""
+    def stage(item):
+        item.result["store_rows"] = store.ingest(item.path)
+    return stage
+
+
+def main(argv=None):
+    import yaml
+
+    parser = argparse.ArgumentParser(description="Columnar Parquet store for exported invoice data")
+    parser.add_argument("--config", default="config/settings.yaml", help="Path to settings YAML file")
+    parser.add_argument("--root", help="Dataset root (default: parquet_store.root)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ingest = sub.add_parser("ingest", help="Ingest export files (glob patterns accepted)")
+    p_ingest.add_argument("paths", nargs="+")
+
+    p_query = sub.add_parser("query", help="Read selected partitions/columns")
+    p_query.add_argument("--client", action="append", help="Client code (repeatable)")
+    p_query.add_argument("--year", action="append", type=int, help="Year (repeatable)")
+    p_query.add_argument("--month", action="append", type=int, help="Month (repeatable)")
+    p_query.add_argument("--column", action="append", help="Column to read (repeatable)")
+    p_query.add_argument("--output", help="Write the result to this CSV instead of printing it")
+
+    sub.add_parser("partitions", help="List client/year/month partitions")
+    args = parser.parse_args(argv)
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    if args.root:
+        config.setdefault('parquet_store', {})['root'] = args.root
+    store = ParquetStore.from_config(config)
+
+    if args.command == "ingest":
+        paths = [p for pattern in args.paths for p in sorted(glob.glob(pattern))]
+        total = sum(store.ingest(p) for p in paths)
+        print(f"{total} rows from {len(paths)} files -> {store.root}")
+    elif args.command == "partitions":
+        for client, year, month in store.partitions():
+            print(f"{client}\t{year}\t{month:02d}")
+    else:
+        df = store.query(columns=args.column, clients=args.client, years=args.year, months=args.month)
+        if args.output:
+            df.to_csv(args.output, index=False)
+            print(f"{len(df)} rows -> {args.output}")
+        else:
+            print(df.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
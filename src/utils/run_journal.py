@@ -0,0 +1,110 @@
+"""
+Run Journal
+===========
+Diario de exportaciones en formato JSONL (una línea por cliente terminado).
+
+Cada línea registra el cliente, el estado, el archivo generado, las filas y la
+duración, junto con una clave del conjunto de filtros. El archivo solo se
+amplía (append-only) y se vuelca a disco tras cada línea, de modo que si el
+proceso se interrumpe, un nuevo lanzamiento con `--resume` puede saltarse los
+clientes ya exportados con los mismos filtros.
+
+Uso:
+    from src.utils.run_journal import RunJournal
+
+    journal = RunJournal("logs/export_journal.jsonl")
+    key = RunJournal.filter_key({"year": 2025, "status": "F"})
+    done = journal.completed(key)
+    journal.record(key, "CLI001", True, output="exports/x.csv", rows=120, duration=4.2)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+logger = logging.getLogger("SAP_Automation")
+
+
+class RunJournal:
+    """Diario append-only de resultados por cliente."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def filter_key(filters):
+        """
+        Clave estable de un conjunto de filtros (independiente del orden y de tipos str/int).
+        """
+        normalized = json.dumps({str(k): filters[k] for k in filters}, sort_keys=True, default=str)
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+    def record(self, filter_key, client, success, output=None, rows=None, duration=None, error=None,
+               filters=None):
+        """
+        Añade una línea al diario y la vuelca a disco.
+
+        Args:
+            filter_key: Clave del conjunto de filtros (filter_key())
+            client: Código del cliente
+            success: True si la exportación terminó bien
+            output: Ruta del archivo generado
+            rows: Filas exportadas (si se conocen)
+            duration: Segundos empleados
+            error: Mensaje de error
+            filters: Filtros legibles (opcional, solo informativo)
+        """
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "filter_key": filter_key,
+            "client": client,
+            "status": "success" if success else "failed",
+            "output": output,
+            "rows": rows,
+            "duration": round(duration, 3) if duration is not None else None,
+        }
+        if error:
+            entry["error"] = error
+        if filters is not None:
+            entry["filters"] = filters
+
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def entries(self):
+        """Itera las entradas del diario (ignora líneas corruptas, ej: corte a mitad de escritura)."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_num, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Journal {self.path}: ignoring corrupt line {line_num}")
+
+    def completed(self, filter_key):
+        """
+        Devuelve los clientes cuya última entrada con `filter_key` fue exitosa.
+
+        Returns:
+            dict: cliente -> entrada del diario
+        """
+        last = {}
+        for entry in self.entries():
+            if entry.get("filter_key") == filter_key:
+                last[entry.get("client")] = entry
+        return {client: entry for client, entry in last.items() if entry.get("status") == "success"}
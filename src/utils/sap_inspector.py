@@ -10,23 +10,30 @@ Uso como módulo:
     from src.utils.sap_inspector import inspect_window, export_structure
 """
 
-import win32com.client
 import json
 import sys
 import argparse
 from typing import Optional, Dict, List, Any
 import logging
 
+# win32com solo existe en Windows; con --simulate se inspecciona el motor simulado
+try:
+    import win32com.client
+    WIN32COM_AVAILABLE = True
+except ImportError:
+    WIN32COM_AVAILABLE = False
+
 logger = logging.getLogger("SAP_Inspector")
 
 
-def get_session(connection_index: int = 0, session_index: int = 0):
+def get_session(connection_index: int = 0, session_index: int = 0, sap_gui_auto=None):
     """
     Conecta a una sesión SAP GUI concreta.
     
     Args:
         connection_index: Índice de la conexión SAP (default: 0)
         session_index: Índice de la sesión (default: 0)
+        sap_gui_auto: Objeto SAPGUI alternativo (ej: FakeSapGui); por defecto el de SAP Logon
         
     Returns:
         Sesión SAP GUI
@@ -35,7 +42,10 @@ def get_session(connection_index: int = 0, session_index: int = 0):
         RuntimeError: Si no hay conexiones o sesiones abiertas
         IndexError: Si los índices están fuera de rango
     """
-    sap_gui_auto = win32com.client.GetObject("SAPGUI")
+    if sap_gui_auto is None:
+        if not WIN32COM_AVAILABLE:
+            raise RuntimeError("pywin32 no está instalado: SAP GUI Scripting requiere Windows")
+        sap_gui_auto = win32com.client.GetObject("SAPGUI")
     app = sap_gui_auto.GetScriptingEngine
 
     if app.Children.Count == 0:
@@ -333,6 +343,8 @@ Ejemplos:
     parser.add_argument("--window-id", "-w", type=str, default="wnd[0]", 
                         help="ID de ventana a inspeccionar (default: wnd[0])")
     parser.add_argument("--max-depth", "-d", type=int, help="Profundidad máxima del árbol")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Inspeccionar el motor SAP simulado (src/utils/fake_sap.py) en lugar de SAP GUI")
     
     args = parser.parse_args()
     
@@ -341,7 +353,11 @@ Ejemplos:
     
     try:
         # Conectar a SAP
-        session = get_session()
+        if args.simulate:
+            from src.utils.fake_sap import FakeSapGui
+            session = get_session(sap_gui_auto=FakeSapGui())
+        else:
+            session = get_session()
         logger.info(f"Conectado a: {session.Info.SystemName} Mandante: {session.Info.Client}")
         
         # Inspeccionar ventana
@@ -0,0 +1,213 @@
+"""
+Step Tracing
+============
+Trazas de latencia por paso de la exportación (navegar, filtros, ejecutar,
+ALV, diálogos, popup de seguridad, Excel...).
+
+Cada paso medido se escribe como una línea JSON en el archivo de trazas con
+el id de ejecución, el cliente, el paso y su duración. El informe agrupa las
+trazas de una ejecución y calcula p50/p95/máximo por paso, para saber qué
+esperas merece la pena eliminar.
+
+Uso:
+    from src.utils.tracing import Tracer
+
+    tracer = Tracer("logs/trace.jsonl")
+    with tracer.context(client="CLI001"):
+        with tracer.span("execute"):
+            ...
+
+    python -m src.utils.tracing logs/trace.jsonl            # última ejecución
+    python -m src.utils.tracing logs/trace.jsonl --run-id 20250101_120000-1234
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger("SAP_Automation")
+
+# Orden de los pasos en el informe (los desconocidos van al final)
+STEP_ORDER = (
+    "total", "cache_fetch", "navigate", "apply_filters", "multiple_selection", "execute",
+    "alv_lookup", "grid_read", "export_dialog", "save_dialog", "security_popup",
+    "export_file", "excel_close", "back", "split",
+    "validate", "normalize", "convert", "warehouse", "register",
+)
+
+
+class Tracer:
+    """Escritor de trazas por paso; sin `path` no escribe nada (coste casi nulo)."""
+
+    def __init__(self, path=None, run_id=None):
+        """
+        Args:
+            path: Archivo JSONL de trazas (None = trazas desactivadas)
+            run_id: Identificador de la ejecución (por defecto fecha-hora y pid)
+        """
+        self.path = path
+        self.run_id = run_id or f"{datetime.now():%Y%m%d_%H%M%S}-{os.getpid()}"
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config, enabled=None, run_id=None):
+        """Crea el tracer desde la sección `tracing` (`enabled` fuerza la activación)."""
+        tracing_cfg = (config or {}).get('tracing', {}) or {}
+        if enabled is None:
+            enabled = tracing_cfg.get('enabled', False)
+        return cls(tracing_cfg.get('path', 'logs/trace.jsonl') if enabled else None, run_id=run_id)
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    @contextmanager
+    def context(self, **fields):
+        """Añade campos (ej: client) a todas las trazas del hilo dentro del bloque."""
+        previous = getattr(self._local, "fields", {})
+        self._local.fields = {**previous, **fields}
+        try:
+            yield
+        finally:
+            self._local.fields = previous
+
+    @contextmanager
+    def span(self, step, **fields):
+        """Mide el bloque como el paso `step`; si lanza una excepción la traza queda como error."""
+        if not self.path:
+            yield
+            return
+
+        started_at = time.time()
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self._write({
+                "run_id": self.run_id,
+                **getattr(self._local, "fields", {}),
+                **fields,
+                "step": step,
+                "start": round(started_at, 6),
+                "duration": round(time.perf_counter() - started, 6),
+                "status": status,
+                "thread": threading.current_thread().name,
+            })
+
+    def _write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def read_spans(path, run_id=None):
+    """
+    Lee las trazas de un archivo. Sin `run_id` devuelve las de la última ejecución.
+
+    Returns:
+        tuple: (run_id, lista de trazas)
+    """
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    if not spans:
+        return run_id, []
+    if run_id is None:
+        run_id = spans[-1].get("run_id")
+    return run_id, [s for s in spans if s.get("run_id") == run_id]
+
+
+def _percentile(sorted_values, pct):
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(spans):
+    """
+    Estadísticas por paso.
+
+    Returns:
+        dict: paso -> {count, errors, p50, p95, max, total}
+    """
+    by_step = {}
+    for span in spans:
+        by_step.setdefault(span["step"], []).append(span)
+
+    order = {step: i for i, step in enumerate(STEP_ORDER)}
+    stats = {}
+    for step in sorted(by_step, key=lambda s: (order.get(s, len(order)), s)):
+        durations = sorted(s["duration"] for s in by_step[step])
+        stats[step] = {
+            "count": len(durations),
+            "errors": sum(1 for s in by_step[step] if s.get("status") != "ok"),
+            "p50": _percentile(durations, 50),
+            "p95": _percentile(durations, 95),
+            "max": durations[-1],
+            "total": sum(durations),
+        }
+    return stats
+
+
+def format_report(run_id, stats):
+    """Tabla de texto con las estadísticas por paso."""
+    lines = [
+        f"Run: {run_id}",
+        f"{'step':<20}{'count':>7}{'errors':>8}{'p50 (s)':>10}{'p95 (s)':>10}{'max (s)':>10}{'total (s)':>11}",
+    ]
+    for step, s in stats.items():
+        lines.append(f"{step:<20}{s['count']:>7}{s['errors']:>8}{s['p50']:>10.3f}{s['p95']:>10.3f}"
+                     f"{s['max']:>10.3f}{s['total']:>11.3f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Informe de latencia por paso (p50/p95/max)")
+    parser.add_argument("path", nargs="?", default="logs/trace.jsonl", help="Archivo de trazas JSONL")
+    parser.add_argument("--run-id", help="Ejecución a analizar (por defecto la última)")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"Trace file not found: {args.path}", file=sys.stderr)
+        return 1
+
+    run_id, spans = read_spans(args.path, args.run_id)
+    if not spans:
+        print(f"No spans found in {args.path}" + (f" for run {run_id}" if run_id else ""), file=sys.stderr)
+        return 1
+
+    stats = summarize(spans)
+    if args.json:
+        print(json.dumps({"run_id": run_id, "steps": stats}, indent=2))
+    else:
+        print(format_report(run_id, stats))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
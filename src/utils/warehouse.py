@@ -0,0 +1,341 @@
+"""
+Invoice Warehouse
+=================
+Base de datos SQLite local con las filas de facturación de los exports.
+
+Cada export se carga en bloque en la tabla `invoices` con columnas indexadas
+(cliente, número de factura `S_NUM_F`, año, mes de facturación y status) y la
+fila completa como JSON en `data`. La clave es (factura, línea): la línea es
+la columna de posición si el export la tiene o, si no, el orden de la fila
+dentro de su factura. Volver a cargar un export reemplaza las facturas que
+contiene: en la misma transacción se borran sus filas anteriores y se
+insertan las del archivo, de modo que las líneas que ya no vienen en SAP
+desaparecen en lugar de quedar huérfanas.
+
+Preguntas como "facturas del cliente X en el mes Y" se resuelven con los
+índices en milisegundos en lugar de recorrer los CSV.
+
+Uso:
+    from src.utils.warehouse import Warehouse
+
+    with Warehouse("store/warehouse.sqlite") as wh:
+        wh.load("exports/EXPORT_CLIENT_CLI001_2025M01-10_20251128_090000.csv")
+        rows = wh.invoices(client="CLI001", year=2025, month=3)
+
+    python -m src.utils.warehouse load "exports/EXPORT_CLIENT_*.csv"
+    python -m src.utils.warehouse invoices --client CLI001 --year 2025 --month 3
+    python -m src.utils.warehouse sql "SELECT client, COUNT(*) FROM invoices GROUP BY client"
+"""
+
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from src.utils.export_splitter import read_export_rows, find_column, export_delimiter
+
+logger = logging.getLogger("SAP_Automation")
+
+# EXPORT_CLIENT_<cliente>_<año>M<mm>-<mm>_<fecha>_<hora>.<ext>
+EXPORT_NAME_RE = re.compile(r"^EXPORT_CLIENT_(?P<client>.+?)_(?P<year>\d{4})M\d{2}-\d{2}_")
+
+# Columnas candidatas del export (títulos de ZTSD_FACTURACION y del ALV simulado)
+DEFAULT_COLUMNS = {
+    "client": ["Client", "KUNNR"],
+    "invoice": ["Núm. factura", "Factura", "VBELN", "S_NUM_F"],
+    "line": ["Posició", "POSNR"],
+    "year": ["Any", "GJAHR"],
+    "month": ["Mes en que es factura", "MES"],
+    "status": ["Status", "STATUS"],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    invoice   TEXT    NOT NULL,
+    line      INTEGER NOT NULL,
+    client    TEXT,
+    year      INTEGER,
+    month     INTEGER,
+    status    TEXT,
+    data      TEXT    NOT NULL,
+    source    TEXT,
+    loaded_at TEXT,
+    PRIMARY KEY (invoice, line)
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_client_period ON invoices (client, year, month);
+CREATE INDEX IF NOT EXISTS idx_invoices_period ON invoices (year, month);
+CREATE INDEX IF NOT EXISTS idx_invoices_status ON invoices (status);
+"""
+
+# Tabla temporal de la conexión: las filas del archivo se cargan aquí antes de reemplazar sus facturas
+STAGING = """
+CREATE TEMP TABLE IF NOT EXISTS staging (
+    invoice TEXT, line INTEGER, client TEXT, year INTEGER, month INTEGER,
+    status TEXT, data TEXT, source TEXT, loaded_at TEXT
+);
+"""
+
+STAGE = """
+INSERT INTO staging (invoice, line, client, year, month, status, data, source, loaded_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+REPLACE_INVOICES = "DELETE FROM invoices WHERE invoice IN (SELECT invoice FROM staging)"
+
+# Si el archivo repite (factura, línea), gana la última fila
+INSERT_STAGED = """
+INSERT INTO invoices (invoice, line, client, year, month, status, data, source, loaded_at)
+SELECT invoice, line, client, year, month, status, data, source, loaded_at FROM staging WHERE true ORDER BY rowid
+ON CONFLICT (invoice, line) DO UPDATE SET
+    client = excluded.client, year = excluded.year, month = excluded.month,
+    status = excluded.status, data = excluded.data, source = excluded.source,
+    loaded_at = excluded.loaded_at
+"""
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class Warehouse:
+    """Almacén SQLite de filas de facturación indexado por cliente, factura, periodo y status."""
+
+    def __init__(self, path, columns=None, delimiter=",", encoding="latin-1"):
+        """
+        Args:
+            path: Archivo SQLite (se crea si no existe)
+            columns: Columnas candidatas por campo indexado (client, invoice, line, year, month, status)
+            delimiter: Separador de los exports
+            encoding: Codificación de los exports
+        """
+        self.path = path
+        self.columns = dict(DEFAULT_COLUMNS, **(columns or {}))
+        self.delimiter = delimiter
+        self.encoding = encoding
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Una conexión compartida (ej: hilos de ExportPipeline), serializada con un lock
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.executescript(STAGING)
+
+    @classmethod
+    def from_config(cls, config):
+        """Crea el almacén desde la sección `warehouse`."""
+        config = config or {}
+        cfg = config.get('warehouse', {}) or {}
+        return cls(
+            cfg.get('path', 'store/warehouse.sqlite'),
+            columns=cfg.get('columns'),
+            delimiter=export_delimiter(config, 'warehouse'),
+            encoding=cfg.get('encoding', "latin-1"),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def load(self, path, client=None, year=None):
+        """
+        Carga un export en bloque (una transacción) reemplazando sus facturas.
+
+        El cliente y el año se toman de sus columnas o, si no están, del nombre
+        del archivo (`EXPORT_CLIENT_<cliente>_<año>M...`) o de los argumentos.
+
+        Returns:
+            int: Filas cargadas
+
+        Raises:
+            KeyError: Si el export no tiene columna de número de factura
+            ValueError: Si una fila tiene la posición vacía o no numérica (no se carga nada)
+        """
+        match = EXPORT_NAME_RE.match(os.path.basename(path))
+        if match:
+            client = client or match.group("client")
+            year = year or int(match.group("year"))
+
+        started = time.monotonic()
+        loaded_at = datetime.now().isoformat(timespec="seconds")
+        source = os.path.basename(path)
+        with open(path, "r", encoding=self.encoding, newline="") as f:
+            header, rows = read_export_rows(f, self.delimiter)
+            if not header:
+                logger.warning(f"Warehouse: {path} is empty")
+                return 0
+            idx = {field: find_column(header, candidates) for field, candidates in self.columns.items()}
+            if idx["invoice"] is None:
+                raise KeyError(f"Invoice column {self.columns['invoice']} not found in {path}. Available: {header}")
+
+            ordinals = {}
+
+            def records():
+                for row in rows:
+                    row = row + [""] * (len(header) - len(row))
+                    value = lambda field: row[idx[field]].strip() if idx[field] is not None else None
+                    invoice = value("invoice")
+                    if idx["line"] is not None:
+                        line = _int(value("line"))
+                        if line is None:
+                            raise ValueError(f"Invalid position {value('line')!r} for invoice {invoice} in {path}")
+                    else:
+                        line = ordinals[invoice] = ordinals.get(invoice, 0) + 1
+                    yield (
+                        invoice, line,
+                        value("client") or client,
+                        _int(value("year")) if idx["year"] is not None else year,
+                        _int(value("month")),
+                        value("status"),
+                        json.dumps(dict(zip(header, row)), ensure_ascii=False),
+                        source, loaded_at,
+                    )
+
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM staging")
+                self.conn.executemany(STAGE, records())
+                self.conn.execute(REPLACE_INVOICES)
+                count = self.conn.execute(INSERT_STAGED).rowcount
+                self.conn.execute("DELETE FROM staging")
+
+        logger.info(f"Warehouse: {count} rows from {source} in {time.monotonic() - started:.2f}s")
+        return count
+
+    def invoices(self, client=None, invoice=None, year=None, month=None, status=None, limit=None):
+        """
+        Filas de factura que cumplen los filtros indicados (None = sin filtro).
+
+        Returns:
+            list: dicts con las columnas indexadas más la fila original en `data`
+        """
+        conditions, params = [], []
+        for column, value in (("client", client), ("invoice", invoice), ("year", year),
+                              ("month", month), ("status", status)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT * FROM invoices"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY client, year, month, invoice, line"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            fetched = self.conn.execute(sql, params).fetchall()
+        result = []
+        for row in fetched:
+            entry = dict(row)
+            entry["data"] = json.loads(entry["data"])
+            result.append(entry)
+        return result
+
+    def query(self, sql, params=()):
+        """
+        Consulta SQL libre. Las columnas del export se leen con
+        `json_extract(data, '$."UT Fact."')`.
+
+        Returns:
+            tuple: (nombres de columna, lista de filas)
+        """
+        with self._lock:
+            cursor = self.conn.execute(sql, params)
+            names = [d[0] for d in cursor.description or ()]
+            return names, [tuple(r) for r in cursor.fetchall()]
+
+
+def load_stage(warehouse):
+    """Etapa de `ExportPipeline`: carga cada export en el almacén."""
+    def stage(item):
+        item.result["warehouse_rows"] = warehouse.load(item.path)
+    return stage
+
+
+def _print_rows(names, rows, output=None):
+    f = open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+    try:
+        writer = csv.writer(f, delimiter="\t" if not output else ",")
+        writer.writerow(names)
+        writer.writerows(rows)
+    finally:
+        if output:
+            f.close()
+
+
+def main(argv=None):
+    import yaml
+
+    parser = argparse.ArgumentParser(description="Local SQLite warehouse over invoice exports")
+    parser.add_argument("--config", default="config/settings.yaml", help="Path to settings YAML file")
+    parser.add_argument("--db", help="SQLite file (default: warehouse.path)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_load = sub.add_parser("load", help="Load export files (glob patterns accepted)")
+    p_load.add_argument("paths", nargs="+")
+
+    p_inv = sub.add_parser("invoices", help="Invoice rows by client/invoice/period/status")
+    p_inv.add_argument("--client")
+    p_inv.add_argument("--invoice")
+    p_inv.add_argument("--year", type=int)
+    p_inv.add_argument("--month", type=int)
+    p_inv.add_argument("--status")
+    p_inv.add_argument("--limit", type=int)
+    p_inv.add_argument("--output", help="Write CSV to this file instead of printing")
+
+    p_sql = sub.add_parser("sql", help="Run an ad-hoc SQL query")
+    p_sql.add_argument("statement")
+    p_sql.add_argument("--output", help="Write CSV to this file instead of printing")
+    args = parser.parse_args(argv)
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    if args.db:
+        config.setdefault('warehouse', {})['path'] = args.db
+
+    with Warehouse.from_config(config) as wh:
+        if args.command == "load":
+            paths = [p for pattern in args.paths for p in sorted(glob.glob(pattern))]
+            total = sum(wh.load(p) for p in paths)
+            print(f"{total} rows from {len(paths)} files -> {wh.path}")
+        elif args.command == "invoices":
+            started = time.perf_counter()
+            rows = wh.invoices(client=args.client, invoice=args.invoice, year=args.year, month=args.month,
+                               status=args.status, limit=args.limit)
+            elapsed = time.perf_counter() - started
+            header = list(rows[0]["data"]) if rows else []
+            _print_rows(["client", "year", "month", "status"] + header,
+                        [[r["client"], r["year"], r["month"], r["status"]] + [r["data"].get(h, "") for h in header]
+                         for r in rows], args.output)
+            print(f"{len(rows)} rows in {elapsed * 1000:.1f} ms", file=sys.stderr)
+        else:
+            started = time.perf_counter()
+            names, rows = wh.query(args.statement)
+            elapsed = time.perf_counter() - started
+            _print_rows(names, rows, args.output)
+            print(f"{len(rows)} rows in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
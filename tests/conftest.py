@@ -0,0 +1,49 @@
+"""
+Fixtures comunes: configuración apuntando a un directorio temporal y sesión
+SAP contra el motor simulado (src/utils/fake_sap.py).
+"""
+
+import copy
+import os
+
+import pytest
+import yaml
+
+from src.core.sap_connection import SAPConnection
+from src.utils.fake_sap import FakeSapGui, FakeScriptingEngine
+
+SETTINGS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "settings.yaml")
+
+with open(SETTINGS, "r", encoding="utf-8") as f:
+    _SETTINGS = yaml.safe_load(f)
+
+
+@pytest.fixture
+def config(tmp_path):
+    """settings.yaml con exports, diario, caché y marcas de agua en tmp_path y esperas cortas."""
+    cfg = copy.deepcopy(_SETTINGS)
+    export_dir = tmp_path / "exports"
+    export_dir.mkdir()
+    cfg["export"]["default_directory"] = str(export_dir)
+    cfg["journal"] = {"path": str(tmp_path / "journal.jsonl")}
+    cfg["cache"] = dict(cfg["cache"], directory=str(tmp_path / "cache"))
+    cfg["incremental"].update(watermarks_path=str(tmp_path / "watermarks.json"),
+                              consolidated_directory=str(tmp_path / "consolidated"))
+    cfg["batch"]["use_clipboard"] = False
+    cfg["timeouts"].update(wait_timeout=5, export_file_timeout=5, poll_interval=0.01, file_stable_for=0.05)
+    return cfg
+
+
+@pytest.fixture
+def engine():
+    return FakeScriptingEngine()
+
+
+@pytest.fixture
+def sap_conn(engine):
+    return SAPConnection(gui=FakeSapGui(engine))
+
+
+@pytest.fixture
+def session(sap_conn):
+    return sap_conn.connect()
@@ -0,0 +1,10 @@
+"""Utilidades de los tests: lectura de los CSV exportados por el motor simulado."""
+
+from src.utils.export_splitter import read_export_rows
+
+
+def read_export(path, delimiter=","):
+    """Cabecera y filas de un export SAP (BOM y comillas exteriores ya quitados)."""
+    with open(path, "r", encoding="latin-1", newline="") as f:
+        header, rows = read_export_rows(f, delimiter)
+        return header, list(rows)
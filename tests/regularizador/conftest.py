@@ -0,0 +1,16 @@
+"""Carpeta de trabajo del regularizador: dim_cecos.csv se lee del directorio actual."""
+
+import pytest
+
+from datos import DIM_CECOS
+
+
+@pytest.fixture
+def carpeta(tmp_path, monkeypatch):
+    """Directorio de trabajo con dim_cecos.csv y una subcarpeta `exports` para los CSV."""
+    (tmp_path / "dim_cecos.csv").write_text(DIM_CECOS, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    return exports
+
@@ -0,0 +1,19 @@
+"""Datos de prueba del regularizador: dim_cecos.csv y exports con el formato de SAP."""
+
+DIM_CECOS = """Codi,Centre de cost
+10,Direcció
+1000,Àrea A
+10000000,Servei A1
+"""
+
+COLUMNAS = ["UT Fact.", "Client", "Preu unitari: Calculat per les taules de", "Mes en que es factura", "Any"]
+
+
+def escribir_export(ruta, filas, entrecomillado=True, columnas=COLUMNAS):
+    """CSV con el formato de SAP: BOM y cada línea entrecomillada (o plano)."""
+    lineas = [",".join(columnas)] + [",".join(str(v) for v in fila) for fila in filas]
+    if entrecomillado:
+        contenido = b"\xef\xbb\xbf" + "".join(f'"{l}"\r\n' for l in lineas).encode("latin-1")
+    else:
+        contenido = "".join(l + "\n" for l in lineas).encode("latin-1")
+    ruta.write_bytes(contenido)
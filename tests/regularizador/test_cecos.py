@@ -0,0 +1,56 @@
+"""IndiceCecos: prefijo más largo y caché .npz."""
+
+import numpy as np
+import pandas as pd
+
+from cecos import IndiceCecos
+
+DIM_CECOS = """Codi,Centre de cost
+10,Direcció
+1000,Àrea A
+100000,
+10000000,Servei A1
+1000000C,Servei A1 bis
+"""
+
+
+def _indice(tmp_path, cache=True):
+    ruta = tmp_path / "dim_cecos.csv"
+    if not ruta.exists():
+        ruta.write_text(DIM_CECOS, encoding="utf-8")
+    return IndiceCecos.desde_csv(ruta, cache=cache)
+
+
+def test_resolver_prefijo_mas_largo(tmp_path):
+    nombres = _indice(tmp_path).resolver(["10000000", "1000000C", "10009999", "10999999", "99"])
+    assert nombres[:4].tolist() == ["Servei A1", "Servei A1 bis", "Àrea A", "Direcció"]
+    assert pd.isna(nombres[4])
+
+
+def test_cache_conserva_nombres_vacios(tmp_path):
+    sin_cache = _indice(tmp_path, cache=False)
+    _indice(tmp_path)
+    assert (tmp_path / "dim_cecos.npz").exists()
+    cacheado = _indice(tmp_path)
+
+    # El código 100000 existe sin nombre: NaN, no el texto "nan"
+    for indice in (sin_cache, cacheado):
+        (nombre,) = indice.resolver(["100000"])
+        assert nombre is not None and pd.isna(nombre)
+    assert cacheado.huella == sin_cache.huella
+    assert np.array_equal(cacheado.codigos, sin_cache.codigos)
+
+
+def test_resolver_ut(tmp_path):
+    ut = pd.Series([1000000.0, 100000, "10000000", None])
+    codigos, nombres = _indice(tmp_path).resolver_ut(ut)
+    assert codigos.tolist()[:3] == ["100000000", "10000000", "1000000000"]
+    assert nombres.tolist()[:3] == ["Servei A1", "Servei A1", "Servei A1"]
+
+
+def test_resolver_ut_sin_ceros_a_la_izquierda(tmp_path):
+    # Como al leer 'UT Fact.' como entero: "0100000" -> "100000" + "00"
+    ut = pd.Series(["0100000", "100000", "000", "0100000C"]).astype("category")
+    codigos, nombres = _indice(tmp_path).resolver_ut(ut)
+    assert codigos.tolist() == ["10000000", "10000000", "000", "0100000C00"]
+    assert nombres.tolist()[:2] == ["Servei A1", "Servei A1"]
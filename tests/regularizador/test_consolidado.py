@@ -0,0 +1,54 @@
+"""Resumen consolidado de main3: totales por archivo, streaming y agregados del manifiesto."""
+
+import pandas as pd
+import pytest
+
+import main3
+from datos import escribir_export
+from consolidado import NOMBRE
+
+FILAS_A = [("100000", "C1", "100.0", "3", "2025"), ("100000", "C1", "50.0", "3", "2025"),
+           ("1000", "C2", "20.0", "4", "2025")]
+FILAS_B = [("1000", "C2", "10.0", "4", "2025"), ("99", "C3", "5.0", "5", "2025")]   # 99: sin CECO
+
+
+def _hojas(carpeta):
+    return pd.read_excel(carpeta / NOMBRE, sheet_name=None)
+
+
+def _diff_detalle(carpeta, nombres):
+    return sum(pd.read_csv(carpeta / f"r_{n}_detalle.csv")["DIFF"].sum() for n in nombres)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_totales_cuadran_con_el_detalle(carpeta, streaming):
+    escribir_export(carpeta / "A.csv", FILAS_A)
+    escribir_export(carpeta / "B.csv", FILAS_B)
+
+    main3.procesar_xlsx(str(carpeta), streaming=streaming, chunksize=2, salida="csv", consolidar=True)
+
+    hojas = _hojas(carpeta)
+    por_archivo = hojas["Totales_Archivo"].set_index("archivo")
+    assert por_archivo.loc[["A.csv", "B.csv", "TOTAL"], "filas"].tolist() == [3, 2, 5]
+    assert por_archivo.loc["TOTAL", "DIFF"] == pytest.approx(_diff_detalle(carpeta, ["A", "B"]))
+
+    resumen = hojas["Resumen_Consolidado"]
+    fila_a = resumen[(resumen["archivo"] == "A.csv") & (resumen["codigo_ceco"] == 10000000)]
+    assert fila_a[["mes", "filas"]].values.tolist() == [[3, 2]]
+    # La fila sin CECO se conserva para que los totales cuadren
+    assert resumen[resumen["archivo"] == "B.csv"]["nombre_ceco"].isna().sum() == 1
+
+
+def test_archivos_sin_cambios_aportan_su_agregado(carpeta):
+    escribir_export(carpeta / "A.csv", FILAS_A)
+    escribir_export(carpeta / "B.csv", FILAS_B)
+    main3.procesar_xlsx(str(carpeta), salida="csv", consolidar=True)
+    antes = _hojas(carpeta)["Totales_Archivo"]
+
+    # Solo B cambia: A sale del agregado guardado en el manifiesto
+    escribir_export(carpeta / "B.csv", FILAS_B[:1])
+    main3.procesar_xlsx(str(carpeta), salida="csv", consolidar=True)
+    despues = _hojas(carpeta)["Totales_Archivo"].set_index("archivo")
+
+    assert despues.loc["A.csv", "DIFF"] == pytest.approx(antes.set_index("archivo").loc["A.csv", "DIFF"])
+    assert despues.loc[["A.csv", "B.csv", "TOTAL"], "filas"].tolist() == [3, 1, 4]
@@ -0,0 +1,30 @@
+"""main2: tasas por periodo con meses decimales, fuera de rango o vacíos."""
+
+import pandas as pd
+import pytest
+
+import main2
+from datos import escribir_export
+
+# Mes -> tasa de descuento esperada (Mes < 7: 0.0560, Mes >= 7: 0.0596, no numérico: 0)
+CASOS = [("3", 0.0560), ("6.5", 0.0560), ("7", 0.0596), ("15", 0.0596), ("0", 0.0560), ("", 0.0)]
+
+
+def test_tasas_como_comparaciones_originales(carpeta):
+    filas = [("100000", "C1", "100.0", mes, "2025") for mes, _ in CASOS]
+    escribir_export(carpeta / "EXPORT.csv", filas)
+
+    main2.procesar_xlsx(str(carpeta))
+
+    detalle = pd.read_excel(carpeta / "r_EXPORT.xlsx", sheet_name="Detalle_Procesado")
+    assert detalle["tasa_descuento"].tolist() == pytest.approx([t for _, t in CASOS])
+    assert detalle["tasa_incremento"].tolist() == pytest.approx([0.0696] * 5 + [0.0])
+
+
+def test_anio_vacio(carpeta):
+    escribir_export(carpeta / "EXPORT.csv", [("100000", "C1", "100.0", "8", "2025"), ("100000", "C1", "100.0", "8", "")])
+
+    main2.procesar_xlsx(str(carpeta))
+
+    detalle = pd.read_excel(carpeta / "r_EXPORT.xlsx", sheet_name="Detalle_Procesado")
+    assert detalle["tasa_descuento"].tolist() == pytest.approx([0.0596, 0.0596])
@@ -0,0 +1,37 @@
+"""main3: exports con año vacío en los modos en memoria, streaming y consolidado."""
+
+import pandas as pd
+import pytest
+
+import main3
+from datos import escribir_export
+
+FILAS = [
+    ("100000", "C1", "100.0", "3", "2025"),
+    ("100000", "C2", "50.0", "8", ""),      # año vacío
+    ("1000", "C1", "20.0", "", "2025"),     # mes vacío
+]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_anio_vacio(carpeta, streaming):
+    escribir_export(carpeta / "EXPORT.csv", FILAS)
+
+    main3.procesar_xlsx(str(carpeta), streaming=streaming, chunksize=2)
+
+    detalle = pd.read_excel(carpeta / "r_EXPORT.xlsx", sheet_name="Detalle_Procesado")
+    assert len(detalle) == 3
+    assert detalle["tasa_descuento"].tolist() == pytest.approx([0.0560, 0.0596, 0.0560])
+    assert detalle["nombre_ceco"].tolist() == ["Servei A1", "Servei A1", "Àrea A"]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_ut_con_ceros_a_la_izquierda(carpeta, streaming):
+    escribir_export(carpeta / "EXPORT.csv", [("0100000", "C1", "100.0", "3", "2025"),
+                                             ("100000", "C1", "100.0", "3", "2025")])
+
+    main3.procesar_xlsx(str(carpeta), streaming=streaming)
+
+    detalle = pd.read_excel(carpeta / "r_EXPORT.xlsx", sheet_name="Detalle_Procesado", dtype={"codigo_ceco": str})
+    assert detalle["codigo_ceco"].tolist() == ["10000000", "10000000"]
+    assert detalle["nombre_ceco"].tolist() == ["Servei A1", "Servei A1"]
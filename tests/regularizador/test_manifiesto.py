@@ -0,0 +1,68 @@
+"""Manifiesto: main3 omite los CSV sin cambios y reprocesa los que cambian."""
+
+import json
+import os
+
+import pytest
+
+import main3
+from datos import escribir_export
+from manifiesto import NOMBRE
+
+FILAS = [("100000", "C1", "100.0", "3", "2025"), ("1000", "C2", "20.0", "4", "2025")]
+
+
+@pytest.fixture
+def procesados(monkeypatch):
+    """Nombres de los archivos que main3 procesa en cada ejecución."""
+    nombres = []
+    procesar = main3.procesar_archivo
+
+    def contar(archivo, *args, **kwargs):
+        nombres.append(archivo.name)
+        return procesar(archivo, *args, **kwargs)
+
+    monkeypatch.setattr(main3, "procesar_archivo", contar)
+    return nombres
+
+
+def _ejecutar(carpeta, procesados, **kwargs):
+    procesados.clear()
+    main3.procesar_xlsx(str(carpeta), salida="csv", **kwargs)
+    return sorted(procesados)
+
+
+def test_omite_archivos_sin_cambios(carpeta, procesados):
+    escribir_export(carpeta / "A.csv", FILAS)
+    escribir_export(carpeta / "B.csv", FILAS)
+
+    assert _ejecutar(carpeta, procesados) == ["A.csv", "B.csv"]
+    assert _ejecutar(carpeta, procesados) == []
+
+    # Otra fecha con el mismo contenido: se omite por hash
+    os.utime(carpeta / "A.csv", ns=(0, 10**18))
+    assert _ejecutar(carpeta, procesados) == []
+
+    # Contenido nuevo, salida borrada o --forzar: se procesa
+    escribir_export(carpeta / "A.csv", FILAS[:1])
+    (carpeta / "r_B_resumen.csv").unlink()
+    assert _ejecutar(carpeta, procesados) == ["A.csv", "B.csv"]
+    assert _ejecutar(carpeta, procesados, forzar=True) == ["A.csv", "B.csv"]
+
+
+def test_otras_reglas_reprocesan(carpeta, procesados):
+    escribir_export(carpeta / "A.csv", FILAS)
+    _ejecutar(carpeta, procesados)
+
+    assert _ejecutar(carpeta, procesados, tarifa="main2") == ["A.csv"]
+    with open(carpeta / NOMBRE, encoding="utf-8") as f:
+        assert json.load(f)["archivos"]["A.csv"]["filas"] == 2
+
+
+def test_archivo_con_error_no_se_registra(carpeta, procesados):
+    (carpeta / "A.csv").write_text("Client,Any\nC1,2025\n", encoding="latin-1")
+
+    assert _ejecutar(carpeta, procesados) == ["A.csv"]
+    assert _ejecutar(carpeta, procesados) == ["A.csv"]
+    with open(carpeta / NOMBRE, encoding="utf-8") as f:
+        assert json.load(f)["archivos"] == {}
@@ -0,0 +1,49 @@
+"""Modo paralelo de main3: mismos resultados que el secuencial y fallos aislados por archivo."""
+
+import json
+
+import pandas as pd
+import pytest
+
+import main3
+from datos import escribir_export
+from manifiesto import NOMBRE
+
+FILAS = [("100000", "C1", "100.0", "3", "2025"), ("1000", "C2", "20.0", "4", "2025"),
+         ("10", "C3", "5.0", "11", "2025")]
+
+
+def _salidas(carpeta):
+    return {r.name: pd.read_csv(r) for r in sorted(carpeta.glob("r_*_detalle.csv"))}
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_paralelo_igual_que_secuencial(carpeta, streaming):
+    for n in range(3):
+        escribir_export(carpeta / f"E{n}.csv", FILAS[n:] + FILAS[:n])
+
+    main3.procesar_xlsx(str(carpeta), streaming=streaming, chunksize=2, salida="csv", consolidar=True)
+    secuencial = _salidas(carpeta)
+    totales = pd.read_excel(carpeta / "r_consolidado.xlsx", sheet_name="Totales_Archivo")
+
+    main3.procesar_xlsx(str(carpeta), streaming=streaming, chunksize=2, salida="csv", consolidar=True,
+                        workers=2, forzar=True)
+    paralelo = _salidas(carpeta)
+
+    assert list(paralelo) == list(secuencial) == ["r_E0_detalle.csv", "r_E1_detalle.csv", "r_E2_detalle.csv"]
+    for nombre, df in secuencial.items():
+        pd.testing.assert_frame_equal(paralelo[nombre], df)
+    pd.testing.assert_frame_equal(pd.read_excel(carpeta / "r_consolidado.xlsx", sheet_name="Totales_Archivo"),
+                                  totales)
+
+
+def test_fallo_de_un_archivo_no_para_el_resto(carpeta, capsys):
+    escribir_export(carpeta / "OK.csv", FILAS)
+    (carpeta / "MAL.csv").write_text("Client,Any\nC1,2025\n", encoding="latin-1")
+
+    main3.procesar_xlsx(str(carpeta), salida="csv", workers=2)
+
+    assert (carpeta / "r_OK_detalle.csv").exists()
+    assert "MAL.csv" in capsys.readouterr().out
+    with open(carpeta / NOMBRE, encoding="utf-8") as f:
+        assert list(json.load(f)["archivos"]) == ["OK.csv"]
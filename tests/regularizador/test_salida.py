@@ -0,0 +1,69 @@
+"""Escritores de salida: esquema fijo del detalle Parquet y descarte de salidas a medias."""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import main3
+import salida
+from datos import COLUMNAS, escribir_export
+
+
+def test_parquet_streaming_con_tipos_distintos_por_bloque(carpeta):
+    # "Referència" es un número en el primer bloque y texto en el segundo
+    filas = [("100000", "C1", "10.0", "3", "2025", str(i)) for i in range(100)]
+    filas += [("1000", "C2", "20.0", "4", "2025", "abc") for _ in range(50)]
+    escribir_export(carpeta / "EXPORT.csv", filas, columnas=COLUMNAS + ["Referència"])
+
+    main3.procesar_xlsx(str(carpeta), streaming=True, chunksize=100, salida="parquet")
+
+    tabla = pq.read_table(carpeta / "r_EXPORT_detalle.parquet")
+    assert tabla.num_rows == 150
+    assert tabla.schema.field("Referència").type == pa.string()
+    assert tabla.schema.field("Mes en que es factura").type == pa.int8()
+    assert tabla.schema.field("DIFF").type == pa.float64()
+    assert tabla.column("Referència").to_pylist()[98:102] == ["98", "99", "abc", "abc"]
+    assert tabla.column("nombre_ceco").to_pylist()[-1] == "Àrea A"
+
+
+def test_parquet_columna_vacia_en_un_bloque(tmp_path):
+    bloques = [pd.DataFrame({"Nota": [None, None], "Mes en que es factura": [1.0, 2.5]}),
+               pd.DataFrame({"Nota": ["x", 3], "Mes en que es factura": [300, 4]})]
+    with salida.crear_escritor("parquet", tmp_path / "EXPORT.csv") as escritor:
+        for bloque in bloques:
+            escritor.escribir_detalle(bloque)
+        escritor.escribir_resumen(pd.DataFrame({"DIFF": [0.0]}))
+
+    tabla = pq.read_table(tmp_path / "r_EXPORT_detalle.parquet")
+    assert tabla.column("Nota").to_pylist() == [None, None, "x", "3"]
+    # Mes con decimales o fuera de rango: vacío
+    assert tabla.column("Mes en que es factura").to_pylist() == [1, None, None, 4]
+
+
+@pytest.mark.parametrize("formato", ["parquet", "csv", "xlsx"])
+def test_error_borra_salida_a_medias(tmp_path, formato):
+    archivo = tmp_path / "EXPORT.csv"
+    with pytest.raises(RuntimeError):
+        with salida.crear_escritor(formato, archivo) as escritor:
+            escritor.escribir_detalle(pd.DataFrame({"DIFF": [1.0]}))
+            raise RuntimeError("fallo")
+
+    assert not [r for r in salida.rutas_salida(formato, archivo) if r.exists()]
+
+
+def test_streaming_con_error_no_deja_parquet(carpeta, monkeypatch):
+    escribir_export(carpeta / "EXPORT.csv", [("100000", "C1", "10.0", "3", "2025")] * 4)
+    calcular = main3.calcular
+    llamadas = []
+
+    def calcular_falla(df, *args):
+        llamadas.append(len(df))
+        if len(llamadas) == 2:
+            raise RuntimeError("fallo en el segundo bloque")
+        return calcular(df, *args)
+
+    monkeypatch.setattr(main3, "calcular", calcular_falla)
+    main3.procesar_xlsx(str(carpeta), streaming=True, chunksize=2, salida="parquet")
+
+    assert not (carpeta / "r_EXPORT_detalle.parquet").exists()
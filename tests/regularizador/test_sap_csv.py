@@ -0,0 +1,46 @@
+"""sap_csv: lectura en streaming de exports con BOM y líneas entrecomilladas."""
+
+import pandas as pd
+
+from datos import COLUMNAS, escribir_export
+from sap_csv import SapCsvStream, abrir_csv_sap
+
+FILAS = [("100000", "C1", "100.5", "3", "2025"), ("1000", "C2", "20.0", "12", "2024")]
+
+
+def test_entrecomillado_igual_que_plano(tmp_path):
+    escribir_export(tmp_path / "sap.csv", FILAS)
+    escribir_export(tmp_path / "plano.csv", FILAS, entrecomillado=False)
+
+    with abrir_csv_sap(tmp_path / "sap.csv") as fuente:
+        assert isinstance(fuente, SapCsvStream)
+        sap = pd.read_csv(fuente, sep=",")
+    with abrir_csv_sap(tmp_path / "plano.csv") as fuente:
+        assert not isinstance(fuente, SapCsvStream)
+        plano = pd.read_csv(fuente, sep=",")
+
+    assert list(sap.columns) == COLUMNAS
+    pd.testing.assert_frame_equal(sap, plano)
+
+
+def test_lectura_por_bloques_pequenos(tmp_path):
+    escribir_export(tmp_path / "sap.csv", FILAS)
+    esperado = "".join(",".join(f) + "\n" for f in [COLUMNAS] + [list(f) for f in FILAS])
+
+    with SapCsvStream(tmp_path / "sap.csv") as fuente:
+        partes = iter(lambda: fuente.read(7), "")
+        assert "".join(partes) == esperado
+    with SapCsvStream(tmp_path / "sap.csv") as fuente:
+        assert fuente.read(3) == "UT "
+        assert fuente.readline() == "Fact.," + ",".join(COLUMNAS[1:]) + "\n"
+        assert list(fuente) == esperado.splitlines(keepends=True)[1:]
+
+
+def test_read_csv_por_chunks(tmp_path):
+    filas = [("100000", f"C{i}", "1.0", str(i % 12 + 1), "2025") for i in range(25)]
+    escribir_export(tmp_path / "sap.csv", filas)
+
+    with abrir_csv_sap(tmp_path / "sap.csv") as fuente:
+        bloques = list(pd.read_csv(fuente, sep=",", chunksize=10))
+    assert [len(b) for b in bloques] == [10, 10, 5]
+    assert bloques[-1]["Client"].tolist()[-1] == "C24"
@@ -0,0 +1,48 @@
+"""MotorTarifas: tramos, versiones y fechas con año o mes vacíos."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from esquema import tipar
+from tarifas import MotorTarifas
+
+VERSIONES = [
+    {"vigente_desde": "2000-01-01", "tramos": [{"mes_hasta": 6, "descuento": 0.01, "incremento": 0.1},
+                                              {"mes_desde": 7, "descuento": 0.02, "incremento": 0.1}]},
+    {"vigente_desde": "2025-07-01", "tramos": [{"descuento": 0.05, "incremento": 0.2}]},
+]
+
+
+def _motor():
+    return MotorTarifas(VERSIONES, referencia="2024-01-01", columnas_anio=["Any"], nombre="prueba")
+
+
+def test_tasas_por_version_y_tramo():
+    fechas = np.array(["2024-03-01", "2024-09-01", "2025-08-01", "1999-01-01"], dtype="datetime64[D]")
+    descuento, incremento = _motor().tasas([3, 9, 3, 3], fechas)
+    assert descuento.tolist() == [0.01, 0.02, 0.05, 0.0]
+    assert incremento.tolist() == [0.1, 0.1, 0.2, 0.0]
+
+
+def test_tramos_solapados():
+    with pytest.raises(ValueError):
+        MotorTarifas([{"vigente_desde": "2000-01-01", "tramos": [{"mes_hasta": 7, "descuento": 0, "incremento": 0},
+                                                                 {"mes_desde": 7, "descuento": 0, "incremento": 0}]}])
+
+
+def test_fechas_con_anio_vacio_tipado():
+    # Columnas tipadas por esquema.py: Any Int16 y Mes Int8 con vacíos
+    df = tipar(pd.DataFrame({"Any": ["2025", "", "2025"], "Mes en que es factura": ["8", "8", ""]}))
+    assert str(df["Any"].dtype) == "Int16"
+
+    fechas = _motor().fechas(df, df["Mes en que es factura"])
+    assert fechas.tolist() == [np.datetime64("2025-08-01", "D")] + [np.datetime64("2024-01-01", "D")] * 2
+
+
+def test_aplicar_con_anio_vacio():
+    df = tipar(pd.DataFrame({"Any": ["2025", ""], "Mes en que es factura": ["8", "8"],
+                             "Preu unitari: Calculat per les taules de": ["100", "100"]}))
+    df = _motor().aplicar(df, "Preu unitari: Calculat per les taules de", df["Mes en que es factura"])
+    # Sin año: fecha de referencia (2024) -> primera versión
+    assert df["tasa_descuento"].tolist() == [0.05, 0.02]
@@ -0,0 +1,69 @@
+"""AlvReader: lectura por bloques del ALV simulado hacia CSV y Parquet."""
+
+import os
+
+import pyarrow.parquet as pq
+import pytest
+
+from src.core.alv_reader import AlvReader
+from src.scripts.export_multi_client import MultiClientExporter
+from src.utils.fake_sap import FakeAlvGrid
+
+from helpers import read_export
+
+ROWS = [{"KUNNR": f"CLI{i:03d}", "NETWR": str(i * 10), "MES": str(i % 12 + 1)} for i in range(7)]
+TITLES = {"KUNNR": "Client", "NETWR": "Import"}
+
+
+class _Grid(FakeAlvGrid):
+    """Grid que anota cada desplazamiento de FirstVisibleRow."""
+
+    def __setattr__(self, name, value):
+        if name == "FirstVisibleRow":
+            self.__dict__.setdefault("scrolls", []).append(value)
+        super().__setattr__(name, value)
+
+
+@pytest.fixture
+def grid(session):
+    grid = _Grid(session, "wnd[0]/usr/cntlGRID1/shellcont/shell", ROWS, titles=TITLES)
+    grid.scrolls = []
+    return grid
+
+
+def test_iter_rows_by_blocks_with_projection(grid):
+    rows = list(AlvReader(grid, block_size=3).iter_rows(["Import", "KUNNR"]))
+
+    assert rows[0] == ["0", "CLI000"] and len(rows) == 7
+    assert grid.scrolls == [0, 3, 6]
+
+
+def test_unknown_column(grid):
+    with pytest.raises(KeyError):
+        AlvReader(grid).select_columns(["VBELN"])
+
+
+def test_to_csv_headers(grid, tmp_path):
+    path = str(tmp_path / "alv.csv")
+    assert AlvReader(grid).to_csv(path, columns=["KUNNR", "MES"], header="name") == 7
+    header, rows = read_export(path)
+    assert header == ["KUNNR", "MES"] and rows[1] == ["CLI001", "2"]
+
+
+def test_to_parquet_in_chunks(grid, tmp_path):
+    path = str(tmp_path / "alv.parquet")
+    assert AlvReader(grid).to_parquet(path, chunk_rows=3) == 7
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.schema_arrow.names == ["Client", "Import", "MES"]
+
+
+def test_exporter_grid_method(session, config):
+    config["export"].update(method="grid", columns=["Client", "Mes en que es factura"])
+    results = MultiClientExporter(session, config).run(["CLI001"], 1, 3, 2025, "F")
+
+    header, rows = read_export(results["CLI001"]["output"])
+    assert header == ["Client", "Mes en que es factura"] and len(rows) == 3
+    assert not session.saved_files
+    assert os.path.dirname(results["CLI001"]["output"]) == config["export"]["default_directory"]
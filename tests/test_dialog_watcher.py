@@ -0,0 +1,46 @@
+"""DialogWatcher y sus manejadores sobre ventanas del motor simulado."""
+
+import time
+
+from src.core.dialog_watcher import (DEFAULT_LOCAL_FORMAT, DialogWatcher, export_format_handler, export_route,
+                                     local_file_handler, save_as_handler)
+
+
+def _window(session, title):
+    return session._open_window(1, "GuiModalWindow", title)
+
+
+def test_export_format_handler_matches_export_dialog(session):
+    assert export_format_handler("csv-LEAN-STANDARD").matches(_window(session, "Export"))
+    assert export_format_handler("csv-LEAN-STANDARD").matches(_window(session, "Exportar objeto de lista a XXL"))
+
+
+def test_export_format_handler_ignores_other_popups(session):
+    handler = export_format_handler("csv-LEAN-STANDARD")
+    for title in ("Information", "Error", "Confirmation", "Save As", "SAP GUI Security"):
+        assert not handler.matches(_window(session, title)), title
+
+
+def test_local_file_handler_requires_its_radio_buttons(session):
+    assert local_file_handler().matches(_window(session, "Save list in file..."))
+    assert not local_file_handler().matches(_window(session, "Information"))
+
+
+def test_export_route_defaults_to_unconverted(session):
+    option, handler, headless = export_route({"method": "local"})
+    assert (option, headless, DEFAULT_LOCAL_FORMAT) == ("&PC", True, "unconverted")
+
+    window = _window(session, "Save list in file...")
+    handler.action(window)
+    assert session.export_layout == "unconverted"
+
+
+def test_watcher_leaves_unexpected_popup_open(session):
+    with DialogWatcher(session, poll_interval=0.01) as watcher:
+        watcher.arm(save_as_handler("/tmp", "x.csv"))
+        watcher.arm(export_format_handler("csv-LEAN-STANDARD"))
+        _window(session, "Information")
+        time.sleep(0.1)
+
+        assert not watcher.handled("export_format")
+        assert session.findById("wnd[1]").Text == "Information"
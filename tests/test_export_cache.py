@@ -0,0 +1,44 @@
+"""ExportCache: claves, periodos cerrados y ajustes de exportación."""
+
+from src.utils.export_cache import ExportCache
+
+FILTERS = {"status": "F", "year": "2024", "month": ("1", "12")}
+
+
+def _cache(tmp_path, **export_config):
+    return ExportCache(str(tmp_path / "cache"), export_config=export_config or None)
+
+
+def test_store_and_fetch(tmp_path):
+    export = tmp_path / "export.csv"
+    export.write_text("a,b\n1,2\n", encoding="latin-1")
+    cache = _cache(tmp_path)
+
+    assert cache.store("ZTSD", FILTERS, str(export))
+    assert cache.fetch("ZTSD", FILTERS, str(tmp_path / "copy.csv"))
+    assert (tmp_path / "copy.csv").read_bytes() == export.read_bytes()
+
+
+def test_open_period_not_cached(tmp_path):
+    export = tmp_path / "export.csv"
+    export.write_text("a\n", encoding="latin-1")
+    assert not _cache(tmp_path).store("ZTSD", dict(FILTERS, status="A"), str(export))
+
+
+def test_export_settings_are_part_of_the_key(tmp_path):
+    export = tmp_path / "export.csv"
+    export.write_text("a,b\n1,2\n", encoding="latin-1")
+    _cache(tmp_path, method="grid", columns=["KUNNR"]).store("ZTSD", FILTERS, str(export))
+
+    dest = str(tmp_path / "copy.csv")
+    assert _cache(tmp_path, method="grid", columns=["KUNNR"]).fetch("ZTSD", FILTERS, dest)
+    assert not _cache(tmp_path, method="grid", columns=["KUNNR", "NETWR"]).fetch("ZTSD", FILTERS, dest)
+    assert not _cache(tmp_path, method="local", local_format="unconverted").fetch("ZTSD", FILTERS, dest)
+    assert not _cache(tmp_path, method="excel").fetch("ZTSD", FILTERS, dest)
+
+
+def test_from_config_uses_export_section(config):
+    config["cache"]["enabled"] = True
+    config["export"].update(method="local", local_format="unconverted")
+    cache = ExportCache.from_config(config)
+    assert cache.export_settings == {"method": "local", "extension": "csv", "local_format": "unconverted"}
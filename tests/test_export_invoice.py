@@ -0,0 +1,47 @@
+"""InvoiceExporter contra el motor simulado."""
+
+import os
+
+from src.scripts.export_invoice import InvoiceExporter
+from src.utils.fake_sap import FakeSapGui, FakeScriptingEngine
+from src.core.sap_connection import SAPConnection
+
+from helpers import read_export
+
+
+def test_export_invoice(session, config):
+    assert InvoiceExporter(session, config).run("90001")
+
+    files = os.listdir(config["export"]["default_directory"])
+    assert len(files) == 1
+    assert files[0].startswith(config["export"]["default_filename_prefix"])
+    header, rows = read_export(os.path.join(config["export"]["default_directory"], files[0]))
+    assert "Factura" in header
+    assert len(rows) == 3
+    assert session.findById("wnd[0]/usr/txtS_NUM_F-LOW").Text == "90001"
+
+
+def test_export_invoice_local_method(session, config):
+    config["export"].update(method="local", local_format="spreadsheet")
+    assert InvoiceExporter(session, config).run("90001")
+
+    (name,) = os.listdir(config["export"]["default_directory"])
+    header, rows = read_export(os.path.join(config["export"]["default_directory"], name), delimiter="\t")
+    assert header[0] == "Client"
+    assert len(rows) == 3
+
+
+def test_export_invoice_security_popup(config):
+    engine = FakeScriptingEngine(security_popup=True)
+    session = SAPConnection(gui=FakeSapGui(engine)).connect()
+    assert InvoiceExporter(session, config).run("90001")
+    assert len(os.listdir(config["export"]["default_directory"])) == 1
+
+
+def test_export_invoice_injected_failure(config):
+    engine = FakeScriptingEngine(fail_ids={"tbar[1]/btn[8]": 1})
+    session = SAPConnection(gui=FakeSapGui(engine)).connect()
+
+    assert not InvoiceExporter(session, config).run("90001")
+    assert engine.failures.failures == 1
+    assert os.listdir(config["export"]["default_directory"]) == []
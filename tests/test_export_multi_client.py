@@ -0,0 +1,174 @@
+"""MultiClientExporter contra el motor simulado: secuencial, pool, lote, reanudación e incremental."""
+
+import os
+from datetime import date
+
+import pytest
+
+from src.core.sap_connection import SAPConnection
+from src.scripts.export_multi_client import MultiClientExporter
+from src.utils.fake_sap import FakeSapGui, FakeScriptingEngine
+from src.utils.run_journal import RunJournal
+
+from helpers import read_export
+
+CLIENTS = ["CLI001", "CLI002", "CLI003"]
+FILTERS = dict(month_from=1, month_to=10, year=2025, status="F")
+
+
+def _clients_in(path):
+    header, rows = read_export(path)
+    idx = header.index("Client")
+    return {row[idx] for row in rows}, len(rows)
+
+
+def test_run_sequential(session, config):
+    results = MultiClientExporter(session, config).run(CLIENTS, **FILTERS)
+
+    assert list(results) == CLIENTS
+    for client, result in results.items():
+        assert result["success"]
+        assert _clients_in(result["output"]) == ({client}, 3)
+    # La transacción se abre una vez y se vuelve a la pantalla de selección entre clientes
+    assert session.Info.Transaction == "ZTSD_FACTURACION"
+    assert session.findById("wnd[0]/usr/ctxtS_KUNNR-LOW").Text == "CLI003"
+
+
+def test_run_parallel_sessions(sap_conn, session, config):
+    ids = sap_conn.open_session_pool(2)
+    results = MultiClientExporter(session, config, sessions=ids, attach=sap_conn.attach_session).run(
+        CLIENTS, **FILTERS)
+
+    assert all(r["success"] for r in results.values())
+    assert {c: _clients_in(r["output"])[0] for c, r in results.items()} == {c: {c} for c in CLIENTS}
+
+
+def test_run_batched(session, config):
+    results = MultiClientExporter(session, config).run_batched(CLIENTS, batch_size=2, **FILTERS)
+
+    assert all(r["success"] for r in results.values())
+    assert {c: r["rows"] for c, r in results.items()} == {c: 3 for c in CLIENTS}
+    for client, result in results.items():
+        assert _clients_in(result["output"]) == ({client}, 3)
+    # Los archivos de lote se borran tras repartirlos
+    assert not [f for f in os.listdir(config["export"]["default_directory"]) if f.startswith("EXPORT_BATCH_")]
+
+
+@pytest.mark.parametrize("local_format", ["unconverted", "spreadsheet"])
+def test_run_batched_local_method(session, config, local_format):
+    # Con method "local" el reparto usa el separador del formato, no batch.delimiter
+    config["export"].update(method="local", local_format=local_format)
+    results = MultiClientExporter(session, config).run_batched(CLIENTS, batch_size=3, **FILTERS)
+
+    assert {c: r["rows"] for c, r in results.items()} == {c: 3 for c in CLIENTS}
+
+
+def test_run_injected_failure(config):
+    engine = FakeScriptingEngine(fail_ids={"tbar[1]/btn[8]": 1})
+    session = SAPConnection(gui=FakeSapGui(engine)).connect()
+
+    results = MultiClientExporter(session, config).run(CLIENTS, **FILTERS)
+
+    assert [results[c]["success"] for c in CLIENTS] == [False, True, True]
+    assert engine.failures.failures == 1
+
+
+def test_resume_skips_completed(config):
+    journal = RunJournal(config["journal"]["path"])
+    engine = FakeScriptingEngine(fail_ids={"tbar[1]/btn[8]": 1})
+    session = SAPConnection(gui=FakeSapGui(engine)).connect()
+    first = MultiClientExporter(session, config, journal=journal).run(CLIENTS, **FILTERS)
+    assert not first["CLI001"]["success"]
+
+    calls = session.calls
+    second = MultiClientExporter(session, config, journal=journal).run(CLIENTS, resume=True, **FILTERS)
+
+    assert all(r["success"] for r in second.values())
+    assert not second["CLI001"].get("skipped")
+    assert second["CLI002"]["skipped"] and second["CLI003"]["skipped"]
+    assert second["CLI002"]["output"] == first["CLI002"]["output"]
+    assert set(journal.completed(RunJournal.filter_key(FILTERS))) == set(CLIENTS)
+    assert session.calls > calls
+
+
+def test_resume_with_other_filters_exports_again(session, config):
+    journal = RunJournal(config["journal"]["path"])
+    MultiClientExporter(session, config, journal=journal).run(CLIENTS, **FILTERS)
+
+    results = MultiClientExporter(session, config, journal=journal).run(
+        CLIENTS, resume=True, **dict(FILTERS, status="A"))
+
+    assert all(r["success"] and not r.get("skipped") for r in results.values())
+
+
+def test_run_incremental(session, config):
+    exporter = MultiClientExporter(session, config)
+    first = exporter.run_incremental(CLIENTS[:2], **FILTERS)
+
+    assert all(r["success"] and r["delta_rows"] == 3 for r in first.values())
+    consolidated = first["CLI001"]["consolidated"]
+    assert _clients_in(consolidated) == ({"CLI001"}, 3)
+
+    # 2025 está cerrado: la segunda ejecución no consulta SAP
+    calls = session.calls
+    second = exporter.run_incremental(CLIENTS[:2], **FILTERS)
+    assert all(r["success"] and r["skipped"] for r in second.values())
+    assert session.calls == calls
+
+    # Ampliar el rango solo pide los meses nuevos y los añade al consolidado
+    third = exporter.run_incremental(["CLI001"], **dict(FILTERS, month_to=12))
+    header, rows = read_export(consolidated)
+    months = [int(row[header.index("Mes en que es factura")]) for row in rows]
+    assert third["CLI001"]["delta_rows"] == 3
+    assert sorted(months) == [1, 2, 3, 11, 11, 12]
+
+
+def test_run_batched_failure_shrinks_batch(config):
+    # Un lote fallido no debe llevar el siguiente a batch.max_size
+    config["batch"].update(keep_batch_file=True, max_size=200, max_rows=200000)
+    engine = FakeScriptingEngine(fail_ids={"tbar[1]/btn[8]": 1})
+    session = SAPConnection(gui=FakeSapGui(engine)).connect()
+    clients = [f"CLI{n:03d}" for n in range(1, 8)]
+
+    results = MultiClientExporter(session, config).run_batched(clients, batch_size=4, **FILTERS)
+
+    assert [results[c]["success"] for c in clients] == [False] * 4 + [True] * 3
+    batch_files = [f for f in os.listdir(config["export"]["default_directory"]) if f.startswith("EXPORT_BATCH_")]
+    assert len(batch_files) == 2
+
+
+def test_run_incremental_without_new_rows(session, config):
+    # Un cliente sin filas desde su marca de agua no es un fallo y la marca no avanza
+    exporter = MultiClientExporter(session, config)
+    # Año en curso hasta diciembre: los meses abiertos se vuelven a consultar
+    filters = dict(FILTERS, year=date.today().year, month_to=12)
+    exporter.run_incremental(["CLI001"], **filters)
+    watermarks = config["incremental"]["watermarks_path"]
+    with open(watermarks, encoding="utf-8") as f:
+        before = f.read()
+
+    session.rows_per_query = 0
+    results = exporter.run_incremental(["CLI001", "CLI002"], **filters)
+
+    assert all(r["success"] and r["delta_rows"] == 0 and r["rows"] == 0 for r in results.values())
+    with open(watermarks, encoding="utf-8") as f:
+        assert f.read() == before
+
+
+def test_run_incremental_uses_its_own_delimiter(session, config):
+    # batch.delimiter solo afecta al modo lote; la fusión usa incremental.delimiter
+    config["batch"]["delimiter"] = ";"
+    config["incremental"]["delimiter"] = ","
+    exporter = MultiClientExporter(session, config)
+    exporter.run_incremental(["CLI001"], **FILTERS)
+    results = exporter.run_incremental(["CLI001"], **dict(FILTERS, month_to=12))
+
+    assert results["CLI001"]["success"] and results["CLI001"]["delta_rows"] == 3
+    header, rows = read_export(results["CLI001"]["consolidated"])
+    assert len(rows) == 6
+
+
+def test_run_no_data_is_a_failure_outside_incremental(session, config):
+    session.rows_per_query = 0
+    results = MultiClientExporter(session, config).run(["CLI001"], **FILTERS)
+    assert not results["CLI001"]["success"]
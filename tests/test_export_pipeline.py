@@ -0,0 +1,48 @@
+"""Etapas de post-proceso de ExportPipeline."""
+
+import pyarrow.parquet as pq
+
+from src.utils.export_pipeline import PipelineItem, default_stages, parquet_stage
+
+HEADER = "Client,Mes,Descripció"
+
+
+def _export(tmp_path, rows, encoding="latin-1"):
+    path = tmp_path / "EXPORT_CLIENT_CLI001.csv"
+    lines = [HEADER] + [f"CLI001,{i},Línia {i}" for i in range(rows)]
+    path.write_bytes(b"\xef\xbb\xbf" + "".join(f'"{line}"\r\n' for line in lines).encode(encoding))
+    return str(path)
+
+
+def _run(stages, path):
+    item = PipelineItem("CLI001", path, {"success": True})
+    for _, stage in stages:
+        stage(item)
+    return item
+
+
+def test_parquet_stage_writes_in_batches(tmp_path):
+    item = _run([("convert", parquet_stage(chunk_rows=2))], _export(tmp_path, 5))
+
+    parquet = pq.ParquetFile(item.result["parquet"])
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column_names == ["Client", "Mes", "Descripció"]
+    assert table.column("Mes").to_pylist() == ["0", "1", "2", "3", "4"]
+
+
+def test_parquet_stage_empty_export(tmp_path):
+    item = _run([("convert", parquet_stage(chunk_rows=2))], _export(tmp_path, 0))
+    table = pq.read_table(item.result["parquet"])
+    assert table.num_rows == 0 and table.column_names == ["Client", "Mes", "Descripció"]
+
+
+def test_normalize_to_target_encoding(tmp_path):
+    config = {"pipeline": {"encoding": "latin-1", "target_encoding": "utf-8", "convert": "parquet"}}
+    path = _export(tmp_path, 2)
+    item = _run(default_stages(config), path)
+
+    with open(path, encoding="utf-8") as f:
+        assert f.readline().strip() == HEADER
+    assert item.rows == 2
+    assert pq.read_table(item.result["parquet"]).column("Descripció").to_pylist() == ["Línia 0", "Línia 1"]
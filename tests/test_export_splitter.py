@@ -0,0 +1,45 @@
+"""Lectura de exports SAP, separador según el formato local y reparto por columna."""
+
+import io
+import logging
+
+import pytest
+
+from src.utils.export_splitter import export_delimiter, read_export_rows
+
+
+def test_read_unconverted_list():
+    text = ("----------------------\n"
+            "|Client  |Mes |Import|\n"
+            "|--------------------|\n"
+            "|CLI001  |  1 |  10,5|\n"
+            "|CLI002  |  2 |   3  |\n"
+            "----------------------\n")
+    header, rows = read_export_rows(io.StringIO(text), "|")
+    assert header == ["Client", "Mes", "Import"]
+    assert list(rows) == [["CLI001", "1", "10,5"], ["CLI002", "2", "3"]]
+
+
+def test_read_wrapped_csv():
+    text = '﻿"Client,Mes"\r\n"CLI001,1"\r\n'
+    header, rows = read_export_rows(io.StringIO(text))
+    assert (header, list(rows)) == (["Client", "Mes"], [["CLI001", "1"]])
+
+
+@pytest.mark.parametrize("config, expected", [
+    ({}, ","),
+    ({"batch": {"delimiter": ";"}}, ";"),
+    ({"batch": {"delimiter": ";"}, "warehouse": {"delimiter": "\t"}}, "\t"),
+    ({"export": {"method": "local"}}, "|"),
+    ({"export": {"method": "local", "local_format": "spreadsheet"}}, "\t"),
+    ({"export": {"method": "grid", "local_format": "spreadsheet"}, "batch": {"delimiter": ";"}}, ";"),
+])
+def test_export_delimiter(config, expected):
+    assert export_delimiter(config, "warehouse") == expected
+
+
+def test_export_delimiter_local_format_wins(caplog):
+    config = {"export": {"method": "local", "local_format": "spreadsheet"}, "batch": {"delimiter": ","}}
+    with caplog.at_level(logging.WARNING, logger="SAP_Automation"):
+        assert export_delimiter(config, "batch") == "\t"
+    assert "ignored" in caplog.text
@@ -0,0 +1,28 @@
+"""Validación de argumentos de main.py."""
+
+import sys
+
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("extra", [["--incremental"], ["--batch-size", "10"]])
+def test_sessions_rejected_outside_per_client_run(monkeypatch, capsys, tmp_path, extra):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["main.py", "--task", "export_multi_client", "--clients-file", "c.txt",
+                                      "--sessions", "3"] + extra)
+    with pytest.raises(SystemExit) as exc:
+        main.main()
+    assert exc.value.code == 2
+    assert "--sessions" in capsys.readouterr().err
+
+
+def test_resume_rejected_with_incremental(monkeypatch, capsys, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["main.py", "--task", "export_multi_client", "--clients-file", "c.txt",
+                                      "--incremental", "--resume"])
+    with pytest.raises(SystemExit) as exc:
+        main.main()
+    assert exc.value.code == 2
+    assert "--resume" in capsys.readouterr().err
@@ -0,0 +1,70 @@
+"""ParquetStore: ingesta particionada, tipos, reemplazo de particiones y consultas."""
+
+import pyarrow as pa
+import pytest
+
+from src.utils import parquet_store
+from src.utils.parquet_store import ParquetStore
+
+HEADER = "Client,Any,Mes en que es factura,UT Fact.,Import"
+
+
+def _export(path, rows):
+    path.write_text("\n".join([HEADER] + rows) + "\n", encoding="latin-1")
+    return str(path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ParquetStore(str(tmp_path / "store"))
+
+
+def test_ingest_partitions_and_types(tmp_path, store):
+    path = _export(tmp_path / "a.csv", ["CLI001,2025,1,0100,10.5", "CLI001,2025,2,0200,3",
+                                        "CLI002,2025,1,0100,", "CLI001,2025,1,0300,1.25"])
+    assert store.ingest(path) == 4
+
+    assert store.partitions() == [("CLI001", 2025, 1), ("CLI001", 2025, 2), ("CLI002", 2025, 1)]
+    table = store.query(as_pandas=False)
+    schema = table.schema
+    assert schema.field("Mes en que es factura").type == pa.int8()
+    assert schema.field("Any").type == pa.int16()
+    assert schema.field("Import").type == pa.float64()
+    assert pa.types.is_dictionary(schema.field("UT Fact.").type)
+
+    df = store.query(clients=["CLI001"], months=[1], columns=["UT Fact.", "Import"])
+    assert sorted(zip(df["UT Fact."].astype(str), df["Import"])) == [("0100", 10.5), ("0300", 1.25)]
+    assert store.query(clients=["CLI002"])["Import"].isna().all()
+
+
+def test_reingest_replaces_partition(tmp_path, store):
+    store.ingest(_export(tmp_path / "a.csv", ["CLI001,2025,1,0100,10", "CLI001,2025,1,0100,20"]))
+    store.ingest(_export(tmp_path / "b.csv", ["CLI001,2025,1,0100,30"]))
+
+    assert store.query(clients=["CLI001"], years=[2025], months=[1])["Import"].tolist() == [30.0]
+
+
+def test_year_from_file_name(tmp_path, store):
+    path = tmp_path / "EXPORT_CLIENT_CLI009_2024M01-03_20250101_120000.csv"
+    path.write_text("Client,Mes en que es factura,Import\nCLI009,3,1\n", encoding="latin-1")
+    store.ingest(str(path))
+
+    assert store.partitions() == [("CLI009", 2024, 3)]
+
+
+def test_missing_month_column(tmp_path, store):
+    path = tmp_path / "a.csv"
+    path.write_text("Client,Import\nCLI001,1\n", encoding="latin-1")
+    with pytest.raises(KeyError):
+        store.ingest(str(path))
+
+
+def test_cli_ingest_and_partitions(tmp_path, capsys):
+    _export(tmp_path / "a.csv", ["CLI001,2025,1,0100,10", "CLI001,2025,2,0100,20"])
+    root = str(tmp_path / "store")
+    args = ["--config", str(tmp_path / "missing.yaml"), "--root", root]
+
+    assert parquet_store.main(args + ["ingest", str(tmp_path / "*.csv")]) == 0
+    assert "2 rows from 1 files" in capsys.readouterr().out
+    assert parquet_store.main(args + ["partitions"]) == 0
+    assert capsys.readouterr().out.splitlines() == ["CLI001\t2025\t01", "CLI001\t2025\t02"]
@@ -0,0 +1,52 @@
+"""SAPConnection contra el motor simulado: sesión existente, login y pool de sesiones."""
+
+import pytest
+
+from src.core.sap_connection import SAPConnection
+from src.utils.fake_sap import FakeSapGui, FakeScriptingEngine
+
+
+def test_connect_existing_session(session):
+    assert session.Id == "/app/con[0]/ses[0]"
+    assert session.Info.SystemName == "FAKE"
+
+
+def test_connect_existing_session_out_of_range():
+    conn = SAPConnection(session_index=3, gui=FakeSapGui(FakeScriptingEngine()))
+    with pytest.raises(IndexError):
+        conn.connect()
+
+
+def test_connect_with_credentials():
+    engine = FakeScriptingEngine(connections=0)
+    conn = SAPConnection(connection_mode="credentials", connection_string="FAKE - Test",
+                         credentials={"username": "tester", "password": "secret", "client": "200"},
+                         gui=FakeSapGui(engine))
+    session = conn.connect()
+    assert session.Info.User == "TESTER"
+    assert session.Info.Client == "200"
+    assert session.Info.Transaction == "SESSION_MANAGER"
+    conn.disconnect()
+    assert engine.Children(0).Children.Count == 0
+
+
+def test_connect_with_missing_credentials():
+    conn = SAPConnection(connection_mode="credentials", connection_string="FAKE",
+                         credentials={"username": "tester"}, gui=FakeSapGui(FakeScriptingEngine()))
+    with pytest.raises(ValueError):
+        conn.connect()
+
+
+def test_session_pool(sap_conn, session):
+    ids = sap_conn.open_session_pool(3)
+    assert ids[0] == session.Id
+    assert len(set(ids)) == 3
+    assert sap_conn.attach_session(ids[2]).Id == ids[2]
+
+    sap_conn.close_session_pool()
+    assert sap_conn.connection.Children.Count == 1
+    assert sap_conn.pool_session_ids == [session.Id]
+
+
+def test_session_pool_capped_at_six(sap_conn):
+    assert len(sap_conn.open_session_pool(10)) == 6
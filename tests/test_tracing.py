@@ -0,0 +1,87 @@
+"""Tracer, lectura de trazas e informe p50/p95 por paso."""
+
+import json
+
+import pytest
+
+from src.scripts.export_multi_client import MultiClientExporter
+from src.utils import tracing
+from src.utils.tracing import Tracer, read_spans, summarize
+
+
+def _spans(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_disabled_tracer_writes_nothing(tmp_path):
+    tracer = Tracer.from_config({"tracing": {"enabled": False, "path": str(tmp_path / "trace.jsonl")}})
+    with tracer.span("execute"):
+        pass
+    assert not tracer.enabled
+    assert not (tmp_path / "trace.jsonl").exists()
+
+
+def test_span_records_context_and_errors(tmp_path):
+    path = tmp_path / "logs" / "trace.jsonl"
+    tracer = Tracer(str(path), run_id="run-1")
+    with tracer.context(client="CLI001"):
+        with tracer.span("execute", rows=3):
+            pass
+        with pytest.raises(RuntimeError):
+            with tracer.span("export_dialog"):
+                raise RuntimeError("boom")
+    with tracer.span("back"):
+        pass
+
+    execute, dialog, back = _spans(path)
+    assert execute["run_id"] == "run-1"
+    assert (execute["client"], execute["step"], execute["rows"], execute["status"]) == ("CLI001", "execute", 3, "ok")
+    assert (dialog["step"], dialog["status"]) == ("export_dialog", "error")
+    assert "client" not in back
+
+
+def test_read_spans_defaults_to_last_run(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    for run_id in ("run-1", "run-2"):
+        with Tracer(path, run_id=run_id).span("execute"):
+            pass
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("not json\n")
+
+    assert read_spans(path)[0] == "run-2"
+    run_id, spans = read_spans(path, "run-1")
+    assert run_id == "run-1" and len(spans) == 1
+
+
+def test_summarize_percentiles_and_step_order():
+    spans = [{"step": "execute", "duration": d, "status": "ok"} for d in (0.1, 0.2, 0.3, 0.4)]
+    spans += [{"step": "custom", "duration": 1.0, "status": "ok"},
+              {"step": "navigate", "duration": 0.5, "status": "error"}]
+    stats = summarize(spans)
+
+    assert list(stats) == ["navigate", "execute", "custom"]
+    assert stats["execute"]["count"] == 4
+    assert stats["execute"]["p50"] == 0.2 and stats["execute"]["p95"] == 0.4
+    assert stats["execute"]["total"] == pytest.approx(1.0)
+    assert stats["navigate"]["errors"] == 1
+
+
+def test_exporter_steps_are_traced(session, config, tmp_path, capsys):
+    path = str(tmp_path / "trace.jsonl")
+    tracer = Tracer(path, run_id="sim")
+    MultiClientExporter(session, config, tracer=tracer).run(["CLI001", "CLI002"], 1, 3, 2025, "F")
+
+    spans = _spans(path)
+    assert {s["client"] for s in spans if "client" in s} == {"CLI001", "CLI002"}
+    assert {"navigate", "execute", "back"} <= {s["step"] for s in spans}
+
+    assert tracing.main([path, "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["run_id"] == "sim"
+    assert report["steps"]["execute"]["count"] == 2
+
+
+def test_report_missing_file(tmp_path, capsys):
+    assert tracing.main([str(tmp_path / "missing.jsonl")]) == 1
+    assert "not found" in capsys.readouterr().err
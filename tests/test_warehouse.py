@@ -0,0 +1,72 @@
+"""Warehouse: carga en bloque, recarga por factura y consultas."""
+
+import pytest
+
+from src.utils import warehouse as warehouse_cli
+from src.utils.warehouse import Warehouse
+
+HEADER = "Client,Factura,Posició,Any,Mes en que es factura,Status,Import"
+
+
+def _export(path, rows):
+    path.write_text("\n".join([HEADER] + rows) + "\n", encoding="latin-1")
+    return str(path)
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    with Warehouse(str(tmp_path / "warehouse.sqlite")) as wh:
+        yield wh
+
+
+def _lines(wh, invoice):
+    return [(r["line"], r["data"]["Import"]) for r in wh.invoices(invoice=invoice)]
+
+
+def test_load_and_query(tmp_path, warehouse):
+    path = _export(tmp_path / "a.csv", ["CLI001,9001,10,2025,1,F,5", "CLI001,9001,20,2025,1,F,6",
+                                        "CLI002,9002,10,2025,2,F,7"])
+    assert warehouse.load(path) == 3
+
+    rows = warehouse.invoices(client="CLI001", year=2025, month=1)
+    assert [(r["invoice"], r["line"], r["status"]) for r in rows] == [("9001", 10, "F"), ("9001", 20, "F")]
+    names, result = warehouse.query("SELECT client, COUNT(*) FROM invoices GROUP BY client ORDER BY client")
+    assert result == [("CLI001", 2), ("CLI002", 1)]
+
+
+def test_reload_replaces_invoice_lines(tmp_path, warehouse):
+    warehouse.load(_export(tmp_path / "a.csv", ["CLI001,9001,10,2025,1,F,5", "CLI001,9001,20,2025,1,F,6",
+                                                "CLI001,9003,10,2025,1,F,1"]))
+    # SAP ya no devuelve la línea 20 de 9001; 9003 no viene en el archivo y se conserva
+    assert warehouse.load(_export(tmp_path / "b.csv", ["CLI001,9001,10,2025,1,F,8"])) == 1
+
+    assert _lines(warehouse, "9001") == [(10, "8")]
+    assert _lines(warehouse, "9003") == [(10, "1")]
+
+
+def test_invalid_position_loads_nothing(tmp_path, warehouse):
+    warehouse.load(_export(tmp_path / "a.csv", ["CLI001,9001,10,2025,1,F,5"]))
+    path = _export(tmp_path / "b.csv", ["CLI001,9001,10,2025,1,F,8", "CLI001,9001,,2025,1,F,9"])
+
+    with pytest.raises(ValueError, match="9001"):
+        warehouse.load(path)
+    assert _lines(warehouse, "9001") == [(10, "5")]
+    assert warehouse.query("SELECT COUNT(*) FROM staging")[1] == [(0,)]
+
+
+def test_ordinal_line_without_position_column(tmp_path, warehouse):
+    path = tmp_path / "EXPORT_CLIENT_CLI001_2024M01-01_20250101_120000.csv"
+    path.write_text("Factura,Mes en que es factura\n9001,1\n9001,1\n9002,1\n", encoding="latin-1")
+    assert warehouse.load(str(path)) == 3
+
+    rows = warehouse.invoices(client="CLI001", year=2024)
+    assert [(r["invoice"], r["line"]) for r in rows] == [("9001", 1), ("9001", 2), ("9002", 1)]
+
+
+def test_cli_load_and_invoices(tmp_path, capsys):
+    _export(tmp_path / "a.csv", ["CLI001,9001,10,2025,1,F,5"])
+    args = ["--config", str(tmp_path / "missing.yaml"), "--db", str(tmp_path / "wh.sqlite")]
+
+    assert warehouse_cli.main(args + ["load", str(tmp_path / "*.csv")]) == 0
+    assert warehouse_cli.main(args + ["invoices", "--client", "CLI001"]) == 0
+    assert "9001" in capsys.readouterr().out